@@ -1,10 +1,18 @@
+from pydantic import ValidationError
+from utils.dataflow import Dataflow, analyze_dataflow
+from utils.env import load_env
 from utils.hashing import hash_string
-from utils.llm import call_model
-from models.lineage import LineageResult
+from utils.llm import call_model, structured_output
+from utils.metrics import record_escalation, record_lineage_dataflow, record_lineage_parse, record_lineage_repair
+from utils.model_router import deployment_for, route, escalate
+from models.lineage import ColumnMapping, ColumnMappingList, LineageResult, ProcedureAnalysis, strict_json_schema
+from storage.shared_cache import LLM_TTL_SECONDS, get_shared_cache
 import json
+import os
+import re
 
-def summarize_lineage(proc_name: str, database: str, content: str) -> dict:
-    prompt = f"""
+def build_prompt(proc_name: str, content: str) -> str:
+    return f"""
 You are a SQL data engineer assistant.
 
 Analyze the following SQL Server stored procedure named `{proc_name}`.
@@ -27,21 +35,337 @@ SQL Procedure:
 ```
 """.strip()
 
-    response = call_model(prompt)
+def build_partial_prompt(proc_name: str, flow: Dataflow, statements: list[str]) -> str:
+    resolved = json.dumps(flow.lineage(), indent=2)
+    sql = "\n\n".join(statements)
+    return f"""
+You are a SQL data engineer assistant.
+
+Static analysis of the SQL Server stored procedure named `{proc_name}` already
+resolved this source-to-target lineage, through its temp tables and table
+variables:
+
+{resolved}
+
+Only the statements below could not be resolved. Return the complete lineage
+of the procedure as one JSON object in the same format: the resolved mappings
+above plus any the statements below add.
+
+SQL Procedure:
+```
+{sql}
+```
+""".strip()
+
+DATAFLOW_HINT = """
+
+Static analysis already traced these column hops through the procedure's
+intermediate tables; include them unless the code above contradicts them:
+{mappings}
+"""
+
+def build_analysis_prompt(proc_name: str, content: str) -> str:
+    return f"""
+You are a SQL data engineer assistant.
+
+Analyze the following SQL Server stored procedure named `{proc_name}`.
+
+Return one JSON object with both a summary and the source-to-target lineage:
+
+{{
+  "summary": "What the procedure does: source and destination tables, transformation steps and logic.",
+  "source_tables": ["source_db.schema.table"],
+  "target_table": "target_schema.table",
+  "column_mappings": [
+    {{ "source": "source_col", "target": "target_col", "source_table": "table_name" }}
+  ]
+}}
+
+Write the summary as plain text for a data engineer. For the lineage, only
+include tables that directly participate in data movement. Do not infer
+beyond joins if it’s unclear.
+
+SQL Procedure:
+```
+{content}
+```
+""".strip()
+
+# Statement problems the LLM can resolve from the statement alone; dynamic
+# SQL, cursors and INSERT ... EXEC need the whole body.
+SHRINKABLE = {"unparsed", "unnamed_column"}
+
+LINEAGE_FORMAT = strict_json_schema(LineageResult)
+MAPPINGS_FORMAT = strict_json_schema(ColumnMappingList)
+ANALYSIS_FORMAT = strict_json_schema(ProcedureAnalysis)
+
+# (response_format name, schema) of the two kinds of answer
+LINEAGE_OUTPUT = ("lineage_result", LINEAGE_FORMAT)
+ANALYSIS_OUTPUT = ("procedure_analysis", ANALYSIS_FORMAT)
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+REPAIR_JSON_PROMPT = """
+Your previous answer was not valid lineage JSON ({error}).
+
+Rewrite it as a single JSON object matching this schema, keeping its content.
+Return only the JSON.
+
+Schema:
+{schema}
+
+Previous answer:
+{answer}
+""".strip()
+
+REPAIR_MAPPINGS_PROMPT = """
+These column_mappings entries from your lineage answer do not match the schema.
+Fix each one, keeping its meaning; drop an entry only if it cannot be fixed.
+Return only {{"column_mappings": [...]}}.
+
+Schema of one entry:
+{schema}
 
+Entries and errors:
+{entries}
+""".strip()
+
+
+def _json_text(raw: str) -> str:
+    text = (raw or "").strip()
+    fenced = _FENCE.search(text)
+    if fenced:
+        return fenced.group(1).strip()
+    start, end = text.find("{"), text.rfind("}")
+    return text[start:end + 1] if 0 <= start < end else text
+
+
+def validate_lineage(raw: str) -> tuple[LineageResult | None, dict | None]:
+    """
+    Validate a lineage answer piece by piece, so one bad entry does not throw
+    away the rest. Returns (lineage, problem): problem is None when valid,
+    {"kind": "json", "error"} when the answer as a whole is unusable, or
+    {"kind": "mappings", "entries": [(entry, error), ...]} when only some
+    column mappings are invalid (lineage then holds the valid ones).
+    """
     try:
-        extracted = response.content.strip()
-        if extracted.startswith("```json"):
-            extracted = extracted.removeprefix("```json").removesuffix("```").strip()
+        data = json.loads(_json_text(raw))
+    except ValueError as e:
+        return None, {"kind": "json", "error": f"not JSON: {e}"}
+    if not isinstance(data, dict):
+        return None, {"kind": "json", "error": "expected a JSON object"}
+
+    try:
+        head = LineageResult.model_validate({**data, "column_mappings": []})
+    except ValidationError as e:
+        return None, {"kind": "json", "error": _first_error(e)}
+
+    mappings, invalid = [], []
+    entries = data.get("column_mappings") or []
+    for entry in entries if isinstance(entries, list) else [entries]:
+        try:
+            mappings.append(ColumnMapping.model_validate(entry))
+        except ValidationError as e:
+            invalid.append((entry, _first_error(e)))
+    lineage = head.model_copy(update={"column_mappings": mappings})
+    return lineage, ({"kind": "mappings", "entries": invalid} if invalid else None)
+
+
+def _first_error(error: ValidationError) -> str:
+    detail = error.errors()[0]
+    return f"{'.'.join(str(p) for p in detail['loc']) or 'value'}: {detail['msg']}"
+
+
+def summary_text(raw: str) -> str | None:
+    """The `summary` of a combined analysis answer, if it has one."""
+    try:
+        data = json.loads(_json_text(raw))
+    except ValueError:
+        return None
+    summary = data.get("summary") if isinstance(data, dict) else None
+    return (summary.strip() or None) if isinstance(summary, str) else None
+
+
+def repair_lineage(raw: str, lineage: LineageResult | None, problem: dict,
+                   output: tuple = LINEAGE_OUTPUT) -> tuple[LineageResult | None, str]:
+    """
+    One targeted repair request on the fast deployment: only the broken
+    answer (or just its broken entries) and the error, never the procedure
+    body, so it costs a fraction of re-running the prompt. Returns the
+    lineage and the answer it now stands for.
+    """
+    deployment = deployment_for("fast")
+    if problem["kind"] == "json":
+        name, schema = output
+        prompt = REPAIR_JSON_PROMPT.format(
+            error=problem["error"], schema=json.dumps(schema), answer=raw,
+        )
+        response = call_model(prompt, deployment, structured_output(name, schema))
+        repaired, still_wrong = validate_lineage(response.content)
+        record_lineage_repair("json", repaired is not None and still_wrong is None)
+        return repaired, response.content
+
+    entries = "\n".join(
+        f"- {json.dumps(entry, default=str)}  # {error}" for entry, error in problem["entries"]
+    )
+    prompt = REPAIR_MAPPINGS_PROMPT.format(
+        schema=json.dumps(MAPPINGS_FORMAT["properties"]["column_mappings"]["items"]), entries=entries,
+    )
+    response = call_model(prompt, deployment, structured_output("column_mappings", MAPPINGS_FORMAT))
+    try:
+        fixed = ColumnMappingList.model_validate_json(_json_text(response.content)).column_mappings
+    except ValidationError:
+        fixed = []
+    record_lineage_repair("mappings", bool(fixed))
+    # Entries that still fail are dropped; the valid ones were kept either way.
+    return lineage.model_copy(update={"column_mappings": lineage.column_mappings + fixed}), raw
+
+
+def is_valid(lineage: LineageResult | None, signals: dict) -> bool:
+    # A procedure that writes somewhere must yield a target table.
+    if lineage is None:
+        return False
+    return bool(lineage.target_table) or not signals.get("writes")
+
+
+def _request_lineage(prompt: str, deployment: str, output: tuple = LINEAGE_OUTPUT) -> tuple[LineageResult | None, str]:
+    response = call_model(prompt, deployment, structured_output(*output))
+    lineage, problem = validate_lineage(response.content)
+    record_lineage_parse("valid" if problem is None else f"invalid_{problem['kind']}")
+    if problem is not None:
+        return repair_lineage(response.content, lineage, problem, output)
+    return lineage, response.content
 
-        lineage = LineageResult.parse_raw(extracted)
-    except Exception:
+
+def _extract_lineage(prompt: str, content: str, output: tuple = LINEAGE_OUTPUT) -> dict:
+    chosen = route(content)
+    lineage, raw = _request_lineage(prompt, chosen.deployment, output)
+
+    # Escalate to a larger deployment while the answer fails validation
+    while not is_valid(lineage, chosen.signals):
+        bigger = escalate(chosen)
+        if bigger is None:
+            break
+        record_escalation(chosen.tier, bigger.tier)
+        chosen = bigger
+        lineage, raw = _request_lineage(prompt, chosen.deployment, output)
+
+    parsed = lineage is not None
+    if lineage is None:
         lineage = LineageResult(source_tables=[], target_table="", column_mappings=[])
 
-    result = lineage.dict()
-    result["_raw"] = response.content
+    result = lineage.model_dump()
+    result["_raw"] = raw
+    result["_deployment"] = chosen.deployment
+    result["_parsed"] = parsed
+    return result
+
+def lineage_request(proc_name: str, content: str) -> tuple[str | None, Dataflow | None, str]:
+    """
+    The lineage prompt for a procedure after static dataflow analysis, as
+    (prompt, dataflow, kind), per LINEAGE_DATAFLOW (on, hint or off):
+      static - fully resolved statically, no prompt (on);
+      shrunk - only the unresolved statements plus the resolved mappings (on);
+      hinted - the full body plus the resolved hops;
+      llm    - the plain prompt.
+    """
+    load_env()
+    mode = os.getenv("LINEAGE_DATAFLOW", "on").lower()
+    if mode == "off":
+        return build_prompt(proc_name, content), None, "llm"
+
+    flow = analyze_dataflow(content)
+    if mode == "on" and flow.complete:
+        return None, flow, "static"
+    if flow.mappings and len(flow.targets) == 1:
+        statements = flow.unresolved_statements
+        shrink_ratio = float(os.getenv("LINEAGE_DATAFLOW_SHRINK_RATIO", "0.5"))
+        if (mode == "on" and statements
+                and {problem["reason"] for problem in flow.unresolved} <= SHRINKABLE
+                and sum(len(s) for s in statements) <= shrink_ratio * len(content)):
+            return build_partial_prompt(proc_name, flow, statements), flow, "shrunk"
+        if flow.intermediates:
+            hint = DATAFLOW_HINT.format(mappings=json.dumps(flow.lineage()["column_mappings"]))
+            return build_prompt(proc_name, content) + hint, flow, "hinted"
+    return build_prompt(proc_name, content), flow, "llm"
+
+
+def _same_table(a: str, b: str) -> bool:
+    return a.replace("[", "").replace("]", "").split(".")[-1].lower() == b.split(".")[-1].lower()
+
+
+def _merge_dataflow(result: dict, flow: Dataflow | None) -> dict:
+    """Add the statically resolved mappings the LLM answer left out."""
+    if flow is None or len(flow.targets) != 1 or not result["_parsed"]:
+        return result
+    static = flow.lineage()
+    if not result["target_table"]:
+        result["target_table"] = static["target_table"]
+    elif not _same_table(result["target_table"], static["target_table"]):
+        return result
+    present = {
+        (m["target"].lower(), m["source"].lower(), (m.get("source_table") or "").split(".")[-1].lower())
+        for m in result["column_mappings"]
+    }
+    for mapping in static["column_mappings"]:
+        key = (mapping["target"].lower(), mapping["source"].lower(), mapping["source_table"].split(".")[-1].lower())
+        if key not in present:
+            result["column_mappings"].append(mapping)
+            present.add(key)
+    result["source_tables"] = list(dict.fromkeys([*result["source_tables"], *static["source_tables"]]))
+    return result
+
+
+def summarize_lineage(proc_name: str, database: str, content: str) -> dict:
+    prompt, flow, kind = lineage_request(proc_name, content)
+    record_lineage_dataflow(kind)
+
+    if prompt is None:
+        result = {**flow.lineage(), "_raw": None, "_deployment": "static", "_parsed": True}
+    else:
+        # Same prompt -> same answer: share it with the other workers, and let
+        # only one of them pay for the call. Unparseable answers are not kept.
+        result = get_shared_cache().get_or_compute(
+            "lineage",
+            hash_string(prompt),
+            lambda: _merge_dataflow(_extract_lineage(prompt, content), flow),
+            LLM_TTL_SECONDS,
+            cache_if=lambda value: value["_parsed"],
+        )
+    # `_parsed` stays: an unparsed answer is empty, and saving it would
+    # delete the procedure's stored lineage.
+    result = dict(result)
+    result["_prompt"] = prompt
+    result["hash"] = hash_string(content)
+    result["procedure_name"] = proc_name
+    result["database"] = database
+    return result
+
+
+def analyze_procedure(proc_name: str, database: str, content: str) -> dict:
+    """
+    Summary and lineage of one procedure from a single LLM call, for bulk
+    onboarding: the definition is sent once instead of once per answer.
+    Same result shape as summarize_lineage plus `summary` (None if the
+    model left it out).
+    """
+    prompt = build_analysis_prompt(proc_name, content)
+
+    def compute() -> dict:
+        result = _extract_lineage(prompt, content, ANALYSIS_OUTPUT)
+        result["summary"] = summary_text(result["_raw"])
+        return result
+
+    result = get_shared_cache().get_or_compute(
+        "analysis",
+        hash_string(prompt),
+        compute,
+        LLM_TTL_SECONDS,
+        cache_if=lambda value: value["_parsed"] and value["summary"] is not None,
+    )
+    result = dict(result)
     result["_prompt"] = prompt
     result["hash"] = hash_string(content)
     result["procedure_name"] = proc_name
     result["database"] = database
-    return result
\ No newline at end of file
+    return result
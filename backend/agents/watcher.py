@@ -0,0 +1,313 @@
+# backend/agents/watcher.py
+"""
+Long-running watcher that keeps summaries and lineage fresh as procedures
+change. Every alias in connections.json is polled with a cheap
+sys.procedures.modify_date watermark query, and only procedures changed
+since the last poll are queued. The queue is drained at a bounded rate,
+procedures that feed gold tables first. Versions that are already
+summarized or mapped (same definition hash) cost no LLM call. Once an
+alias's queue drains, its procedure search index is refreshed. A failing
+procedure is retried with exponential backoff and dead-lettered after
+`max_attempts`; it is picked up again once its definition changes.
+
+    cd backend
+    python -m agents.watcher --interval 60 --max-per-minute 6
+"""
+import argparse
+import heapq
+import itertools
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import text
+from agents.lineage_agent import summarize_lineage
+from api.analyze import generate_summary
+from connections.manager import get_connection_manager
+from storage.lineage_store import save_lineage_diff
+from storage.procedure_cache import get_cached_summary, hash_procedure
+from storage.search_index import refresh_alias as refresh_search_index
+from utils.mapping_extractor import extract_write_targets
+from utils.metrics import record_watcher
+
+log = logging.getLogger("watcher")
+
+# Lower runs first. Gold procedures write gold tables; procedures writing a
+# table that gold procedures read come right after them.
+ROLE_PRIORITY = {"gold": 0, "silver": 2, "bronze": 3, "stage": 4, "source": 5}
+FEEDS_GOLD_PRIORITY = 1
+DEFAULT_PRIORITY = 6
+MAX_RETRY_SECONDS = 3600.0
+
+CHANGED_QUERY = """
+    SELECT s.name AS schema_name, p.name AS procedure_name, p.modify_date, sm.definition
+    FROM sys.procedures p
+    JOIN sys.schemas s ON s.schema_id = p.schema_id
+    JOIN sys.sql_modules sm ON sm.object_id = p.object_id
+    WHERE (:since IS NULL OR p.modify_date > :since)
+    ORDER BY p.modify_date
+"""
+
+
+@dataclass(order=True)
+class WatchItem:
+    priority: int
+    modify_date: datetime
+    seq: int
+    alias: str = field(compare=False)
+    procedure_name: str = field(compare=False)
+    definition: str = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+    retry_at: float = field(default=0.0, compare=False)  # time.monotonic()
+
+
+class ProcedureWatcher:
+    def __init__(self, interval: float = 60.0, max_per_minute: float = 6.0, aliases: Optional[list] = None,
+                 max_attempts: int = 5, retry_seconds: float = 60.0):
+        self.conn_mgr = get_connection_manager()
+        self.interval = interval
+        self.llm_gap = 60.0 / max_per_minute if max_per_minute > 0 else 0.0
+        self.max_attempts = max(1, max_attempts)
+        self.retry_seconds = retry_seconds
+        self.aliases = aliases or [
+            alias for alias, config in self.conn_mgr.connections.items()
+            if config.get("type", "sqlserver") == "sqlserver"
+        ]
+        self.watermarks = {}
+        self.queue = []
+        self.pending = {}  # (alias, procedure) -> latest queued item
+        self.failed = {}  # retried on the first poll after item.retry_at
+        self.dead = {}  # gave up after max_attempts; not retried until changed again
+        # Entries per alias across pending and failed (not dead), so has_pending is O(1)
+        self.waiting = Counter()
+        self.seq = itertools.count()
+
+    # -- watermarks --------------------------------------------------------
+
+    def load_watermarks(self) -> None:
+        engine = self.conn_mgr.get_sqlalchemy_engine("lineage")
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT alias, last_modify_date FROM procedure_watch_state")).fetchall()
+        self.watermarks = {row.alias: _as_datetime(row.last_modify_date) for row in rows}
+
+    def save_watermark(self, alias: str) -> None:
+        params = {"alias": alias, "mark": self.watermarks.get(alias), "now": datetime.utcnow()}
+        engine = self.conn_mgr.get_sqlalchemy_engine("lineage")
+        with engine.begin() as conn:
+            updated = conn.execute(text("""
+                UPDATE procedure_watch_state
+                SET last_modify_date = :mark, last_polled_at = :now
+                WHERE alias = :alias
+            """), params).rowcount
+            if not updated:
+                conn.execute(text("""
+                    INSERT INTO procedure_watch_state (alias, last_modify_date, last_polled_at)
+                    VALUES (:alias, :mark, :now)
+                """), params)
+
+    # -- polling -----------------------------------------------------------
+
+    def gold_inputs(self) -> set:
+        """(schema, table) pairs read by gold procedures, from lineage_table_map."""
+        gold = [a for a, c in self.conn_mgr.connections.items() if c.get("role") == "gold"]
+        if not gold:
+            return set()
+        names = {f"gold_{i}": alias for i, alias in enumerate(gold)}
+        engine = self.conn_mgr.get_sqlalchemy_engine("lineage")
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(text(f"""
+                    SELECT DISTINCT referenced_schema, referenced_table
+                    FROM lineage_table_map
+                    WHERE is_target = 0 AND database_name IN ({", ".join(":" + n for n in names)})
+                """), names).fetchall()
+        except Exception as e:  # catalog lineage not built yet
+            log.warning("gold inputs unavailable: %s", e)
+            return set()
+        return {((row[0] or "dbo").lower(), row[1].lower()) for row in rows}
+
+    def priority(self, alias: str, definition: str, gold_inputs: set) -> int:
+        role = self.conn_mgr.connections.get(alias, {}).get("role")
+        priority = ROLE_PRIORITY.get(role, DEFAULT_PRIORITY)
+        if priority > FEEDS_GOLD_PRIORITY and gold_inputs:
+            for schema, table in extract_write_targets(definition):
+                if (schema or "dbo", table) in gold_inputs:
+                    return FEEDS_GOLD_PRIORITY
+        return priority
+
+    def poll(self, alias: str, gold_inputs: set) -> int:
+        engine = self.conn_mgr.get_sqlalchemy_engine(alias)
+        with engine.connect() as conn:
+            rows = conn.execute(text(CHANGED_QUERY), {"since": self.watermarks.get(alias)}).fetchall()
+
+        for row in rows:
+            modified = _as_datetime(row.modify_date)
+            item = WatchItem(
+                self.priority(alias, row.definition or "", gold_inputs),
+                modified, next(self.seq), alias, row.procedure_name, row.definition or "",
+            )
+            # A newer change replaces the queued one; the stale heap entry is skipped on pop.
+            self.enqueue((alias, row.procedure_name), item)
+            self.watermarks[alias] = max(modified, self.watermarks.get(alias) or modified)
+        return len(rows)
+
+    def enqueue(self, key: tuple, item: WatchItem) -> None:
+        self.dead.pop(key, None)
+        if key not in self.pending:
+            self.waiting[key[0]] += 1
+        self.pending[key] = item
+        heapq.heappush(self.queue, item)
+
+    def fail(self, item: WatchItem) -> str:
+        """Schedule a retry with exponential backoff, or dead-letter the item; returns which."""
+        key = (item.alias, item.procedure_name)
+        if self.failed.pop(key, None) is not None:
+            self.waiting[item.alias] -= 1
+        item.attempts += 1
+        if item.attempts >= self.max_attempts:
+            log.error("%s.%s dead-lettered after %d attempts", item.alias, item.procedure_name, item.attempts)
+            self.dead[key] = item
+            return "dead_letter"
+        delay = min(self.retry_seconds * 2 ** (item.attempts - 1), MAX_RETRY_SECONDS)
+        item.retry_at = time.monotonic() + delay
+        self.failed[key] = item
+        self.waiting[item.alias] += 1
+        return "failed"
+
+    def has_pending(self, alias: str) -> bool:
+        return self.waiting[alias] > 0
+
+    def poll_all(self) -> None:
+        now = time.monotonic()
+        for key, item in list(self.failed.items()):
+            # A newer change already queued supersedes the failed version
+            if key in self.pending or item.retry_at <= now:
+                del self.failed[key]
+                self.waiting[key[0]] -= 1
+                if key not in self.pending:
+                    self.enqueue(key, item)
+
+        gold_inputs = self.gold_inputs()
+        for alias in self.aliases:
+            try:
+                changed = self.poll(alias, gold_inputs)
+            except Exception as e:
+                log.warning("poll %s failed: %s", alias, e)
+                continue
+            if changed:
+                log.info("%s: %d changed procedure(s) queued", alias, changed)
+            # Persist only once nothing from this alias is waiting, so a
+            # restart re-polls anything that was queued but not processed.
+            if not self.has_pending(alias):
+                self.save_watermark(alias)
+
+    # -- processing --------------------------------------------------------
+
+    def pop(self) -> Optional[WatchItem]:
+        while self.queue:
+            item = heapq.heappop(self.queue)
+            if self.pending.get((item.alias, item.procedure_name)) is item:
+                del self.pending[(item.alias, item.procedure_name)]
+                self.waiting[item.alias] -= 1
+                return item
+        return None
+
+    def lineage_is_current(self, alias: str, proc_name: str, proc_hash: str) -> bool:
+        # lineage_versions also covers procedures without column edges; lineage_map
+        # covers lineage stored before it existed (as in bulk_plan.analyzed_versions).
+        engine = self.conn_mgr.get_sqlalchemy_engine("lineage")
+        with engine.connect() as conn:
+            row = conn.execute(text("""
+                SELECT 1 FROM lineage_versions
+                WHERE database_name = :db AND procedure_name = :proc AND hash = :hash
+                UNION ALL
+                SELECT 1 FROM lineage_map
+                WHERE database_name = :db AND procedure_name = :proc AND hash = :hash
+            """), {"db": alias, "proc": proc_name, "hash": proc_hash}).first()
+        return row is not None
+
+    def process(self, item: WatchItem) -> bool:
+        """Refresh summary and lineage for one procedure; returns whether the LLM was needed."""
+        proc_hash = hash_procedure(item.definition)
+        used_llm = False
+
+        if get_cached_summary(item.alias, item.procedure_name, proc_hash) is None:
+            generate_summary(item.alias, item.procedure_name, item.definition, proc_hash)
+            used_llm = True
+
+        if not self.lineage_is_current(item.alias, item.procedure_name, proc_hash):
+            lineage = summarize_lineage(item.procedure_name, item.alias, item.definition)
+            if not lineage["_parsed"]:
+                # Saving the empty answer would delete the stored lineage
+                raise ValueError("lineage answer could not be parsed")
+            with self.conn_mgr.get_sqlalchemy_engine("lineage").begin() as conn:
+                counts = save_lineage_diff(conn, item.procedure_name, item.alias, lineage, lineage["hash"])
+            log.info("%s.%s lineage %s", item.alias, item.procedure_name, counts)
+            used_llm = True
+        return used_llm
+
+    def refresh_search(self, alias: str) -> None:
+        # Only changed definitions and summaries are re-tokenized.
+        try:
+            log.info("%s search index %s", alias, refresh_search_index(alias))
+        except Exception as e:  # search tables not created yet
+            log.warning("search index refresh for %s failed: %s", alias, e)
+
+    def run(self, once: bool = False) -> None:
+        self.load_watermarks()
+        next_poll = 0.0
+        while True:
+            if time.monotonic() >= next_poll:
+                self.poll_all()
+                next_poll = float("inf") if once else time.monotonic() + self.interval
+
+            item = self.pop()
+            if item is None:
+                if once:
+                    return
+                time.sleep(max(0.0, min(next_poll - time.monotonic(), self.interval)))
+                continue
+
+            try:
+                used_llm = self.process(item)
+                result = "analyzed" if used_llm else "unchanged"
+            except Exception as e:
+                log.warning("%s.%s failed: %s", item.alias, item.procedure_name, e)
+                used_llm, result = True, self.fail(item)
+            record_watcher(item.alias, result, len(self.pending))
+
+            if not self.has_pending(item.alias):
+                self.save_watermark(item.alias)
+                self.refresh_search(item.alias)
+            if used_llm and self.llm_gap:
+                # Keep LLM spend steady instead of bursting on a big deploy.
+                time.sleep(self.llm_gap)
+
+
+def _as_datetime(value):
+    if isinstance(value, str):  # SQLite stand-ins return text
+        return datetime.fromisoformat(value)
+    return value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-analyze procedures as they change")
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between watermark polls")
+    parser.add_argument("--max-per-minute", type=float, default=6.0, help="LLM-backed refreshes per minute")
+    parser.add_argument("--alias", action="append", default=None, help="limit to these aliases")
+    parser.add_argument("--once", action="store_true", help="poll once, drain the queue and exit")
+    parser.add_argument("--max-attempts", type=int, default=5, help="failures before a procedure is dead-lettered")
+    parser.add_argument("--retry-seconds", type=float, default=60.0, help="first retry delay, doubled per failure")
+    parser.add_argument("--metrics-port", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.metrics_port:
+        from prometheus_client import start_http_server
+
+        start_http_server(args.metrics_port)
+    ProcedureWatcher(
+        args.interval, args.max_per_minute, args.alias, args.max_attempts, args.retry_seconds,
+    ).run(once=args.once)
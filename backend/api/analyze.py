@@ -1,8 +1,16 @@
 # backend/api/analyze.py
 
+import json
+import time
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from llm.azure_client import get_llm
+from utils.deadline import llm_timeout
+from utils.metrics import record_llm_call
+from utils.model_router import route
+from storage.shared_cache import LLM_TTL_SECONDS, get_shared_cache
 from storage.procedure_cache import (
     hash_procedure,
     get_cached_summary,
@@ -16,32 +24,124 @@ class AnalyzeRequest(BaseModel):
     procedure_name: str
     db_alias: str
 
+def build_summary_prompt(content: str) -> str:
+    return (
+        "You're a data engineer helping understand SQL Server stored procedures.\n"
+        "Summarize what this stored procedure does.\n"
+        "Highlight any source and destination tables, transformation steps, and logic.\n\n"
+        f"SQL:\n{content}"
+    )
+
+def _generate_summary(db_alias: str, procedure_name: str, content: str, proc_hash: str) -> dict:
+    # Run LLM on the deployment sized for this procedure
+    chosen = route(content)
+    llm = get_llm(chosen.deployment)
+    prompt = build_summary_prompt(content)
+
+    started = time.perf_counter()
+    response = llm.invoke(prompt, timeout=llm_timeout())
+    usage = getattr(response, "usage_metadata", None) or {}
+    record_llm_call(
+        chosen.deployment,
+        time.perf_counter() - started,
+        usage.get("input_tokens", 0),
+        usage.get("output_tokens", 0),
+    )
+    summary = response.content
+
+    # Store result
+    store_summary(db_alias, procedure_name, proc_hash, summary)
+    return {"summary": summary, "deployment": chosen.deployment}
+
+def generate_summary(db_alias: str, procedure_name: str, content: str, proc_hash: str) -> dict:
+    """
+    Summarize and store one procedure version. Single-flight across workers:
+    concurrent misses for the same version wait for one LLM call.
+    """
+    computed = []
+
+    def compute() -> dict:
+        computed.append(True)
+        return _generate_summary(db_alias, procedure_name, content, proc_hash)
+
+    result = get_shared_cache().get_or_compute(
+        "summary", f"{db_alias}:{procedure_name}:{proc_hash}", compute, LLM_TTL_SECONDS,
+    )
+    if not computed:
+        # The shared cache outlives procedure_analysis_cache rows (trimmed,
+        # compacted or deleted): write the summary back (an idempotent upsert)
+        # so /analyze/status sees it.
+        store_summary(db_alias, procedure_name, proc_hash, result["summary"])
+    return result
+
 @router.post("/analyze")
 async def analyze_proc(req: AnalyzeRequest):
     try:
         proc_hash = hash_procedure(req.content)
 
         # Try to get cached summary
-        cached = get_cached_summary(req.db_alias, req.procedure_name, proc_hash)
+        cached = await run_in_threadpool(get_cached_summary, req.db_alias, req.procedure_name, proc_hash)
         if cached:
             return {"summary": cached, "cached": True}
 
-        # If not cached, run LLM
-        llm = get_llm()
-        prompt = (
-            "You're a data engineer helping understand SQL Server stored procedures.\n"
-            "Summarize what this stored procedure does.\n"
-            "Highlight any source and destination tables, transformation steps, and logic.\n\n"
-            f"SQL:\n{req.content}"
+        generated = await run_in_threadpool(
+            generate_summary, req.db_alias, req.procedure_name, req.content, proc_hash
         )
+        return {"summary": generated["summary"], "cached": False, "deployment": generated["deployment"]}
 
-        response = llm.invoke(prompt)
-        summary = response.content
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Store result
-        store_summary(req.db_alias, req.procedure_name, proc_hash, summary)
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        return {"summary": summary, "cached": False}
+@router.post("/analyze/stream")
+async def analyze_proc_stream(req: AnalyzeRequest):
+    """
+    Server-sent events variant of /analyze: `token` events carry text as the
+    model produces it, then `done`. Cached summaries are replayed as a single
+    `summary` event; failures arrive as an `error` event.
+    """
+    proc_hash = hash_procedure(req.content)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    async def events():
+        try:
+            cached = await run_in_threadpool(get_cached_summary, req.db_alias, req.procedure_name, proc_hash)
+            if cached:
+                yield _sse("summary", {"text": cached, "cached": True})
+                yield _sse("done", {"cached": True})
+                return
+
+            # Token counting (tiktoken) over the whole body; keep it off the event loop
+            chosen = await run_in_threadpool(route, req.content)
+            yield _sse("start", {"cached": False, "deployment": chosen.deployment})
+            # First use imports LangChain; do it off the event loop
+            llm = await run_in_threadpool(get_llm, chosen.deployment)
+
+            parts, usage = [], {}
+            started = time.perf_counter()
+            stream = llm.astream(build_summary_prompt(req.content), stream_usage=True, timeout=llm_timeout())
+            async for chunk in stream:
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield _sse("token", {"text": chunk.content})
+                if getattr(chunk, "usage_metadata", None):
+                    usage = chunk.usage_metadata
+            record_llm_call(
+                chosen.deployment,
+                time.perf_counter() - started,
+                usage.get("input_tokens", 0),
+                usage.get("output_tokens", 0),
+            )
+
+            summary = "".join(parts)
+            await run_in_threadpool(store_summary, req.db_alias, req.procedure_name, proc_hash, summary)
+            yield _sse("done", {"cached": False, "deployment": chosen.deployment})
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
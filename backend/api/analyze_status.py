@@ -1,13 +1,13 @@
 # backend/api/analyze_status.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from sqlalchemy import inspect, text
-from connections.manager import ConnectionManager
+from connections.manager import get_connection_manager
 from connections.cache_engine import get_cache_engine
-from storage.procedure_cache import hash_procedure
+from storage.procedure_cache import hash_procedure, compact_cache, KEEP_VERSIONS
 
 router = APIRouter()
-conn_mgr = ConnectionManager()
+conn_mgr = get_connection_manager()
 
 @router.get("/analyze/status/{alias}")
 def get_analysis_status(alias: str):
@@ -31,14 +31,17 @@ def get_analysis_status(alias: str):
                 FROM procedure_analysis_cache
                 WHERE db_alias = :alias
             """), {"alias": alias})
-            cached_map = {row.procedure_name: row.proc_hash for row in cached}
+            # Several versions may be kept per procedure; any match means up to date.
+            cached_map = {}
+            for row in cached:
+                cached_map.setdefault(row.procedure_name, set()).add(row.proc_hash)
 
         status = {}
         for name, body in procs.items():
             hash_val = hash_procedure(body)
             if name not in cached_map:
                 status[name] = "not_analyzed"
-            elif cached_map[name] == hash_val:
+            elif hash_val in cached_map[name]:
                 status[name] = "up_to_date"
             else:
                 status[name] = "outdated"
@@ -46,4 +49,11 @@ def get_analysis_status(alias: str):
         return status
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/analyze/cache/compact")
+def compact_analysis_cache(keep: int = Query(KEEP_VERSIONS, ge=1), alias: str | None = None):
+    try:
+        return {"deleted": compact_cache(keep, alias), "keep": keep}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,78 +1,158 @@
 # backend/api/lineage_bulk.py
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from connections.manager import ConnectionManager
-from sqlalchemy import text
-from utils.hashing import hash_string
-from agents.lineage_agent import summarize_lineage
-from datetime import datetime
-from models.lineage import BulkLineageRequest
+from connections.manager import get_connection_manager
+from agents.lineage_agent import analyze_procedure, summarize_lineage
+from storage.bulk_plan import (
+    build_plan,
+    check_plan,
+    iter_definitions,
+    load_plan,
+    mark_executed,
+    select_work,
+)
+from storage.lineage_store import save_lineage_diff
+from storage.procedure_cache import store_summaries
+from models.lineage import BulkLineageRequest, BulkPlanRequest
+from utils.pipeline import pipeline_settings, run_pipeline
 
 router = APIRouter()
-conn_mgr = ConnectionManager()
+conn_mgr = get_connection_manager()
+
+def _bulk_work(payload: BulkLineageRequest, mode: str, report: dict):
+    """
+    Stream of (procedure, definition) to analyze; with a plan_id, exactly
+    the plan's work. Skipped and drifted procedures are noted in `report`
+    as the stream is consumed.
+    """
+    plan = None
+    if payload.plan_id:
+        plan = load_plan(payload.plan_id)
+        if plan is None:
+            raise HTTPException(status_code=404, detail=f"Plan {payload.plan_id} not found")
+        try:
+            check_plan(plan, payload.alias, payload.schema_name, mode)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    return select_work(iter_definitions(payload.alias, payload.schema_name), payload.alias, mode, plan, report)
+
+@router.post("/lineage/bulk/plan")
+def plan_bulk_run(payload: BulkPlanRequest):
+    """
+    Dry run: what a bulk run of the schema would analyze, with estimated
+    tokens, cost and duration. Pass the returned plan_id to the bulk
+    endpoint to run exactly this plan.
+    """
+    try:
+        return build_plan(payload.alias, payload.schema_name, payload.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/lineage/bulk/plans/{plan_id}")
+def get_bulk_plan(plan_id: str):
+    plan = load_plan(plan_id)
+    if plan is None:
+        raise HTTPException(status_code=404, detail=f"Plan {plan_id} not found")
+    return plan
 
 @router.post("/lineage/bulk/by-schema")
 def bulk_analyze_by_schema(payload: BulkLineageRequest):
+    """
+    Lineage of every procedure of a schema. Definitions are streamed, LLM
+    calls run BULK_LLM_CONCURRENCY at a time and results are written in
+    batched transactions (utils/pipeline.py).
+    """
     try:
-        engine = conn_mgr.get_sqlalchemy_engine(payload.alias)
-        with engine.connect() as conn:
-            query = """
-                SELECT p.name
-                FROM sys.procedures p
-                JOIN sys.schemas s ON p.schema_id = s.schema_id
-                WHERE (:schema IS NULL OR s.name = :schema)
-                ORDER BY s.name, p.name
-            """
-            result = conn.execute(text(query), {"schema": payload.schema})
-            procedures = [row[0] for row in result]
+        lineage_engine = conn_mgr.get_sqlalchemy_engine("lineage")
+        report = {}
+        work = _bulk_work(payload, "lineage", report)
+        totals = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        unparsed = []
 
-            results = []
-            for proc in procedures:
-                body_result = conn.execute(text("""
-                    SELECT sm.definition
-                    FROM sys.procedures p
-                    JOIN sys.sql_modules sm ON p.object_id = sm.object_id
-                    WHERE p.name = :proc_name
-                """), {"proc_name": proc})
-                row = body_result.fetchone()
-                if not row:
-                    continue
-                body = row[0]
-                lineage = summarize_lineage(proc, payload.alias, body)
+        def analyze(item):
+            proc, body = item
+            return proc, summarize_lineage(proc, payload.alias, body)
+
+        def write(batch):
+            # One transaction per batch, writing only the mappings that changed
+            with lineage_engine.begin() as conn:
+                for proc, lineage in batch:
+                    if not lineage["_parsed"]:
+                        # Keep the stored lineage; a later run retries it
+                        unparsed.append(proc)
+                        continue
+                    counts = save_lineage_diff(conn, proc, payload.alias, lineage, lineage["hash"])
+                    for change, n in counts.items():
+                        totals[change] += n
+
+        analyzed = run_pipeline(work, analyze, write, **pipeline_settings())
+        if payload.plan_id:
+            mark_executed(payload.plan_id)
+        return {
+            "status": "ok",
+            "procedures_analyzed": analyzed,
+            "procedures_skipped": report["skipped"],
+            "procedures_drifted": report["drifted"],
+            "lineage_unparsed": unparsed,
+            **totals,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/analyze/bulk/by-schema")
+def bulk_summary_and_lineage_by_schema(payload: BulkLineageRequest):
+    """
+    Summary (procedure_analysis_cache) and lineage (lineage_map) for every
+    procedure of a schema from one LLM call per procedure. Procedures whose
+    current definition is already both summarized and mapped are skipped.
+    Runs through the same pipeline as /lineage/bulk/by-schema.
+    """
+    try:
+        lineage_engine = conn_mgr.get_sqlalchemy_engine("lineage")
+        report = {}
+        work = _bulk_work(payload, "analysis", report)
+        summaries, missing, unparsed = 0, [], []
+        totals = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
 
-                # Store lineage result
-                now = datetime.utcnow()
-                conn2 = conn_mgr.get_sqlalchemy_engine("lineage").connect()
-                with conn2.begin():
-                    # Clean up previous lineage for this proc
-                    conn2.execute(text("""
-                        DELETE FROM lineage_map
-                        WHERE procedure_name = :proc AND database_name = :db
-                    """), {"proc": proc, "db": payload.alias})
+        def analyze(item):
+            proc, body = item
+            return proc, analyze_procedure(proc, payload.alias, body)
 
-                    for mapping in lineage.get("column_mappings", []):
-                        conn2.execute(text("""
-                            INSERT INTO lineage_map (
-                                procedure_name, database_name, schema_name,
-                                source_table, target_table, source_column,
-                                target_column, source_full, analyzed_at, hash
-                            )
-                            VALUES (:proc, :db, :schema, :src_table, :tgt_table,
-                                    :src_col, :tgt_col, :src_full, :ts, :hash)
-                        """), {
-                            "proc": proc,
-                            "db": payload.alias,
-                            "schema": lineage["target_table"].split(".")[0],
-                            "src_table": mapping["source_table"].split(".")[-1],
-                            "tgt_table": lineage["target_table"].split(".")[-1],
-                            "src_col": mapping["source"],
-                            "tgt_col": mapping["target"],
-                            "src_full": mapping["source_table"],
-                            "ts": now,
-                            "hash": lineage["hash"],
-                        })
-                results.append(proc)
+        def write(batch):
+            nonlocal summaries
+            summarized = [(proc, r["hash"], r["summary"]) for proc, r in batch if r["summary"] is not None]
+            missing.extend(proc for proc, r in batch if r["summary"] is None)
+            if summarized:
+                store_summaries(payload.alias, summarized)
+                summaries += len(summarized)
+            with lineage_engine.begin() as conn:
+                for proc, result in batch:
+                    if not result["_parsed"]:
+                        unparsed.append(proc)
+                        continue
+                    counts = save_lineage_diff(conn, proc, payload.alias, result, result["hash"])
+                    for change, n in counts.items():
+                        totals[change] += n
 
-        return {"status": "ok", "procedures_analyzed": len(results)}
+        analyzed = run_pipeline(work, analyze, write, **pipeline_settings())
+        if payload.plan_id:
+            mark_executed(payload.plan_id)
+        return {
+            "status": "ok",
+            "procedures_analyzed": analyzed,
+            "procedures_skipped": report["skipped"],
+            "procedures_drifted": report["drifted"],
+            "summaries_stored": summaries,
+            # Re-run these through /analyze; their lineage was stored
+            "summaries_missing": missing,
+            "lineage_unparsed": unparsed,
+            **totals,
+        }
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
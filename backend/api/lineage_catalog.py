@@ -0,0 +1,88 @@
+# backend/api/lineage_catalog.py
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import text
+from connections.manager import get_connection_manager
+from storage.mapping_sync import sync_mappings
+from utils.mapping_extractor import extract_write_targets
+
+router = APIRouter()
+conn_mgr = get_connection_manager()
+
+# Every procedure -> table/view reference the engine has recorded, in one pass.
+# Cross-database references have no local object, so they are kept as-is.
+DEPENDENCY_QUERY = """
+    SELECT
+        ps.name AS procedure_schema,
+        p.name AS procedure_name,
+        COALESCE(d.referenced_database_name, DB_NAME()) AS referenced_database,
+        COALESCE(d.referenced_schema_name, OBJECT_SCHEMA_NAME(d.referenced_id), 'dbo') AS referenced_schema,
+        d.referenced_entity_name AS referenced_table
+    FROM sys.sql_expression_dependencies d
+    JOIN sys.procedures p ON p.object_id = d.referencing_id
+    JOIN sys.schemas ps ON ps.schema_id = p.schema_id
+    LEFT JOIN sys.objects o ON o.object_id = d.referenced_id
+    WHERE d.referenced_class = 1
+      AND (o.object_id IS NULL OR o.type IN ('U', 'V'))
+      AND (:schema IS NULL OR ps.name = :schema)
+"""
+
+DEFINITION_QUERY = """
+    SELECT ps.name AS procedure_schema, p.name AS procedure_name, sm.definition
+    FROM sys.procedures p
+    JOIN sys.schemas ps ON ps.schema_id = p.schema_id
+    JOIN sys.sql_modules sm ON sm.object_id = p.object_id
+    WHERE (:schema IS NULL OR ps.name = :schema)
+"""
+
+@router.post("/lineage/catalog/{alias}")
+def build_catalog_lineage(alias: str, schema: str | None = None, classify: bool = True):
+    """
+    Table-level lineage from sys.sql_expression_dependencies, without the LLM.
+    With `classify`, one extra set-based definition fetch marks which
+    referenced tables each procedure writes to (is_target); the rest are sources.
+    """
+    try:
+        engine = conn_mgr.get_sqlalchemy_engine(alias)
+        with engine.connect() as conn:
+            edges = conn.execute(text(DEPENDENCY_QUERY), {"schema": schema}).mappings().all()
+            writes = {}
+            if classify:
+                for row in conn.execute(text(DEFINITION_QUERY), {"schema": schema}):
+                    writes[(row.procedure_schema, row.procedure_name)] = extract_write_targets(row.definition or "")
+
+        rows = []
+        for edge in edges:
+            targets = writes.get((edge["procedure_schema"], edge["procedure_name"]), set())
+            table = edge["referenced_table"].lower()
+            is_target = (edge["referenced_schema"].lower(), table) in targets or (None, table) in targets
+            rows.append({
+                "database_name": alias,
+                **edge,
+                "is_target": is_target,
+            })
+
+        scope = {"database_name": [alias]}
+        if schema is not None:
+            scope["procedure_schema"] = [schema]
+
+        lineage_engine = conn_mgr.get_sqlalchemy_engine("lineage")
+        with lineage_engine.begin() as conn:
+            counts = sync_mappings(
+                conn,
+                "lineage_table_map",
+                key_cols=["database_name", "procedure_schema", "procedure_name",
+                          "referenced_database", "referenced_schema", "referenced_table"],
+                value_cols=["is_target"],
+                rows=rows,
+                delete_missing=True,
+                scope=scope,
+            )
+
+        return {
+            "procedures": len({(r["procedure_schema"], r["procedure_name"]) for r in rows}),
+            "edges": len(rows),
+            "targets": sum(1 for r in rows if r["is_target"]),
+            **counts,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,44 @@
+# backend/api/lineage_export.py
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from connections.manager import get_connection_manager
+from storage.lineage_export import CHUNK_ROWS, EXPORTS, FORMATS, current_watermark, iter_batches, stream_export
+
+router = APIRouter()
+conn_mgr = get_connection_manager()
+
+
+@router.get("/export/{table}")
+def export_table(
+    table: str,
+    format: str = Query("parquet", pattern="^(parquet|arrow)$"),
+    database: str | None = None,
+    schema: str | None = None,
+    since: datetime | None = None,
+    chunk_rows: int = Query(CHUNK_ROWS, ge=1000, le=500_000),
+):
+    """
+    Stream lineage_map, source_to_stage_map or stage_to_bronze_map as Parquet
+    or Arrow IPC. Pass the returned X-Export-Watermark back as `since` to get
+    only rows added or changed since this export. Increments start
+    EXPORT_OVERLAP_SECONDS before `since` to catch late commits, so upsert on
+    the X-Export-Key columns; deletions only show up in a full export.
+    """
+    if table not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export table: {table}")
+    try:
+        engine = conn_mgr.get_sqlalchemy_engine("lineage")
+        watermark = current_watermark(engine, table, database, schema, since)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    batches = iter_batches(engine, table, database, schema, since, watermark, chunk_rows)
+    extension = "parquet" if format == "parquet" else "arrows"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{table}.{extension}"',
+        "X-Export-Key": ",".join(EXPORTS[table]["key"]),
+    }
+    if watermark is not None:
+        headers["X-Export-Watermark"] = watermark.isoformat()
+    return StreamingResponse(stream_export(batches, table, format, watermark), media_type=FORMATS[format], headers=headers)
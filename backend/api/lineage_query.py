@@ -0,0 +1,148 @@
+# backend/api/lineage_query.py
+import base64
+import json
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import text
+from connections.manager import get_connection_manager
+
+router = APIRouter()
+conn_mgr = get_connection_manager()
+
+MAX_LIMIT = 1000
+
+COLUMN_FIELDS = [
+    "id", "procedure_name", "database_name", "schema_name", "source_table", "target_table",
+    "source_column", "target_column", "source_full", "analyzed_at", "hash",
+]
+TABLE_FIELDS = [
+    "id", "database_name", "procedure_schema", "procedure_name", "referenced_database",
+    "referenced_schema", "referenced_table", "is_target", "analyzed_at",
+]
+
+# Index key prefixes (see LineageStore.sql); each ends in id so pages are seeks.
+COLUMN_INDEXES = [
+    ("target_table", "target_column"),
+    ("source_full", "source_column"),
+    ("source_table", "source_column"),
+]
+TABLE_INDEXES = [
+    ("referenced_table", "referenced_schema"),
+]
+
+
+def _encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(table: str, fields: list, indexes: list, filters: dict, residual: dict, cursor: str | None, limit: int):
+    """
+    One page ordered along the first index whose leading column is filtered.
+    Equality filters on the index prefix are followed by the remaining index
+    columns + id, so the next page continues from the last row with a seek.
+    """
+    lead, second = next(((a, b) for a, b in indexes if filters.get(a) is not None), (None, None))
+    if lead is None:
+        names = ", ".join(a for a, _ in indexes)
+        raise HTTPException(status_code=400, detail=f"Filter on at least one of: {names}")
+
+    where, params = [], {"limit": min(limit, MAX_LIMIT)}
+    for col, value in {**filters, **residual}.items():
+        if value is not None:
+            where.append(f"{col} = :{col}")
+            params[col] = value
+
+    order_cols = ([second] if filters.get(second) is None else []) + ["id"]
+    if cursor:
+        values = _decode_cursor(cursor)
+        if len(values) != len(order_cols):
+            raise HTTPException(status_code=400, detail="Cursor does not match filters")
+        # (a, id) > (:a, :id) spelled out so the optimizer keeps the seek
+        clauses = []
+        for i, col in enumerate(order_cols):
+            eq = [f"{c} = :after_{c}" for c in order_cols[:i]]
+            clauses.append("(" + " AND ".join(eq + [f"{col} > :after_{col}"]) + ")")
+            params[f"after_{col}"] = values[i]
+        where.append("(" + " OR ".join(clauses) + ")")
+
+    query = text(f"""
+        SELECT TOP (:limit) {", ".join(fields)}
+        FROM dbo.{table}
+        WHERE {" AND ".join(where)}
+        ORDER BY {", ".join(order_cols)}
+    """)
+
+    engine = conn_mgr.get_sqlalchemy_engine("lineage")
+    with engine.connect() as conn:
+        rows = [dict(row) for row in conn.execute(query, params).mappings()]
+
+    next_cursor = None
+    if len(rows) == params["limit"]:
+        next_cursor = _encode_cursor([rows[-1][c] for c in order_cols])
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+@router.get("/lineage/columns")
+def query_column_lineage(
+    target_table: str | None = None,
+    target_column: str | None = None,
+    source_full: str | None = None,
+    source_table: str | None = None,
+    source_column: str | None = None,
+    database: str | None = None,
+    procedure_name: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+):
+    """Column mappings from lineage_map: who writes target_table[.column], who reads source_full/source_table[.column]."""
+    try:
+        return keyset_page(
+            "lineage_map", COLUMN_FIELDS, COLUMN_INDEXES,
+            filters={
+                "target_table": target_table,
+                "target_column": target_column,
+                "source_full": source_full,
+                "source_table": source_table,
+                "source_column": source_column,
+            },
+            residual={"database_name": database, "procedure_name": procedure_name},
+            cursor=cursor,
+            limit=limit,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/lineage/tables")
+def query_table_lineage(
+    table: str,
+    schema: str | None = None,
+    role: str = Query("any", pattern="^(any|source|target)$"),
+    database: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+):
+    """Procedures that read (role=source) or write (role=target) a table, from lineage_table_map."""
+    try:
+        return keyset_page(
+            "lineage_table_map", TABLE_FIELDS, TABLE_INDEXES,
+            filters={"referenced_table": table, "referenced_schema": schema},
+            residual={
+                "database_name": database,
+                "is_target": None if role == "any" else int(role == "target"),
+            },
+            cursor=cursor,
+            limit=limit,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,10 @@
+# backend/api/metrics.py
+from fastapi import APIRouter, Response
+from utils.metrics import render_latest
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
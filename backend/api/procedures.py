@@ -1,21 +1,36 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from sqlalchemy import text
-from connections.manager import ConnectionManager
+from connections.manager import get_connection_manager
+from storage.shared_cache import CATALOG_TTL_SECONDS, get_shared_cache
+from utils.http_cache import data_version, versioned_response
 
 router = APIRouter()
-conn_mgr = ConnectionManager()
+conn_mgr = get_connection_manager()
+
+def _scan_procedures(alias: str) -> list:
+    engine = conn_mgr.get_sqlalchemy_engine(alias)
+    with engine.connect() as conn:
+        result = conn.execute(text("""
+            SELECT name 
+            FROM sys.procedures 
+            ORDER BY name
+        """))
+        return [row[0] for row in result]
+
+def cached_procedures(alias: str, version: str | None = None, refresh: bool = False) -> list:
+    cache = get_shared_cache()
+    key = alias if version is None else f"{alias}:{version}"
+    if refresh:
+        cache.invalidate("procedures", key)
+    return cache.get_or_compute("procedures", key, lambda: _scan_procedures(alias), CATALOG_TTL_SECONDS)
 
 @router.get("/procedures/{alias}")
-def list_procedures(alias: str):
+def list_procedures(alias: str, request: Request, refresh: bool = False):
     try:
-        engine = conn_mgr.get_sqlalchemy_engine(alias)
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT name 
-                FROM sys.procedures 
-                ORDER BY name
-            """))
-            return [row[0] for row in result]
+        version = data_version(conn_mgr.get_sqlalchemy_engine(alias), "procedures")
+        return versioned_response(
+            request, ("procedures", alias), version, lambda: cached_procedures(alias, version, refresh)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,29 @@
+# backend/api/profiles.py
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+from utils import profiling, slow_query
+
+def require_profile_token(x_profile: str | None = Header(None)):
+    """Profiles and slow statements show internals: same X-Profile token as profiling."""
+    token = profiling.profile_token()
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiling.token_matches(token, x_profile):
+        raise HTTPException(status_code=403, detail="X-Profile token required")
+
+router = APIRouter(prefix="/debug", include_in_schema=False, dependencies=[Depends(require_profile_token)])
+
+@router.get("/profiles")
+def list_profiles():
+    return profiling.list_reports()
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, format: str = Query("txt", pattern="^(txt|folded)$")):
+    path = profiling.report_path(profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.{format}")
+
+@router.get("/slow-queries")
+def recent_slow_queries():
+    return list(reversed(slow_query.RECENT))
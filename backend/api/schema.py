@@ -1,45 +1,69 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from sqlalchemy import inspect
-from connections.manager import ConnectionManager
+from connections.manager import get_connection_manager
+from storage.shared_cache import CATALOG_TTL_SECONDS, get_shared_cache
+from utils.http_cache import data_version, versioned_response
 
 router = APIRouter()
-conn_mgr = ConnectionManager()
+conn_mgr = get_connection_manager()
 
 @router.get("/connections")
 def list_connections():
     return list(conn_mgr.connections.keys())
 
+def _scan_tables(alias: str) -> list:
+    engine = conn_mgr.get_sqlalchemy_engine(alias)
+    inspector = inspect(engine)
+    tables = []
+    for schema_name in inspector.get_schema_names():
+        for table_name in inspector.get_table_names(schema=schema_name):
+            tables.append(f"{schema_name}.{table_name}")
+    return sorted(tables)
+
+def cached_tables(alias: str, version: str | None = None, refresh: bool = False) -> list:
+    # Catalog scans are shared by all workers; refresh=true forces a rescan.
+    # Keyed by catalog version when known, so a changed catalog is never served stale.
+    cache = get_shared_cache()
+    key = alias if version is None else f"{alias}:{version}"
+    if refresh:
+        cache.invalidate("tables", key)
+    return cache.get_or_compute("tables", key, lambda: _scan_tables(alias), CATALOG_TTL_SECONDS)
+
 @router.get("/tables/{alias}")
-def list_tables(alias: str):
+def list_tables(alias: str, request: Request, refresh: bool = False):
     try:
-        engine = conn_mgr.get_sqlalchemy_engine(alias)
-        inspector = inspect(engine)
-        tables = []
-        for schema_name in inspector.get_schema_names():
-            for table_name in inspector.get_table_names(schema=schema_name):
-                tables.append(f"{schema_name}.{table_name}")
-        return sorted(tables)
+        version = data_version(conn_mgr.get_sqlalchemy_engine(alias), "tables")
+        return versioned_response(
+            request, ("tables", alias), version, lambda: cached_tables(alias, version, refresh)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _scan_columns(alias: str, table: str) -> list:
+    engine = conn_mgr.get_sqlalchemy_engine(alias)
+    inspector = inspect(engine)
+    if '.' in table:
+        schema_name, table_name = table.split('.', 1)
+    else:
+        schema_name, table_name = None, table
+    raw_columns = inspector.get_columns(table_name, schema=schema_name)
+    return [
+        {
+            "name": col["name"],
+            "type": str(col["type"]),
+            "nullable": col.get("nullable", False),
+            "default": col.get("default")
+        }
+        for col in raw_columns
+    ]
+
 @router.get("/tables/{alias}/{table}/columns")
-def list_columns(alias: str, table: str):
+def list_columns(alias: str, table: str, refresh: bool = False):
     try:
-        engine = conn_mgr.get_sqlalchemy_engine(alias)
-        inspector = inspect(engine)
-        if '.' in table:
-            schema_name, table_name = table.split('.', 1)
-        else:
-            schema_name, table_name = None, table
-        raw_columns = inspector.get_columns(table_name, schema=schema_name)
-        return [
-            {
-                "name": col["name"],
-                "type": str(col["type"]),
-                "nullable": col.get("nullable", False),
-                "default": col.get("default")
-            }
-            for col in raw_columns
-        ]
+        cache = get_shared_cache()
+        key = f"{alias}:{table}"
+        if refresh:
+            cache.invalidate("columns", key)
+        return cache.get_or_compute("columns", key, lambda: _scan_columns(alias, table), CATALOG_TTL_SECONDS)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,41 @@
+# backend/api/search.py
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from storage import search_index
+
+router = APIRouter()
+
+
+@router.get("/search")
+def search_procedures(
+    q: str = Query(..., min_length=1),
+    alias: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+):
+    try:
+        return {"query": q, "results": search_index.search(q, alias, limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search/references")
+def search_references(
+    table: str,
+    column: Optional[str] = None,
+    schema: Optional[str] = None,
+    alias: Optional[str] = None,
+    access: Optional[str] = Query(None, pattern="^(read|write)$"),
+):
+    try:
+        return search_index.find_references(table, column, schema, alias, access)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/search/refresh")
+async def refresh_search_index(alias: Optional[str] = None):
+    try:
+        return await run_in_threadpool(search_index.refresh, [alias] if alias else None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
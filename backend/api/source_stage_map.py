@@ -1,18 +1,26 @@
 # backend/api/source_stage_map.py
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Query, Request
+from rapidfuzz import fuzz
 from sqlalchemy import text
-from connections.manager import ConnectionManager
+from connections.manager import get_connection_manager
+from storage.mapping_sync import sync_mappings
+from utils.column_similarity import ColumnSetIndex
+from utils.http_cache import data_version, versioned_response
 
 router = APIRouter()
-conn_mgr = ConnectionManager()
+conn_mgr = get_connection_manager()
 
-@router.get("/source-to-stage-map")
-def list_source_to_stage_mappings():
-    engine = conn_mgr.get_sqlalchemy_engine("lineage")
+def _read_mappings(engine) -> list:
     with engine.connect() as conn:
         result = conn.execute(text("SELECT * FROM source_to_stage_map ORDER BY source_type, source_schema, source_table"))
-        rows = [dict(row._mapping) for row in result]
-        return rows
+        return [dict(row._mapping) for row in result]
+
+@router.get("/source-to-stage-map")
+def list_source_to_stage_mappings(request: Request):
+    engine = conn_mgr.get_sqlalchemy_engine("lineage")
+    version = data_version(engine, "source_to_stage_map")
+    return versioned_response(request, ("source_to_stage_map",), version, lambda: _read_mappings(engine))
 
 @router.post("/source-to-stage-map")
 def add_mapping(mapping: dict):
@@ -32,66 +40,142 @@ def add_mapping(mapping: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def get_table_signatures(engine):
-    result = []
+def get_table_signatures(engine, with_types: bool = False):
+    """
+    (schema, table, columns) for every base table, from one catalog query.
+    Columns are lowercased names, or (name, data_type) pairs with `with_types`.
+    """
+    signatures = {}
     with engine.connect() as conn:
-        tables = conn.execute(text("""
-            SELECT TABLE_SCHEMA, TABLE_NAME
-            FROM INFORMATION_SCHEMA.TABLES
-            WHERE TABLE_TYPE = 'BASE TABLE'
-        """)).fetchall()
-
-        for schema, table in tables:
-            cols = conn.execute(text(f"""
-                SELECT COLUMN_NAME
-                FROM INFORMATION_SCHEMA.COLUMNS
-                WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table
-                ORDER BY ORDINAL_POSITION
-            """), {"schema": schema, "table": table}).fetchall()
-            col_names = [c[0].lower() for c in cols]
-            result.append((schema, table, col_names))
-
-    return result
+        rows = conn.execute(text("""
+            SELECT c.TABLE_SCHEMA, c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE
+            FROM INFORMATION_SCHEMA.COLUMNS c
+            JOIN INFORMATION_SCHEMA.TABLES t
+              ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+            WHERE t.TABLE_TYPE = 'BASE TABLE'
+            ORDER BY c.TABLE_SCHEMA, c.TABLE_NAME, c.ORDINAL_POSITION
+        """))
+        for schema, table, column, data_type in rows:
+            name = column.lower()
+            signatures.setdefault((schema, table), []).append((name, data_type) if with_types else name)
+
+    return [(schema, table, cols) for (schema, table), cols in signatures.items()]
+
+def build_stage_index(stage_tables, with_types: bool = False) -> ColumnSetIndex:
+    index = ColumnSetIndex(with_types=with_types)
+    for schema, table, cols in stage_tables:
+        index.add((schema, table), cols)
+    return index
+
+def best_stage_match(index: ColumnSetIndex, s_table: str, s_cols, min_jaccard: float):
+    """
+    Best candidate above the threshold: a same-named table wins, then the
+    highest Jaccard, then table-name similarity (tables like lookups often
+    share an identical column set).
+    """
+    candidates = index.query(s_cols, k=None, min_jaccard=min_jaccard)
+    if not candidates:
+        return None
+    name = s_table.lower()
+    (t_schema, t_table), score = max(
+        candidates, key=lambda c: (c[0][1].lower() == name, c[1], fuzz.ratio(name, c[0][1].lower()))
+    )
+    return t_schema, t_table, score
+
+@router.get("/source-to-stage/candidates/{alias}")
+def stage_candidates(
+    alias: str,
+    table: str,
+    k: int = Query(5, ge=1, le=50),
+    min_jaccard: float = Query(0.3, ge=0.0, le=1.0),
+    with_types: bool = False,
+):
+    """
+    Top-k stage tables for one source table (schema.table) by column-set
+    Jaccard. Thresholds below what the LSH bands reliably recall are
+    answered by an exact scan of the stage tables.
+    """
+    try:
+        schema_name, _, table_name = table.rpartition(".")
+        source = next(
+            (cols for s, t, cols in get_table_signatures(conn_mgr.get_sqlalchemy_engine(alias), with_types)
+             if t.lower() == table_name.lower() and (not schema_name or s.lower() == schema_name.lower())),
+            None,
+        )
+        if source is None:
+            raise HTTPException(status_code=404, detail=f"Table not found: {table}")
+
+        index = build_stage_index(get_table_signatures(conn_mgr.get_sqlalchemy_engine("Stage"), with_types), with_types)
+        return [
+            {"stage_schema": t_schema, "stage_table": t_table, "jaccard": round(score, 4)}
+            for (t_schema, t_table), score in index.query(source, k=k, min_jaccard=min_jaccard)
+        ]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/source-to-stage/auto-map")
-def auto_map_source_to_stage():
+def auto_map_source_to_stage(
+    delete_missing: bool = False,
+    min_jaccard: float = 0.7,
+    with_types: bool = False,
+):
+    """
+    Map each source table to the stage table whose column set is most
+    similar (Jaccard >= min_jaccard, found through an LSH index rather than
+    pairwise comparison). min_jaccard=1 keeps only identical column sets.
+    """
     try:
         stage_engine = conn_mgr.get_sqlalchemy_engine("Stage")
+        stage_database = conn_mgr.connections["Stage"].get("database")
 
-        stage_tables = get_table_signatures(stage_engine)
+        stage_index = build_stage_index(get_table_signatures(stage_engine, with_types), with_types)
         mapped_rows = []
+        approximate = 0
+        synced_aliases = []
 
         for alias, config in conn_mgr.connections.items():
-            if config.get("type") != "source":
+            if config.get("role") != "source":
                 continue
+            synced_aliases.append(alias)
 
             source_engine = conn_mgr.get_sqlalchemy_engine(alias)
-            source_tables = get_table_signatures(source_engine)
+            source_tables = get_table_signatures(source_engine, with_types)
 
             for (s_schema, s_table, s_cols) in source_tables:
-                for (t_schema, t_table, t_cols) in stage_tables:
-                    if s_table.lower() == t_table.lower() and set(s_cols) == set(t_cols):
-                        mapped_rows.append({
-                            "source_alias": alias,
-                            "source_schema": s_schema,
-                            "source_table": s_table,
-                            "stage_schema": t_schema,
-                            "stage_table": t_table
-                        })
-
-        # Save to DB
+                match = best_stage_match(stage_index, s_table, s_cols, min_jaccard)
+                if match is None:
+                    continue
+                t_schema, t_table, score = match
+                approximate += score < 1.0 or s_table.lower() != t_table.lower()
+                mapped_rows.append({
+                    "connection_name": alias,
+                    "source_type": config.get("type"),
+                    "source_database": config.get("database"),
+                    "source_schema": s_schema,
+                    "source_table": s_table,
+                    "stage_database": stage_database,
+                    "stage_schema": t_schema,
+                    "stage_table": t_table
+                })
+
+        # Sync to DB: one MERGE keyed on the source table, scoped to the aliases scanned
         lineage_engine = conn_mgr.get_sqlalchemy_engine("lineage")
         with lineage_engine.begin() as conn:
-            for row in mapped_rows:
-                conn.execute(text("""
-                    INSERT INTO source_to_stage_map (
-                        source_alias, source_schema, source_table,
-                        stage_schema, stage_table
-                    )
-                    VALUES (:source_alias, :source_schema, :source_table, :stage_schema, :stage_table)
-                """), row)
+            counts = sync_mappings(
+                conn,
+                "source_to_stage_map",
+                key_cols=["connection_name", "source_schema", "source_table"],
+                value_cols=["source_type", "source_database", "stage_database", "stage_schema", "stage_table"],
+                rows=mapped_rows,
+                delete_missing=delete_missing,
+                scope={"connection_name": synced_aliases},
+                # Written rows move the listing's version (and export watermark)
+                stamp={"created_at": datetime.utcnow()},
+            )
 
-        return {"mapped": len(mapped_rows)}
+        return {"mapped": len(mapped_rows), "approximate": approximate, **counts}
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
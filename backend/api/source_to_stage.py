@@ -2,11 +2,11 @@
 from fastapi import APIRouter, HTTPException
 from sqlalchemy import text
 from models.source_stage import SourceToStageRecord
-from connections.manager import ConnectionManager
+from connections.manager import get_connection_manager
 from datetime import datetime
 
 router = APIRouter(prefix="/source-to-stage-map", tags=["source-to-stage"])
-conn_mgr = ConnectionManager()
+conn_mgr = get_connection_manager()
 
 @router.post("/")
 def add_source_to_stage_mapping(record: SourceToStageRecord):
@@ -1,10 +1,10 @@
 # api/source_to_stage_discovery.py
 from fastapi import APIRouter, HTTPException
 from sqlalchemy import text
-from connections.manager import ConnectionManager
+from connections.manager import get_connection_manager
 
 router = APIRouter()
-conn_mgr = ConnectionManager()
+conn_mgr = get_connection_manager()
 
 @router.post("/source-to-stage/discover/{source_alias}")
 def discover_stage_mappings(source_alias: str, stage_alias: str):
@@ -1,11 +1,11 @@
 # backend/api/sources.py
 from fastapi import APIRouter, HTTPException
 from sqlalchemy import text
-from connections.manager import ConnectionManager
+from connections.manager import get_connection_manager
 from datetime import datetime
 
 router = APIRouter()
-conn_mgr = ConnectionManager()
+conn_mgr = get_connection_manager()
 
 @router.post("/sources/discover")
 def discover_source_tables():
@@ -1,10 +1,10 @@
 # backend/api/stage_bronze.py
 from fastapi import APIRouter, HTTPException
 from sqlalchemy import text
-from connections.manager import ConnectionManager
+from connections.manager import get_connection_manager
 
 router = APIRouter(prefix="/stage-to-bronze-map", tags=["stage-to-bronze"])
-conn_mgr = ConnectionManager()
+conn_mgr = get_connection_manager()
 
 @router.get("/suggest")
 def suggest_stage_to_bronze():
@@ -1,13 +1,13 @@
 # backend/api/stage_to_bronze.py
 
 from fastapi import APIRouter
-from connections.manager import ConnectionManager
+from connections.manager import get_connection_manager
 from sqlalchemy import text
 from rapidfuzz import fuzz  # ✅ Add this
 from datetime import datetime
 
 router = APIRouter(prefix="/stage-to-bronze-map", tags=["stage-to-bronze"])
-conn_mgr = ConnectionManager()
+conn_mgr = get_connection_manager()
 
 @router.get("/suggest")
 def suggest_stage_to_bronze_map():
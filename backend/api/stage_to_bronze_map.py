@@ -1,12 +1,13 @@
+from datetime import datetime
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List
 from sqlalchemy.sql import text
-from datetime import datetime
-from connections.manager import ConnectionManager
+from connections.manager import get_connection_manager
+from storage.mapping_sync import sync_mappings
 
 router = APIRouter(prefix="/stage-to-bronze-map", tags=["stage-to-bronze"])
-conn_mgr = ConnectionManager()
+conn_mgr = get_connection_manager()
 
 class StageToBronzeMapping(BaseModel):
     stage_database: str
@@ -47,30 +48,22 @@ def suggest_stage_to_bronze():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/stage-to-bronze-map/bulk")
-def save_stage_to_bronze_bulk(mappings: List[StageToBronzeMapping]):
+def save_stage_to_bronze_bulk(mappings: List[StageToBronzeMapping], delete_missing: bool = False):
     try:
         engine = conn_mgr.get_sqlalchemy_engine("lineage")
-        now = datetime.utcnow()
         with engine.begin() as conn:
-            for m in mappings:
-                conn.execute(text("""
-                    INSERT INTO stage_to_bronze_map (
-                        stage_database, stage_schema, stage_table,
-                        bronze_database, bronze_schema, bronze_table,
-                        created_at
-                    )
-                    VALUES (:stage_db, :stage_schema, :stage_table,
-                            :bronze_db, :bronze_schema, :bronze_table,
-                            :created_at)
-                """), {
-                    "stage_db": m.stage_database,
-                    "stage_schema": m.stage_schema,
-                    "stage_table": m.stage_table,
-                    "bronze_db": m.bronze_database,
-                    "bronze_schema": m.bronze_schema,
-                    "bronze_table": m.bronze_table,
-                    "created_at": now
-                })
-        return {"status": "success", "rows": len(mappings)}
+            # Keyed on the stage table; deletions are limited to the stage databases submitted
+            counts = sync_mappings(
+                conn,
+                "stage_to_bronze_map",
+                key_cols=["stage_database", "stage_schema", "stage_table"],
+                value_cols=["bronze_database", "bronze_schema", "bronze_table"],
+                rows=[m.dict() for m in mappings],
+                delete_missing=delete_missing,
+                scope={"stage_database": sorted({m.stage_database for m in mappings})},
+                # Written rows move the export watermark
+                stamp={"created_at": datetime.utcnow()},
+            )
+        return {"status": "success", "rows": len(mappings), **counts}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,233 @@
+# backend/benchmarks/run.py
+"""
+Offline benchmark suite. Builds synthetic SQLite warehouses, points every
+router's ConnectionManager at them, swaps the LLM for a latency-injecting
+stub and times the hot paths at several scales.
+
+    cd backend
+    python -m benchmarks.run --scales 200,1000,5000 --llm-latency-ms 20
+    python -m benchmarks.run --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.synthetic import CACHE_DDL, LINEAGE_DDL, build_store, build_warehouse  # noqa: E402
+from benchmarks.stub_llm import StubLLM  # noqa: E402
+from connections.manager import get_connection_manager  # noqa: E402
+from utils.metrics import instrument_engine  # noqa: E402
+
+ROUTER_MODULES = [
+    "api.schema",
+    "api.procedures",
+    "api.analyze_status",
+    "api.lineage_bulk",
+    "api.source_stage_map",
+    "api.stage_to_bronze",
+]
+
+
+def install_overrides(engines: dict, stub: StubLLM) -> dict:
+    """Point every router's ConnectionManager and the cache engine at the stand-ins."""
+    import importlib
+
+    modules = {name: importlib.import_module(name) for name in ROUTER_MODULES}
+    get_connection_manager().cache.update(engines)
+
+    cache_engine = lambda: engines["cache"]  # noqa: E731
+    importlib.import_module("storage.procedure_cache").get_cache_engine = cache_engine
+    modules["api.analyze_status"].get_cache_engine = cache_engine
+    importlib.import_module("storage.bulk_plan").get_cache_engine = cache_engine
+
+    importlib.import_module("agents.lineage_agent").call_model = stub.call_model
+    importlib.import_module("api.analyze").get_llm = stub.get_llm
+    return modules
+
+
+def build_engines(directory: str, scale: int) -> dict:
+    procedures = max(scale // 5, 1)
+    engines = {
+        "CRM_SQL": build_warehouse(directory, "CRM_SQL", scale, procedures, seed=1),
+        "Stage": build_warehouse(directory, "Stage", scale, procedures, seed=1, audit_columns=0.4),
+        "Bronze": build_warehouse(directory, "Bronze", scale, procedures, seed=1, rename=True),
+        "Silver": build_warehouse(directory, "Silver", scale, procedures, seed=1),
+        "lineage": build_store(directory, "lineage", LINEAGE_DDL),
+        "cache": build_store(directory, "cache", CACHE_DDL),
+    }
+    for alias, engine in engines.items():
+        instrument_engine(engine, alias)
+    return engines
+
+
+def seed_cache(engines: dict, alias: str, share: float = 0.5) -> None:
+    """Mark a share of procedures as analyzed so /analyze/status sees all three states."""
+    from sqlalchemy import text
+    from storage.procedure_cache import hash_procedure
+
+    with engines[alias].connect() as conn:
+        rows = conn.execute(text("""
+            SELECT p.name, sm.definition
+            FROM sys.procedures p JOIN sys.sql_modules sm ON p.object_id = sm.object_id
+        """)).fetchall()
+    cutoff = int(len(rows) * share)
+    with engines["cache"].begin() as conn:
+        conn.execute(text("""
+            INSERT INTO procedure_analysis_cache (db_alias, procedure_name, proc_hash, summary)
+            VALUES (:alias, :name, :hash, 'seeded')
+        """), [
+            {"alias": alias, "name": name,
+             "hash": hash_procedure(body) if i % 2 else "0" * 64}
+            for i, (name, body) in enumerate(rows[:cutoff])
+        ])
+
+
+def timed(fn, repeat: int) -> dict:
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return {
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "samples_s": samples,
+        # Count-style responses (auto-map, bulk) are kept whole; listings by size.
+        "result": result if isinstance(result, dict) and len(result) <= 10 else None,
+        "result_size": len(result) if hasattr(result, "__len__") else None,
+    }
+
+
+def run_scale(scale: int, args) -> list[dict]:
+    from models.lineage import BulkLineageRequest
+
+    stub = StubLLM(latency_ms=args.llm_latency_ms, jitter=args.llm_jitter)
+    with tempfile.TemporaryDirectory(prefix=f"dwbench_{scale}_") as directory:
+        started = time.perf_counter()
+        engines = build_engines(directory, scale)
+        seed_cache(engines, "CRM_SQL")
+        setup_s = time.perf_counter() - started
+        m = install_overrides(engines, stub)
+
+        cases = {
+            "catalog_tables": lambda: m["api.schema"].cached_tables("CRM_SQL"),
+            "catalog_procedures": lambda: m["api.procedures"].cached_procedures("CRM_SQL"),
+            "analyze_status": lambda: m["api.analyze_status"].get_analysis_status("CRM_SQL"),
+            "fuzzy_match": lambda: m["api.stage_to_bronze"].suggest_stage_to_bronze_map(),
+            "auto_map": lambda: m["api.source_stage_map"].auto_map_source_to_stage(delete_missing=False),
+        }
+        results = []
+        for name, fn in cases.items():
+            if args.only and name not in args.only:
+                continue
+            entry = timed(fn, args.repeat)
+            results.append({"benchmark": name, "scale": scale, **entry})
+            print(f"  {name:<20} scale={scale:<6} median={entry['median_s']:.4f}s")
+
+        if not args.only or "bulk_lineage" in args.only:
+            calls_before = stub.calls
+            request = BulkLineageRequest(alias="CRM_SQL", schema="dbo")
+            entry = timed(lambda: m["api.lineage_bulk"].bulk_analyze_by_schema(request), 1)
+            entry["llm_calls"] = stub.calls - calls_before
+            entry["llm_floor_s"] = entry["llm_calls"] * args.llm_latency_ms / 1000.0
+            results.append({"benchmark": "bulk_lineage", "scale": scale, **entry})
+            print(f"  {'bulk_lineage':<20} scale={scale:<6} median={entry['median_s']:.4f}s "
+                  f"({entry['llm_calls']} LLM calls)")
+
+        if not args.only or "bulk_analysis" in args.only:
+            calls_before, chars_before = stub.calls, stub.prompt_chars
+            request = BulkLineageRequest(alias="Stage", schema="dbo")
+            entry = timed(lambda: m["api.lineage_bulk"].bulk_summary_and_lineage_by_schema(request), 1)
+            entry["llm_calls"] = stub.calls - calls_before
+            entry["prompt_chars"] = stub.prompt_chars - chars_before
+            entry["llm_floor_s"] = entry["llm_calls"] * args.llm_latency_ms / 1000.0
+            results.append({"benchmark": "bulk_analysis", "scale": scale, **entry})
+            print(f"  {'bulk_analysis':<20} scale={scale:<6} median={entry['median_s']:.4f}s "
+                  f"({entry['llm_calls']} LLM calls)")
+
+        for engine in engines.values():
+            engine.dispose()
+        for result in results:
+            result["setup_s"] = setup_s
+        return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def compare(previous_path: str, current: dict) -> None:
+    with open(previous_path) as f:
+        previous = json.load(f)
+    before = {(r["benchmark"], r["scale"]): r["median_s"] for r in previous["results"]}
+    print(f"\n{'benchmark':<20} {'scale':>6} {'before':>10} {'after':>10} {'ratio':>7}")
+    for r in current["results"]:
+        old = before.get((r["benchmark"], r["scale"]))
+        if old is None:
+            continue
+        ratio = r["median_s"] / old if old else float("inf")
+        print(f"{r['benchmark']:<20} {r['scale']:>6} {old:>10.4f} {r['median_s']:>10.4f} {ratio:>6.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="200,1000,5000", help="comma-separated table counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0)
+    parser.add_argument("--llm-jitter", type=float, default=0.3, help="lognormal sigma for stub latency")
+    parser.add_argument("--only", type=lambda s: set(s.split(",")), default=None)
+    parser.add_argument("--output", default=None, help="JSON results path")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    # Cases measure the uncached paths; warehouses at every scale reuse the
+    # same aliases, so a shared catalog cache would also leak across scales.
+    os.environ["SHARED_CACHE_BACKEND"] = "off"
+
+    results = []
+    for scale in (int(s) for s in args.scales.split(",")):
+        print(f"scale {scale}")
+        results.extend(run_scale(scale, args))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: (sorted(v) if isinstance(v, set) else v) for k, v in vars(args).items()},
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        BACKEND_DIR, "benchmarks", "results",
+        f"{datetime.utcnow():%Y%m%dT%H%M%S}_{report['meta']['git_revision'] or 'local'}.json",
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {output}")
+
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
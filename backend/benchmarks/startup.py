@@ -0,0 +1,87 @@
+# backend/benchmarks/startup.py
+"""
+Import-time budget check for worker startup. Imports `main` in fresh
+interpreters under `-X importtime`, reports the heaviest packages
+by self time, and fails if the median exceeds the budget or if modules that
+must stay lazy (LLM SDKs) are imported eagerly.
+
+    cd backend
+    python -m benchmarks.startup --budget-ms 1000
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Built lazily by utils.llm.get_client / llm.azure_client.get_llm.
+LAZY_MODULES = ("openai", "langchain_openai", "langchain_core", "langchain", "tiktoken")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+PROBE = (
+    "import sys, main; "
+    f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+)
+
+
+def measure_once() -> tuple[float, dict, list[str]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "0"},
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+
+    total_us, packages = 0, defaultdict(int)
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        if len(indent) == 1:
+            # Top-level entries partition the whole import tree.
+            total_us += int(cumulative_us)
+        packages[module.split(".")[0]] += int(self_us)
+    eager = [m for m in proc.stdout.strip().split(",") if m]
+    return total_us / 1000.0, packages, eager
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "1000")))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    measure_once()  # warm the bytecode cache so runs are comparable
+    samples, packages, eager = [], defaultdict(list), []
+    for _ in range(args.runs):
+        total_ms, per_package, eager = measure_once()
+        samples.append(total_ms)
+        for name, us in per_package.items():
+            packages[name].append(us / 1000.0)
+
+    median = statistics.median(samples)
+    print(f"import main: median {median:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    heaviest = sorted(packages.items(), key=lambda kv: statistics.median(kv[1]), reverse=True)
+    for name, values in heaviest[:args.top]:
+        print(f"  {name:<28} {statistics.median(values):>8.1f} ms")
+
+    failed = False
+    if eager:
+        print(f"FAIL: imported eagerly, should be lazy: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: import time {median:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
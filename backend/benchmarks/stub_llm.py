@@ -0,0 +1,78 @@
+# backend/benchmarks/stub_llm.py
+"""
+Latency-injecting stand-ins for utils.llm.call_model and
+llm.azure_client.get_llm. Responses are derived from the prompt so the
+parsing and storage paths see realistic lineage JSON.
+"""
+import json
+import random
+import re
+import threading
+import time
+from utils.llm import LLMResponse
+
+_PROC_NAME = re.compile(r"named `([^`]+)`")
+_SOURCE = re.compile(r"FROM\s+([\w\.\[\]]+)", re.IGNORECASE)
+_TARGET = re.compile(r"INSERT\s+INTO\s+([\w\.\[\]]+)", re.IGNORECASE)
+_COLUMN = re.compile(r"(\w+)\s+AS\s+(\w+)", re.IGNORECASE)
+
+
+class StubLLM:
+    def __init__(self, latency_ms: float = 50.0, jitter: float = 0.3, seed: int = 7):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.calls = 0
+        self.prompt_chars = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sleep(self):
+        with self._lock:
+            self.calls += 1
+            factor = self._rng.lognormvariate(0, self.jitter) if self.jitter else 1.0
+        time.sleep(self.latency_ms * factor / 1000.0)
+
+    def lineage_json(self, prompt: str) -> str:
+        sql = prompt.split("SQL Procedure:", 1)[-1]
+        source = _SOURCE.search(sql)
+        target = _TARGET.search(sql)
+        source_table = source.group(1) if source else "dbo.unknown"
+        answer = {}
+        if '"summary":' in prompt:  # combined summary + lineage prompt
+            name = _PROC_NAME.search(prompt)
+            answer["summary"] = f"Loads {name.group(1) if name else 'data'} from staging into the warehouse."
+        return json.dumps({
+            **answer,
+            "source_tables": [source_table],
+            "target_table": target.group(1) if target else "dbo.unknown",
+            "column_mappings": [
+                {"source": src, "target": tgt, "source_table": source_table}
+                for src, tgt in _COLUMN.findall(sql)
+            ],
+        })
+
+    def call_model(self, prompt: str, deployment: str | None = None, response_format: dict | None = None) -> LLMResponse:
+        with self._lock:
+            self.prompt_chars += len(prompt)
+        self._sleep()
+        return LLMResponse(f"```json\n{self.lineage_json(prompt)}\n```")
+
+    def get_llm(self, deployment: str | None = None):
+        return _StubChatModel(self)
+
+
+class _StubMessage:
+    def __init__(self, content: str, prompt: str):
+        self.content = content
+        self.usage_metadata = {"input_tokens": len(prompt) // 4, "output_tokens": len(content) // 4}
+
+
+class _StubChatModel:
+    def __init__(self, stub: StubLLM):
+        self.stub = stub
+
+    def invoke(self, prompt: str, **kwargs):
+        self.stub._sleep()
+        name = _PROC_NAME.search(prompt)
+        summary = f"Loads {name.group(1) if name else 'data'} from staging into the warehouse."
+        return _StubMessage(summary, prompt)
@@ -0,0 +1,216 @@
+# backend/benchmarks/synthetic.py
+"""
+Synthetic warehouses in SQLite that look enough like SQL Server for the
+routers' catalog queries: each alias database ATTACHes stand-ins named
+`sys` (procedures, sql_modules, schemas, tables) and `INFORMATION_SCHEMA`
+(TABLES, COLUMNS), so the production SQL runs unmodified.
+"""
+import os
+import random
+import sqlite3
+from sqlalchemy import create_engine, event
+
+SCHEMAS = ["dbo", "sales", "hr", "finance"]
+AUDIT_COLUMNS = ["load_ts", "batch_id", "record_source"]
+
+CATALOG_DDL = {
+    "sys": [
+        "CREATE TABLE schemas (schema_id INTEGER PRIMARY KEY, name TEXT)",
+        "CREATE TABLE procedures (object_id INTEGER PRIMARY KEY, name TEXT, schema_id INTEGER, modify_date TEXT)",
+        "CREATE TABLE sql_modules (object_id INTEGER PRIMARY KEY, definition TEXT)",
+        "CREATE TABLE tables (object_id INTEGER PRIMARY KEY, name TEXT, schema_id INTEGER, modify_date TEXT)",
+    ],
+    "info": [
+        "CREATE TABLE TABLES (TABLE_SCHEMA TEXT, TABLE_NAME TEXT, TABLE_TYPE TEXT)",
+        "CREATE TABLE COLUMNS (TABLE_SCHEMA TEXT, TABLE_NAME TEXT, COLUMN_NAME TEXT, "
+        "ORDINAL_POSITION INTEGER, DATA_TYPE TEXT)",
+    ],
+}
+
+LINEAGE_DDL = [
+    """CREATE TABLE lineage_map (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        procedure_name TEXT NOT NULL, database_name TEXT NOT NULL, schema_name TEXT NOT NULL,
+        source_table TEXT NOT NULL, target_table TEXT NOT NULL,
+        source_column TEXT NOT NULL, target_column TEXT NOT NULL,
+        source_full TEXT NOT NULL, analyzed_at TIMESTAMP NOT NULL, hash TEXT NOT NULL)""",
+    "CREATE INDEX IX_lineage_map_proc ON lineage_map(procedure_name)",
+    "CREATE INDEX IX_lineage_map_hash ON lineage_map(hash)",
+    """CREATE TABLE lineage_versions (
+        database_name TEXT NOT NULL, procedure_name TEXT NOT NULL, hash TEXT NOT NULL,
+        mappings INTEGER NOT NULL, analyzed_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (database_name, procedure_name))""",
+    """CREATE TABLE source_to_stage_map (
+        source_type TEXT, source_host TEXT, source_tns TEXT, source_database TEXT,
+        source_schema TEXT, source_table TEXT, stage_database TEXT, stage_schema TEXT,
+        stage_table TEXT, connection_name TEXT, notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    "CREATE UNIQUE INDEX UX_source_to_stage_map_key ON source_to_stage_map "
+    "(connection_name, source_schema, source_table)",
+    """CREATE TABLE stage_to_bronze_map (
+        stage_database TEXT NOT NULL, stage_schema TEXT NOT NULL, stage_table TEXT NOT NULL,
+        bronze_database TEXT NOT NULL, bronze_schema TEXT NOT NULL, bronze_table TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    "CREATE UNIQUE INDEX UX_stage_to_bronze_map_key ON stage_to_bronze_map "
+    "(stage_database, stage_schema, stage_table)",
+    """CREATE TABLE lineage_table_map (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        database_name TEXT NOT NULL, procedure_schema TEXT NOT NULL, procedure_name TEXT NOT NULL,
+        referenced_database TEXT, referenced_schema TEXT, referenced_table TEXT NOT NULL,
+        is_target INTEGER NOT NULL DEFAULT 0, analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE procedure_watch_state (
+        alias TEXT PRIMARY KEY, last_modify_date TIMESTAMP,
+        last_polled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE search_documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        alias TEXT NOT NULL, schema_name TEXT NOT NULL, procedure_name TEXT NOT NULL,
+        field TEXT NOT NULL, content_hash TEXT NOT NULL, term_count INTEGER NOT NULL,
+        indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    "CREATE UNIQUE INDEX UX_search_documents_key ON search_documents (alias, schema_name, procedure_name, field)",
+    """CREATE TABLE search_postings (
+        term TEXT NOT NULL, document_id INTEGER NOT NULL, tf INTEGER NOT NULL,
+        PRIMARY KEY (term, document_id))""",
+    "CREATE INDEX IX_search_postings_document ON search_postings (document_id)",
+    """CREATE TABLE search_references (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, document_id INTEGER NOT NULL,
+        ref_schema TEXT, ref_table TEXT NOT NULL, ref_column TEXT, access TEXT NOT NULL)""",
+    "CREATE INDEX IX_search_references_table ON search_references (ref_table, ref_column)",
+    "CREATE INDEX IX_search_references_document ON search_references (document_id)",
+    """CREATE TABLE bulk_plans (
+        plan_id TEXT PRIMARY KEY, alias TEXT NOT NULL, schema_name TEXT, mode TEXT NOT NULL,
+        created_at TIMESTAMP NOT NULL, executed_at TIMESTAMP, plan TEXT NOT NULL)""",
+]
+
+CACHE_DDL = [
+    """CREATE TABLE procedure_analysis_cache (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        db_alias TEXT NOT NULL, procedure_name TEXT NOT NULL, proc_hash TEXT NOT NULL,
+        summary TEXT NOT NULL, analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    "CREATE UNIQUE INDEX UX_proc_cache_key ON procedure_analysis_cache (db_alias, procedure_name, proc_hash)",
+    "CREATE INDEX IX_proc_cache_versions ON procedure_analysis_cache (db_alias, procedure_name, analyzed_at DESC)",
+]
+
+
+def sqlite_engine(path: str, attach: dict | None = None):
+    """Engine over a SQLite file with the given {schema_name: file} databases attached."""
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def _functions(dbapi_conn, record):
+        # SQL Server's DATALENGTH of an nvarchar: two bytes per character
+        dbapi_conn.create_function("DATALENGTH", 1, lambda v: None if v is None else 2 * len(v))
+
+    if attach:
+        @event.listens_for(engine, "connect")
+        def _attach(dbapi_conn, record):
+            for name, file in attach.items():
+                dbapi_conn.execute(f"ATTACH DATABASE '{file}' AS \"{name}\"")
+    return engine
+
+
+def _table_spec(rng: random.Random, index: int) -> tuple[str, str, list[str]]:
+    schema = SCHEMAS[index % len(SCHEMAS)]
+    table = f"tbl_{index:05d}"
+    columns = ["id"] + [f"col_{index % 97}_{c}" for c in range(rng.randint(4, 24))]
+    return schema, table, columns
+
+
+def procedure_definition(name: str, source: str, target: str, columns: list[str], padding: int) -> str:
+    select_list = ",\n        ".join(f"{c} AS {c}" for c in columns)
+    filler = "\n".join(f"    -- step {i}: reconcile control totals" for i in range(padding))
+    return (
+        f"CREATE PROCEDURE {name} AS\nBEGIN\n"
+        f"    SELECT\n        {select_list}\n    INTO #work\n    FROM {source};\n"
+        f"{filler}\n"
+        f"    INSERT INTO {target} ({', '.join(columns)})\n"
+        f"    SELECT {', '.join(columns)} FROM #work;\nEND"
+    )
+
+
+def build_warehouse(
+    directory: str,
+    alias: str,
+    tables: int,
+    procedures: int,
+    seed: int = 42,
+    rename: bool = False,
+    audit_columns: float = 0.0,
+    proc_padding: int = 40,
+):
+    """
+    Create `tables` tables (real SQLite tables plus INFORMATION_SCHEMA rows) and
+    `procedures` procedures in sys.* for one alias. `rename` perturbs table
+    names for fuzzy matching; `audit_columns` is the share of tables that get
+    extra load columns, as stage copies of source tables usually do.
+    """
+    rng = random.Random(seed)
+    # Perturbations draw from their own stream so warehouses built from the
+    # same seed share table shapes and differ only where asked to.
+    perturb = random.Random(f"{seed}:{alias}")
+    main_path = os.path.join(directory, f"{alias}.db")
+    sys_path = os.path.join(directory, f"{alias}_sys.db")
+    info_path = os.path.join(directory, f"{alias}_info.db")
+
+    specs = []
+    for i in range(tables):
+        schema, table, columns = _table_spec(rng, i)
+        if rename and perturb.random() < 0.3:
+            table = table.replace("tbl_", "tbl") + "_v"
+        if audit_columns and perturb.random() < audit_columns:
+            columns = columns + AUDIT_COLUMNS
+        specs.append((schema, table, columns))
+
+    with sqlite3.connect(main_path) as main:
+        main.executescript("".join(
+            f"CREATE TABLE \"{schema}_{table}\" ({', '.join(columns)});\n"
+            for schema, table, columns in specs
+        ))
+
+    with sqlite3.connect(info_path) as info:
+        for ddl in CATALOG_DDL["info"]:
+            info.execute(ddl)
+        info.executemany(
+            "INSERT INTO TABLES VALUES (?, ?, 'BASE TABLE')",
+            [(schema, table) for schema, table, _ in specs],
+        )
+        info.executemany(
+            "INSERT INTO COLUMNS VALUES (?, ?, ?, ?, 'nvarchar')",
+            [(schema, table, col, pos + 1)
+             for schema, table, columns in specs
+             for pos, col in enumerate(columns)],
+        )
+
+    with sqlite3.connect(sys_path) as sys_db:
+        for ddl in CATALOG_DDL["sys"]:
+            sys_db.execute(ddl)
+        sys_db.executemany(
+            "INSERT INTO schemas VALUES (?, ?)",
+            [(i + 1, name) for i, name in enumerate(SCHEMAS)],
+        )
+        sys_db.executemany(
+            "INSERT INTO tables VALUES (?, ?, ?, '2024-01-01 00:00:00')",
+            [(i + 1, table, SCHEMAS.index(schema) + 1) for i, (schema, table, _) in enumerate(specs)],
+        )
+        procs, modules = [], []
+        for i in range(procedures):
+            s_schema, s_table, s_cols = specs[rng.randrange(len(specs))]
+            t_schema, t_table, _ = specs[rng.randrange(len(specs))]
+            name = f"usp_load_{i:05d}"
+            schema_id = SCHEMAS.index(t_schema) + 1
+            procs.append((i + 1, name, schema_id, "2024-01-01 00:00:00"))
+            modules.append((i + 1, procedure_definition(
+                f"{t_schema}.{name}", f"{s_schema}.{s_table}", f"{t_schema}.{t_table}",
+                s_cols, proc_padding,
+            )))
+        sys_db.executemany("INSERT INTO procedures VALUES (?, ?, ?, ?)", procs)
+        sys_db.executemany("INSERT INTO sql_modules VALUES (?, ?)", modules)
+
+    return sqlite_engine(main_path, {"sys": sys_path, "INFORMATION_SCHEMA": info_path})
+
+
+def build_store(directory: str, name: str, ddl: list[str]):
+    path = os.path.join(directory, f"{name}.db")
+    with sqlite3.connect(path) as db:
+        for statement in ddl:
+            db.execute(statement)
+    return sqlite_engine(path)
@@ -1,11 +1,15 @@
 import os
+from functools import lru_cache
 from urllib.parse import quote_plus
 from sqlalchemy import create_engine
-from dotenv import load_dotenv
-
-load_dotenv()
+from utils.env import load_env
+from utils.deadline import apply_query_timeouts
+from utils.metrics import instrument_engine
+from utils.slow_query import log_slow_queries
 
+@lru_cache(maxsize=None)
 def get_cache_engine():
+    load_env()
     driver = os.getenv("CACHE_DB_DRIVER", "ODBC Driver 18 for SQL Server")
     server = os.getenv("CACHE_DB_SERVER")
     db = os.getenv("CACHE_DB_NAME")
@@ -31,4 +35,8 @@ def get_cache_engine():
             f"?driver={quoted_driver}&{trusted_cert}"
         )
 
-    return create_engine(conn_str)
\ No newline at end of file
+    engine = create_engine(conn_str)
+    instrument_engine(engine, "cache")
+    apply_query_timeouts(engine)
+    log_slow_queries(engine, "cache")
+    return engine
\ No newline at end of file
@@ -1,7 +1,7 @@
 # connections/discovery_oracle.py
 import os
 from sqlalchemy import create_engine, text
-from connections.manager import ConnectionManager
+from connections.manager import get_connection_manager
 
 
 def discover_oracle_source(alias: str):
@@ -10,7 +10,7 @@ def discover_oracle_source(alias: str):
     Alias must be defined in connections.json with type: oracle, and have corresponding
     ORACLE_USER_<ALIAS> and ORACLE_PASSWORD_<ALIAS> in .env
     """
-    conn_mgr = ConnectionManager()
+    conn_mgr = get_connection_manager()
     config = conn_mgr.connections.get(alias)
 
     if not config:
@@ -0,0 +1,104 @@
+# backend/connections/limits.py
+"""
+Per-alias cap on concurrent queries against a warehouse. Each checked-out
+connection holds one slot of a FIFO semaphore from checkout to checkin, so
+no more than `max_concurrent_queries` statements run against the alias at
+once however many requests, worker threads or bulk jobs are active.
+Waiters are served in arrival order; their wait is exported as
+db_alias_queue_wait_seconds.
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+from sqlalchemy import event
+from utils.deadline import check_deadline
+from utils.metrics import record_alias_queue
+
+# Waiters wake this often to notice a cancelled or expired request.
+_CHECK_SECONDS = 0.1
+
+
+class FairSemaphore:
+    """Counting semaphore that grants slots strictly first come, first served."""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._lock = threading.Lock()
+        self._waiters = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def acquire(self, timeout: Optional[float] = None, check: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Take a slot, waiting behind earlier callers. Returns False on timeout;
+        `check` is called while waiting and may raise to give up.
+        """
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return True
+            granted = threading.Event()
+            self._waiters.append(granted)
+
+        expires = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                wait = _CHECK_SECONDS if check else None
+                if expires is not None:
+                    left = expires - time.monotonic()
+                    wait = left if wait is None else min(wait, left)
+                if wait is not None and wait <= 0:
+                    break
+                if granted.wait(wait):
+                    return True
+                if check:
+                    check()
+        except BaseException:
+            self._abandon(granted)
+            raise
+        return self._abandon(granted)
+
+    def _abandon(self, granted: threading.Event) -> bool:
+        # A release may hand us the slot between the timeout and this lock.
+        with self._lock:
+            if granted.is_set():
+                return True
+            self._waiters.remove(granted)
+            return False
+
+    def release(self) -> None:
+        with self._lock:
+            if self._waiters:
+                # Hand the slot straight to the oldest waiter, so a newcomer
+                # arriving now cannot take it first.
+                self._waiters.popleft().set()
+            else:
+                self._value += 1
+
+
+def limit_concurrency(engine, alias: str, limit: int) -> FairSemaphore:
+    """Hold one of `limit` slots for as long as a connection is checked out of `engine`."""
+    semaphore = FairSemaphore(limit)
+    pool = engine.pool
+    do_get = pool._do_get
+
+    def _limited_do_get():
+        started = time.perf_counter()
+        semaphore.acquire(check=check_deadline)
+        record_alias_queue(alias, time.perf_counter() - started, semaphore.waiting)
+        try:
+            return do_get()
+        except BaseException:
+            semaphore.release()
+            raise
+
+    pool._do_get = _limited_do_get
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        semaphore.release()
+
+    return semaphore
@@ -1,11 +1,19 @@
 # connections/manager.py
 import os
+from functools import lru_cache
 from sqlalchemy import create_engine
+from connections.limits import limit_concurrency
+from utils.env import load_env
+from utils.deadline import apply_query_timeouts
+from utils.metrics import instrument_engine
+from utils.slow_query import log_slow_queries
 import json
 
+CONNECTIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "connections.json")
+
 class ConnectionManager:
-    def __init__(self):
-        with open("connections/connections.json") as f:
+    def __init__(self, path: str = CONNECTIONS_FILE):
+        with open(path) as f:
             self.connections = json.load(f)
         self.cache = {}
 
@@ -13,6 +21,7 @@ class ConnectionManager:
         if alias in self.cache:
             return self.cache[alias]
 
+        load_env()
         if alias == "lineage":
             engine = self._build_lineage_engine()
         elif alias in self.connections:
@@ -21,15 +30,36 @@ class ConnectionManager:
         else:
             raise ValueError(f"Unsupported connection: {alias}")
 
+        instrument_engine(engine, alias)
+        apply_query_timeouts(engine)
+        log_slow_queries(engine, alias, self.slow_query_ms(alias))
+        limit = self.max_concurrent_queries(alias)
+        if limit:
+            limit_concurrency(engine, alias, limit)
         self.cache[alias] = engine
         return engine
 
+    def max_concurrent_queries(self, alias: str) -> int:
+        # The lineage store is ours; only warehouses we read from are capped.
+        if alias == "lineage":
+            return 0
+        default = int(os.getenv("ALIAS_MAX_CONCURRENT_QUERIES", "0"))
+        return int(self.connections[alias].get("max_concurrent_queries", default))
+
+    def slow_query_ms(self, alias: str) -> float | None:
+        # None falls back to SLOW_QUERY_MS.
+        return self.connections.get(alias, {}).get("slow_query_ms")
+
     def _build_engine_from_config(self, config: dict):
         driver = config.get("driver", "ODBC Driver 18 for SQL Server")
+        # Everything this tool runs against a warehouse is a read, so the
+        # alias engine can point at a readable secondary when one is set.
+        server = config.get("replica_server") or config["server"]
+        database = config.get("replica_database") or config["database"]
 
         if config.get("use_trusted_connection"):
             conn_str = (
-                f"mssql+pyodbc://@{config['server']}/{config['database']}?"
+                f"mssql+pyodbc://@{server}/{database}?"
                 f"driver={driver}&trusted_connection=yes"
             )
         else:
@@ -39,12 +69,17 @@ class ConnectionManager:
                 raise ValueError(f"Missing credentials for {config.get('alias', 'unknown')}")
             conn_str = (
                 f"mssql+pyodbc://{user}:{password}@"
-                f"{config['server']}/{config['database']}?driver={driver}"
+                f"{server}/{database}?driver={driver}"
             )
 
         if config.get("trust_server_cert"):
             conn_str += "&TrustServerCertificate=yes"
 
+        # ReadOnly lets an availability group listener route to a secondary.
+        intent = config.get("application_intent") or ("ReadOnly" if config.get("replica_server") else None)
+        if intent:
+            conn_str += f"&ApplicationIntent={intent}"
+
         return create_engine(conn_str)
 
     def _build_lineage_engine(self):
@@ -67,4 +102,10 @@ class ConnectionManager:
         if trust_cert:
             conn_str += "&TrustServerCertificate=yes"
 
-        return create_engine(conn_str)
\ No newline at end of file
+        return create_engine(conn_str)
+
+
+@lru_cache(maxsize=None)
+def get_connection_manager() -> ConnectionManager:
+    """Process-wide ConnectionManager so engines and connections.json are shared by all routers."""
+    return ConnectionManager()
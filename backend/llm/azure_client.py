@@ -1,14 +1,17 @@
 import os
-from dotenv import load_dotenv
-from langchain_openai import AzureChatOpenAI
+from functools import lru_cache
+from utils.env import load_env
 
-load_dotenv()
+@lru_cache(maxsize=None)
+def get_llm(deployment: str | None = None):
+    # LangChain/openai take most of the app's import time; load them on first use.
+    load_env()
+    from langchain_openai import AzureChatOpenAI
 
-def get_llm():
     return AzureChatOpenAI(
         azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-        deployment_name=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+        deployment_name=deployment or os.getenv("AZURE_OPENAI_DEPLOYMENT"),
         api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
         api_key=os.getenv("AZURE_OPENAI_KEY"),
         temperature=0.3,
-    )
\ No newline at end of file
+    )
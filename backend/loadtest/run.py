@@ -0,0 +1,247 @@
+# backend/loadtest/run.py
+"""
+HTTP load generator for the FastAPI app. Virtual users pick scenarios from a
+weighted mix and drive the real routers; a probe measures how responsive the
+event loop stays, and /metrics is scraped before and after for memory and
+pool-wait deltas.
+
+    # terminal 1: recorded-response LLM
+    python -m loadtest.stub_openai --port 9100
+    # terminal 2: the app, pointed at the stub
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:9100 uvicorn main:app --port 8000
+    # terminal 3
+    python -m loadtest.run --base-url http://127.0.0.1:8000 --users 25 --duration 120 \\
+        --mix browse=6,status=2,analyze=1,lineage=1
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from collections import defaultdict
+import httpx
+
+SCENARIOS = ("browse", "status", "analyze", "lineage")
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label: str, seconds: float, ok: bool):
+        self.latencies[label].append(seconds)
+        if not ok:
+            self.errors[label] += 1
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+async def timed_request(client, stats, label, method, url, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        stats.record(label, time.perf_counter() - started, response.status_code < 400)
+        return response
+    except httpx.HTTPError:
+        stats.record(label, time.perf_counter() - started, False)
+        return None
+
+
+class Workload:
+    def __init__(self, client, stats, catalog, args, rng):
+        self.client = client
+        self.stats = stats
+        self.catalog = catalog
+        self.args = args
+        self.rng = rng
+
+    def pick_procedure(self):
+        alias = self.rng.choice([a for a in self.catalog if self.catalog[a]])
+        return alias, self.rng.choice(self.catalog[alias])
+
+    async def definition(self, alias, proc):
+        response = await timed_request(
+            self.client, self.stats, "GET /procedures/{alias}/{proc_name}",
+            "GET", f"/procedures/{alias}/{proc}",
+        )
+        return response.json().get("definition", "") if response is not None and response.is_success else None
+
+    async def browse(self):
+        await timed_request(self.client, self.stats, "GET /connections", "GET", "/connections")
+        alias = self.rng.choice(list(self.catalog))
+        await timed_request(self.client, self.stats, "GET /tables/{alias}", "GET", f"/tables/{alias}")
+        await timed_request(self.client, self.stats, "GET /procedures/{alias}", "GET", f"/procedures/{alias}")
+        if self.catalog[alias]:
+            await self.definition(alias, self.rng.choice(self.catalog[alias]))
+
+    async def status(self):
+        alias = self.rng.choice(list(self.catalog))
+        await timed_request(self.client, self.stats, "GET /analyze/status/{alias}", "GET", f"/analyze/status/{alias}")
+
+    async def analyze(self):
+        alias, proc = self.pick_procedure()
+        content = await self.definition(alias, proc)
+        if content is None:
+            return
+        if self.rng.random() < self.args.cache_miss_rate:
+            # A unique trailing comment changes the hash and forces an LLM call.
+            content += f"\n-- loadtest {uuid.uuid4()}"
+        await timed_request(self.client, self.stats, "POST /analyze", "POST", "/analyze", json={
+            "content": content, "procedure_name": proc, "db_alias": alias,
+        })
+
+    async def lineage(self):
+        alias, proc = self.pick_procedure()
+        content = await self.definition(alias, proc)
+        if content is None:
+            return
+        await timed_request(self.client, self.stats, "POST /lineage", "POST", "/lineage", json={
+            "procedure_name": proc, "database": alias, "content": content,
+        })
+
+
+async def virtual_user(workload, mix, deadline, think_ms):
+    names, weights = zip(*mix.items())
+    while time.perf_counter() < deadline:
+        scenario = workload.rng.choices(names, weights)[0]
+        await getattr(workload, scenario)()
+        if think_ms:
+            await asyncio.sleep(workload.rng.expovariate(1000.0 / think_ms))
+
+
+async def loop_probe(client, stats, deadline, interval):
+    # /metrics is async and cheap, so its latency tracks event-loop stalls.
+    while time.perf_counter() < deadline:
+        await timed_request(client, stats, "probe GET /metrics", "GET", "/metrics")
+        await asyncio.sleep(interval)
+
+
+async def scrape_metrics(client) -> dict:
+    wanted = {
+        "process_resident_memory_bytes": "rss_bytes",
+        "db_pool_connection_hold_seconds_sum": "pool_hold_s",
+        "db_pool_connection_hold_seconds_count": "pool_checkouts",
+        "llm_request_duration_seconds_count": "llm_calls",
+    }
+    totals = defaultdict(float)
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return {}
+    for line in response.text.splitlines():
+        match = re.match(r"^(\w+)(?:\{[^}]*\})?\s+([0-9.eE+-]+)$", line)
+        if match and match.group(1) in wanted:
+            totals[wanted[match.group(1)]] += float(match.group(2))
+    return dict(totals)
+
+
+async def discover(client, max_procs: int) -> dict:
+    aliases = (await client.get("/connections")).json()
+    catalog = {}
+    for alias in aliases:
+        try:
+            response = await client.get(f"/procedures/{alias}")
+            catalog[alias] = response.json()[:max_procs] if response.is_success else []
+        except httpx.HTTPError:
+            catalog[alias] = []
+    return catalog
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}; choose from {SCENARIOS}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def report(stats: Stats, elapsed: float, before: dict, after: dict) -> dict:
+    rows = {}
+    for label, samples in sorted(stats.latencies.items()):
+        rows[label] = {
+            "count": len(samples),
+            "errors": stats.errors[label],
+            "throughput_rps": len(samples) / elapsed,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "max_ms": max(samples) * 1000,
+        }
+
+    print(f"\n{'endpoint':<40} {'count':>7} {'err':>5} {'rps':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, row in rows.items():
+        print(f"{label:<40} {row['count']:>7} {row['errors']:>5} {row['throughput_rps']:>7.2f} "
+              f"{row['p50_ms']:>8.0f}ms {row['p95_ms']:>8.0f}ms {row['p99_ms']:>8.0f}ms")
+
+    server = {key: after.get(key, 0) - before.get(key, 0) for key in after}
+    if "rss_bytes" in after:
+        server["rss_bytes_end"] = after["rss_bytes"]
+    if server:
+        print("\nserver deltas: " + ", ".join(f"{k}={v:,.3f}" for k, v in server.items()))
+    return {"elapsed_s": elapsed, "endpoints": rows, "server": server}
+
+
+async def main_async(args):
+    mix = args.mix
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.users + 2, max_keepalive_connections=args.users + 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        catalog = await discover(client, args.max_procs)
+        if not any(catalog.values()):
+            mix = {k: v for k, v in mix.items() if k in ("browse", "status")} or {"browse": 1}
+
+        stats = Stats()
+        before = await scrape_metrics(client)
+        started = time.perf_counter()
+        deadline = started + args.duration
+
+        users = []
+        for i in range(args.users):
+            workload = Workload(client, stats, catalog, args, random.Random(rng.random()))
+            users.append(virtual_user(workload, mix, deadline, args.think_ms))
+            if args.ramp_up:
+                await asyncio.sleep(args.ramp_up / args.users)
+        tasks = [asyncio.create_task(u) for u in users]
+        tasks.append(asyncio.create_task(loop_probe(client, stats, deadline, args.probe_interval)))
+        await asyncio.gather(*tasks)
+
+        elapsed = time.perf_counter() - started
+        after = await scrape_metrics(client)
+
+    result = report(stats, elapsed, before, after)
+    result["config"] = {k: v for k, v in vars(args).items()}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nwrote {args.output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds to start all users")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("browse=6,status=2,analyze=1,lineage=1"))
+    parser.add_argument("--think-ms", type=float, default=500.0, help="mean think time between scenarios")
+    parser.add_argument("--cache-miss-rate", type=float, default=0.5, help="share of /analyze calls forced to miss")
+    parser.add_argument("--max-procs", type=int, default=200, help="procedures per alias to sample from")
+    parser.add_argument("--probe-interval", type=float, default=0.25)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    args = parser.parse_args(argv)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# backend/loadtest/stub_openai.py
+"""
+OpenAI/Azure-compatible chat completions server that replays recorded
+responses with lognormal latency, so the real app can be load-tested
+without spending quota.
+
+    cd backend
+    python -m loadtest.stub_openai --port 9100 --recordings loadtest/recordings.json
+
+Point the app at it with AZURE_OPENAI_ENDPOINT=http://localhost:9100.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_RECORDINGS = os.path.join(os.path.dirname(__file__), "recordings.json")
+
+
+class Recording:
+    def __init__(self, entry: dict):
+        self.match = entry.get("match")
+        self.content = entry["content"]
+        latency = entry.get("latency_ms", {})
+        p50 = latency.get("p50", 1500)
+        p95 = latency.get("p95", max(p50 * 3, 1))
+        # Lognormal fitted through the recorded median and p95.
+        self.mu = math.log(p50)
+        self.sigma = max(math.log(p95) - math.log(p50), 0.0) / 1.645
+        self.ttft_share = latency.get("first_token_share", 0.15)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        return rng.lognormvariate(self.mu, self.sigma) / 1000.0
+
+
+def load_recordings(path: str) -> list[Recording]:
+    with open(path) as f:
+        return [Recording(entry) for entry in json.load(f)]
+
+
+def create_app(recordings: list[Recording], speedup: float = 1.0, seed: int | None = None) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    stats = {"requests": 0, "streamed": 0}
+
+    def pick(prompt: str) -> Recording:
+        for recording in recordings:
+            if recording.match and recording.match in prompt:
+                return recording
+        return next((r for r in recordings if not r.match), recordings[0])
+
+    async def complete(request: Request, deployment: str):
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        recording = pick(prompt)
+        delay = recording.sample_latency(rng) / speedup
+        stats["requests"] += 1
+
+        created = int(time.time())
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(recording.content) // 4
+        model = body.get("model") or deployment
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return JSONResponse({
+                "id": f"stub-{stats['requests']}",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": recording.content},
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            })
+
+        stats["streamed"] += 1
+
+        async def events():
+            words = recording.content.split(" ")
+            await asyncio.sleep(delay * recording.ttft_share)
+            step = delay * (1 - recording.ttft_share) / max(len(words), 1)
+            for i, word in enumerate(words):
+                chunk = {
+                    "id": f"stub-{stats['requests']}",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": word if i == 0 else " " + word},
+                        "finish_reason": None,
+                    }],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(step)
+            done = {
+                "id": f"stub-{stats['requests']}",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def azure_chat(deployment: str, request: Request):
+        return await complete(request, deployment)
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat(request: Request):
+        return await complete(request, "stub")
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--recordings", default=DEFAULT_RECORDINGS)
+    parser.add_argument("--speedup", type=float, default=1.0, help="divide recorded latencies by this factor")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    app = create_app(load_recordings(args.recordings), args.speedup, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
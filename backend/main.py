@@ -1,3 +1,7 @@
+from utils.env import load_env
+
+load_env()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api import (
@@ -7,11 +11,21 @@ from api import (
     analyze_status,
     lineage,
     lineage_bulk,
+    lineage_catalog,
+    lineage_query,
+    lineage_export,
+    search,
     source_to_stage,
     source_stage_map,
     source_to_stage_discovery,
-    stage_to_bronze_map
+    stage_to_bronze_map,
+    metrics,
+    profiles
 )
+from utils.compression import CompressionMiddleware
+from utils.deadline import DeadlineMiddleware
+from utils.metrics import MetricsMiddleware
+from utils.profiling import ProfilingMiddleware
 
 app = FastAPI()
 
@@ -23,6 +37,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # ✅ Then include routers
 app.include_router(schema.router)
@@ -31,7 +49,13 @@ app.include_router(analyze.router)
 app.include_router(analyze_status.router)
 app.include_router(lineage.router)
 app.include_router(lineage_bulk.router)
+app.include_router(lineage_catalog.router)
+app.include_router(lineage_query.router)
+app.include_router(lineage_export.router)
+app.include_router(search.router)
 app.include_router(source_to_stage.router)
 app.include_router(source_stage_map.router)
 app.include_router(source_to_stage_discovery.router)
-app.include_router(stage_to_bronze_map.router)
\ No newline at end of file
+app.include_router(stage_to_bronze_map.router)
+app.include_router(metrics.router)
+app.include_router(profiles.router)
\ No newline at end of file
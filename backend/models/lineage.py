@@ -1,5 +1,5 @@
 # backend/models/lineage.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 class ColumnMapping(BaseModel):
@@ -12,6 +12,49 @@ class LineageResult(BaseModel):
     target_table: str
     column_mappings: List[ColumnMapping]
 
+class ColumnMappingList(BaseModel):
+    column_mappings: List[ColumnMapping]
+
+class ProcedureAnalysis(BaseModel):
+    """Summary and lineage of one procedure, answered in a single call."""
+    summary: str
+    source_tables: List[str]
+    target_table: str
+    column_mappings: List[ColumnMapping]
+
+def strict_json_schema(model: type[BaseModel]) -> dict:
+    """
+    JSON schema of `model` in the form structured outputs accept in strict
+    mode: $defs inlined, every property required (optional ones nullable),
+    no additional properties.
+    """
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+
+    def walk(node: dict) -> dict:
+        if "$ref" in node:
+            return walk(defs[node["$ref"].rsplit("/", 1)[-1]])
+        out = {k: v for k, v in node.items() if k not in ("title", "default")}
+        if "properties" in out:
+            out["properties"] = {name: walk(sub) for name, sub in out["properties"].items()}
+            out["required"] = list(out["properties"])
+            out["additionalProperties"] = False
+        if "items" in out:
+            out["items"] = walk(out["items"])
+        if "anyOf" in out:
+            out["anyOf"] = [walk(sub) for sub in out["anyOf"]]
+        return out
+
+    return walk(schema)
+
 class BulkLineageRequest(BaseModel):
     alias: str
-    schema: Optional[str] = None
\ No newline at end of file
+    # `schema` in JSON; the attribute name would shadow BaseModel.schema
+    schema_name: Optional[str] = Field(None, alias="schema")
+    # Run exactly the procedures of a stored dry-run plan (POST /lineage/bulk/plan)
+    plan_id: Optional[str] = None
+
+class BulkPlanRequest(BaseModel):
+    alias: str
+    schema_name: Optional[str] = Field(None, alias="schema")
+    mode: str = "lineage"  # "lineage" or "analysis" (summary + lineage)
\ No newline at end of file
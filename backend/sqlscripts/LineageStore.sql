@@ -160,4 +160,177 @@ CREATE TABLE source_table (
     service_name VARCHAR(255),          -- Oracle only
     ezconnect VARCHAR(255),             -- host:port/service_name
     last_seen DATETIME DEFAULT GETDATE()
-);
\ No newline at end of file
+);
+GO
+
+-- Natural keys used by the set-based mapping sync (storage/mapping_sync.py).
+-- Remove duplicates left behind by earlier insert-only runs before adding them.
+WITH ranked AS (
+    SELECT ROW_NUMBER() OVER (
+        PARTITION BY connection_name, source_schema, source_table
+        ORDER BY created_at DESC
+    ) AS rn
+    FROM dbo.source_to_stage_map
+    WHERE connection_name IS NOT NULL
+)
+DELETE FROM ranked WHERE rn > 1;
+
+WITH ranked AS (
+    SELECT ROW_NUMBER() OVER (
+        PARTITION BY stage_database, stage_schema, stage_table
+        ORDER BY created_at DESC
+    ) AS rn
+    FROM dbo.stage_to_bronze_map
+)
+DELETE FROM ranked WHERE rn > 1;
+GO
+
+CREATE UNIQUE INDEX UX_source_to_stage_map_key
+ON dbo.source_to_stage_map (connection_name, source_schema, source_table)
+WHERE connection_name IS NOT NULL;  -- manual mappings without an alias are not synced
+
+DROP INDEX IX_stage_to_bronze_map_lookup ON dbo.stage_to_bronze_map;
+
+CREATE UNIQUE INDEX UX_stage_to_bronze_map_key
+ON dbo.stage_to_bronze_map (stage_database, stage_schema, stage_table);
+GO
+
+-- Table-level lineage from sys.sql_expression_dependencies (api/lineage_catalog.py).
+-- Column-level detail stays in lineage_map.
+CREATE TABLE dbo.lineage_table_map (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    database_name NVARCHAR(100) NOT NULL,      -- connection alias, as in lineage_map
+    procedure_schema NVARCHAR(128) NOT NULL,
+    procedure_name NVARCHAR(255) NOT NULL,
+    referenced_database NVARCHAR(128) NOT NULL,
+    referenced_schema NVARCHAR(128) NOT NULL,
+    referenced_table NVARCHAR(255) NOT NULL,
+    is_target BIT NOT NULL,                    -- 1 = procedure writes to it
+    analyzed_at DATETIME NOT NULL DEFAULT GETUTCDATE()
+);
+GO
+
+CREATE UNIQUE INDEX UX_lineage_table_map_key
+ON dbo.lineage_table_map (database_name, procedure_schema, procedure_name,
+                          referenced_database, referenced_schema, referenced_table);
+
+CREATE INDEX IX_lineage_table_map_table
+ON dbo.lineage_table_map (referenced_table, referenced_schema, id)
+INCLUDE (is_target, database_name, procedure_schema, procedure_name, referenced_database, analyzed_at);
+GO
+
+-- Covering indexes for the read API (api/lineage_query.py). Keys match its
+-- keyset order (lookup column, detail column, id) so pages are range seeks.
+CREATE INDEX IX_lineage_map_target
+ON dbo.lineage_map (target_table, target_column, id)
+INCLUDE (procedure_name, database_name, schema_name, source_table, source_column, source_full, analyzed_at, hash);
+
+CREATE INDEX IX_lineage_map_source_full
+ON dbo.lineage_map (source_full, source_column, id)
+INCLUDE (procedure_name, database_name, schema_name, source_table, target_table, target_column, analyzed_at, hash);
+
+CREATE INDEX IX_lineage_map_source_table
+ON dbo.lineage_map (source_table, source_column, id)
+INCLUDE (procedure_name, database_name, schema_name, target_table, target_column, source_full, analyzed_at, hash);
+GO
+
+-- Differential lineage saves (storage/lineage_store.py) merge one procedure's
+-- slice keyed on the column edge. Older saves kept a copy per procedure
+-- version; keep the latest row per edge, then cover the slice lookup.
+WITH ranked AS (
+    SELECT ROW_NUMBER() OVER (
+        PARTITION BY database_name, procedure_name, schema_name,
+                     target_table, target_column, source_full, source_column
+        ORDER BY analyzed_at DESC, id DESC
+    ) AS rn
+    FROM dbo.lineage_map
+)
+DELETE FROM ranked WHERE rn > 1;
+GO
+
+CREATE INDEX IX_lineage_map_proc_slice
+ON dbo.lineage_map (database_name, procedure_name)
+INCLUDE (schema_name, target_table, target_column, source_full, source_column, source_table, hash);
+GO
+
+-- Per-alias sys.procedures.modify_date watermark for the change watcher (agents/watcher.py).
+CREATE TABLE dbo.procedure_watch_state (
+    alias NVARCHAR(128) NOT NULL PRIMARY KEY,
+    last_modify_date DATETIME NULL,
+    last_polled_at DATETIME NOT NULL DEFAULT GETUTCDATE()
+);
+GO
+
+-- Procedure search (storage/search_index.py): one document per procedure
+-- definition and per cached summary, an inverted index of their terms and
+-- the tables/columns each definition references.
+CREATE TABLE dbo.search_documents (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    alias NVARCHAR(128) NOT NULL,
+    schema_name NVARCHAR(128) NOT NULL,
+    procedure_name NVARCHAR(255) NOT NULL,
+    field VARCHAR(16) NOT NULL,                -- 'definition' | 'summary'
+    content_hash CHAR(64) NOT NULL,            -- SHA256 of the indexed text
+    term_count INT NOT NULL,
+    indexed_at DATETIME NOT NULL DEFAULT GETUTCDATE()
+);
+GO
+
+-- Same-named procedures in different schemas are separate documents.
+CREATE UNIQUE INDEX UX_search_documents_key
+ON dbo.search_documents (alias, schema_name, procedure_name, field)
+INCLUDE (content_hash);
+GO
+
+CREATE TABLE dbo.search_postings (
+    term NVARCHAR(128) NOT NULL,
+    document_id INT NOT NULL,
+    tf INT NOT NULL,
+    CONSTRAINT PK_search_postings PRIMARY KEY (term, document_id)
+);
+
+CREATE INDEX IX_search_postings_document
+ON dbo.search_postings (document_id);
+GO
+
+CREATE TABLE dbo.search_references (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    document_id INT NOT NULL,
+    ref_schema NVARCHAR(128) NULL,             -- NULL when unqualified in the body
+    ref_table NVARCHAR(255) NOT NULL,
+    ref_column NVARCHAR(255) NULL,             -- NULL for table-level references
+    access VARCHAR(8) NOT NULL                 -- 'read' | 'write'
+);
+
+CREATE INDEX IX_search_references_table
+ON dbo.search_references (ref_table, ref_column)
+INCLUDE (ref_schema, access, document_id);
+
+CREATE INDEX IX_search_references_document
+ON dbo.search_references (document_id);
+GO
+
+-- Dry-run plans for the bulk runs (storage/bulk_plan.py); a run given the
+-- plan_id analyzes exactly the procedures listed in `plan`.
+CREATE TABLE dbo.bulk_plans (
+    plan_id CHAR(32) NOT NULL PRIMARY KEY,
+    alias NVARCHAR(128) NOT NULL,
+    schema_name NVARCHAR(128) NULL,            -- NULL plans every schema
+    mode VARCHAR(16) NOT NULL,                 -- 'lineage' | 'analysis'
+    created_at DATETIME NOT NULL,
+    executed_at DATETIME NULL,
+    plan NVARCHAR(MAX) NOT NULL                -- JSON: procedures, hashes, estimates, totals
+);
+GO
+
+-- Procedure version whose lineage is stored (storage/lineage_store.py), also
+-- when it has no column edges, so bulk plans and runs count it as analyzed.
+CREATE TABLE dbo.lineage_versions (
+    database_name NVARCHAR(100) NOT NULL,      -- connection alias, as in lineage_map
+    procedure_name NVARCHAR(255) NOT NULL,
+    hash CHAR(64) NOT NULL,
+    mappings INT NOT NULL,                     -- lineage_map rows of this version
+    analyzed_at DATETIME NOT NULL,
+    CONSTRAINT PK_lineage_versions PRIMARY KEY (database_name, procedure_name)
+);
+GO
@@ -0,0 +1,29 @@
+USE LineageStore;
+GO
+
+-- Migration for lineage stores created before UX_search_documents_key
+-- included schema_name (same-named procedures in different schemas are
+-- separate documents). Safe to run more than once: the index is only
+-- rebuilt while it lacks the column. Fresh installs get it from
+-- LineageStore.sql and need nothing here.
+IF EXISTS (
+    SELECT 1
+    FROM sys.indexes i
+    WHERE i.object_id = OBJECT_ID('dbo.search_documents')
+      AND i.name = 'UX_search_documents_key'
+      AND NOT EXISTS (
+          SELECT 1
+          FROM sys.index_columns ic
+          JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+          WHERE ic.object_id = i.object_id AND ic.index_id = i.index_id
+            AND ic.is_included_column = 0 AND c.name = 'schema_name'
+      )
+)
+BEGIN
+    DROP INDEX UX_search_documents_key ON dbo.search_documents;
+
+    CREATE UNIQUE INDEX UX_search_documents_key
+    ON dbo.search_documents (alias, schema_name, procedure_name, field)
+    INCLUDE (content_hash);
+END
+GO
@@ -17,4 +17,28 @@ CREATE TABLE procedure_analysis_cache (
 
 -- Optional index for fast lookup
 CREATE INDEX idx_proc_cache_lookup
-    ON procedure_analysis_cache (db_alias, procedure_name, proc_hash);
\ No newline at end of file
+    ON procedure_analysis_cache (db_alias, procedure_name, proc_hash);
+GO
+
+-- One row per (alias, procedure, hash): collapse duplicates from insert-only writes.
+WITH ranked AS (
+    SELECT ROW_NUMBER() OVER (
+        PARTITION BY db_alias, procedure_name, proc_hash
+        ORDER BY analyzed_at DESC, id DESC
+    ) AS rn
+    FROM procedure_analysis_cache
+)
+DELETE FROM ranked WHERE rn > 1;
+GO
+
+DROP INDEX idx_proc_cache_lookup ON procedure_analysis_cache;
+
+-- Upsert key and point lookup for get_cached_summary
+CREATE UNIQUE INDEX UX_proc_cache_key
+    ON procedure_analysis_cache (db_alias, procedure_name, proc_hash);
+
+-- Covers /analyze/status (db_alias scan returning name + hash) and the
+-- per-procedure version ranking used by compaction, without key lookups
+CREATE INDEX IX_proc_cache_versions
+    ON procedure_analysis_cache (db_alias, procedure_name, analyzed_at DESC)
+    INCLUDE (proc_hash);
@@ -0,0 +1,295 @@
+# backend/storage/bulk_plan.py
+"""
+Dry-run plans for the schema-wide bulk runs (/lineage/bulk/by-schema and
+/analyze/bulk/by-schema). A plan lists every procedure of the schema with
+its definition hash, size (DATALENGTH), estimated prompt/answer tokens and
+routed deployment, marks those whose current version is already analyzed
+(and, for lineage, those static dataflow analysis resolves without a call),
+and projects cost and duration from the configured prices, rate limits and
+concurrency. Plans are stored in dbo.bulk_plans; a bulk run given the
+plan_id analyzes exactly the planned procedures, and reports (without
+analyzing) any whose definition changed since planning.
+
+Definitions are read in short keyset pages (`iter_definitions`), so
+neither planning nor a bulk run holds a whole schema's definitions in
+memory, or a source connection while LLM calls run.
+"""
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import text
+from agents.lineage_agent import build_analysis_prompt, lineage_request
+from connections.cache_engine import get_cache_engine
+from connections.manager import get_connection_manager
+from storage.procedure_cache import hash_procedure
+from utils.env import load_env
+from utils.model_router import estimate_tokens, route
+from utils.pipeline import pipeline_settings
+
+MODES = ("lineage", "analysis")
+
+# A page of definitions per round trip instead of one query per procedure,
+# continuing after the last (schema, name) read; DATALENGTH is the stored
+# size in bytes (2 per nvarchar character).
+DEFINITIONS_QUERY = """
+    SELECT {top} s.name AS schema_name, p.name, DATALENGTH(sm.definition) AS bytes, sm.definition
+    FROM sys.procedures p
+    JOIN sys.schemas s ON p.schema_id = s.schema_id
+    JOIN sys.sql_modules sm ON p.object_id = sm.object_id
+    WHERE (:schema IS NULL OR s.name = :schema)
+      AND (s.name > :last_schema OR (s.name = :last_schema AND p.name > :last_name))
+    ORDER BY s.name, p.name
+    {limit}
+"""
+DEFINITIONS_PAGE = 50
+
+# Answer size is not known up front: lineage JSON grows with the body
+# (roughly one mapping per selected column), the summary adds prose.
+OUTPUT_TOKENS_RATIO = 0.3
+MIN_OUTPUT_TOKENS = 150
+MAX_OUTPUT_TOKENS = 4096
+SUMMARY_TOKENS = 300
+
+
+def iter_definitions(alias: str, schema: Optional[str],
+                     page: int = DEFINITIONS_PAGE) -> Iterator[Tuple[str, int, str]]:
+    """
+    (procedure name, size in bytes, definition) for every procedure of
+    `schema` (all if None), in keyset pages of `page` rows. Each page is
+    read on its own short-lived connection, so none is held (nor an alias
+    concurrency slot taken) while the consumer works through a page.
+    """
+    engine = get_connection_manager().get_sqlalchemy_engine(alias)
+    if engine.dialect.name == "mssql":
+        query = text(DEFINITIONS_QUERY.format(top="TOP (:page)", limit=""))
+    else:
+        query = text(DEFINITIONS_QUERY.format(top="", limit="LIMIT :page"))
+
+    last_schema, last_name = "", ""
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(query, {
+                "schema": schema, "last_schema": last_schema, "last_name": last_name, "page": page,
+            }).fetchall()
+        for row in rows:
+            if row.definition:
+                yield row.name, row.bytes or 0, row.definition
+        if len(rows) < page:
+            return
+        last_schema, last_name = rows[-1].schema_name, rows[-1].name
+
+
+def analyzed_versions(alias: str) -> Tuple[Dict[str, set], Dict[str, set]]:
+    """
+    Definition hashes already summarized and already mapped, per procedure.
+    Mapped versions come from lineage_versions, so lineage without column
+    edges counts too, and from lineage_map for lineage stored before it.
+    """
+    summaries, lineage = {}, {}
+    with get_cache_engine().connect() as conn:
+        rows = conn.execute(text("""
+            SELECT procedure_name, proc_hash FROM procedure_analysis_cache WHERE db_alias = :alias
+        """), {"alias": alias})
+        for row in rows:
+            summaries.setdefault(row.procedure_name, set()).add(row.proc_hash)
+    with get_connection_manager().get_sqlalchemy_engine("lineage").connect() as conn:
+        rows = conn.execute(text("""
+            SELECT procedure_name, hash FROM lineage_versions WHERE database_name = :alias
+            UNION
+            SELECT procedure_name, hash FROM lineage_map WHERE database_name = :alias
+        """), {"alias": alias})
+        for row in rows:
+            lineage.setdefault(row.procedure_name, set()).add(row.hash)
+    return summaries, lineage
+
+
+def is_analyzed(mode: str, proc: str, proc_hash: str, summarized: dict, mapped: dict) -> bool:
+    if proc_hash not in mapped.get(proc, ()):
+        return False
+    return mode == "lineage" or proc_hash in summarized.get(proc, ())
+
+
+def _float_env(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def _prices() -> Dict[str, Tuple[float, float]]:
+    """LLM_PRICES="deployment=input/output,..." per 1K tokens."""
+    prices = {}
+    for item in os.getenv("LLM_PRICES", "").split(","):
+        if "=" in item and "/" in item:
+            deployment, pair = item.split("=", 1)
+            prompt_price, completion_price = pair.split("/", 1)
+            prices[deployment.strip()] = (float(prompt_price), float(completion_price))
+    return prices
+
+
+def cost_settings() -> dict:
+    load_env()
+    return {
+        "concurrency": pipeline_settings()["concurrency"],
+        "tokens_per_minute": _float_env("LLM_TOKENS_PER_MINUTE", 0),
+        "requests_per_minute": _float_env("LLM_REQUESTS_PER_MINUTE", 0),
+        "latency_seconds": _float_env("LLM_LATENCY_SECONDS", 2.0),
+        "output_tokens_per_second": _float_env("LLM_OUTPUT_TOKENS_PER_SECOND", 60),
+        "default_price": (_float_env("LLM_PRICE_INPUT_PER_1K", 0), _float_env("LLM_PRICE_OUTPUT_PER_1K", 0)),
+        "prices": _prices(),
+    }
+
+
+def estimate_output_tokens(input_tokens: int, mode: str) -> int:
+    tokens = min(MAX_OUTPUT_TOKENS, max(MIN_OUTPUT_TOKENS, int(input_tokens * OUTPUT_TOKENS_RATIO)))
+    return tokens + (SUMMARY_TOKENS if mode == "analysis" else 0)
+
+
+def project(calls: List[dict], settings: dict) -> dict:
+    """
+    Cost and wall time of `calls` ({deployment, input_tokens, output_tokens}).
+    Time is the slowest of: total latency spread over the concurrency, and
+    each deployment's token and request quota (quotas are per deployment).
+    """
+    cost, latency = 0.0, 0.0
+    per_deployment = {}
+    for call in calls:
+        prompt_price, completion_price = settings["prices"].get(call["deployment"], settings["default_price"])
+        cost += (call["input_tokens"] * prompt_price + call["output_tokens"] * completion_price) / 1000.0
+        latency += settings["latency_seconds"] + call["output_tokens"] / settings["output_tokens_per_second"]
+        usage = per_deployment.setdefault(call["deployment"], {"calls": 0, "tokens": 0})
+        usage["calls"] += 1
+        usage["tokens"] += call["input_tokens"] + call["output_tokens"]
+
+    bounds = {"latency": latency / settings["concurrency"]}
+    for deployment, usage in per_deployment.items():
+        if settings["tokens_per_minute"]:
+            bounds[f"tokens_per_minute:{deployment}"] = 60.0 * usage["tokens"] / settings["tokens_per_minute"]
+        if settings["requests_per_minute"]:
+            bounds[f"requests_per_minute:{deployment}"] = 60.0 * usage["calls"] / settings["requests_per_minute"]
+    bound = max(bounds, key=bounds.get)
+    return {"cost": round(cost, 4), "duration_seconds": round(bounds[bound], 1), "bounded_by": bound}
+
+
+def build_plan(alias: str, schema: Optional[str], mode: str = "lineage") -> dict:
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    summarized, mapped = analyzed_versions(alias)
+
+    procedures, calls = [], []
+    for name, size, definition in iter_definitions(alias, schema):
+        proc_hash = hash_procedure(definition)
+        entry = {"name": name, "hash": proc_hash, "bytes": size}
+        if is_analyzed(mode, name, proc_hash, summarized, mapped):
+            entry["action"] = "cached"
+            procedures.append(entry)
+            continue
+        if mode == "analysis":
+            prompt = build_analysis_prompt(name, definition)
+        else:
+            prompt, _, _ = lineage_request(name, definition)
+        if prompt is None:
+            entry["action"] = "static"
+        else:
+            chosen = route(definition)
+            input_tokens = estimate_tokens(prompt)
+            entry.update({
+                "action": "analyze",
+                "tier": chosen.tier,
+                "deployment": chosen.deployment,
+                "input_tokens": input_tokens,
+                "output_tokens": estimate_output_tokens(input_tokens, mode),
+            })
+            calls.append(entry)
+        procedures.append(entry)
+
+    settings = cost_settings()
+    plan = {
+        "plan_id": uuid.uuid4().hex,
+        "alias": alias,
+        "schema": schema,
+        "mode": mode,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "procedures": procedures,
+        "totals": {
+            "procedures": len(procedures),
+            "to_analyze": len(calls),
+            "static": sum(1 for p in procedures if p["action"] == "static"),
+            "cached": sum(1 for p in procedures if p["action"] == "cached"),
+            "bytes": sum(p["bytes"] for p in calls),
+            "input_tokens": sum(p["input_tokens"] for p in calls),
+            "output_tokens": sum(p["output_tokens"] for p in calls),
+            **project(calls, settings),
+        },
+        "settings": {key: value for key, value in settings.items() if key not in ("prices", "default_price")},
+    }
+    save_plan(plan)
+    return plan
+
+
+def save_plan(plan: dict) -> None:
+    with get_connection_manager().get_sqlalchemy_engine("lineage").begin() as conn:
+        conn.execute(text("""
+            INSERT INTO bulk_plans (plan_id, alias, schema_name, mode, created_at, plan)
+            VALUES (:plan_id, :alias, :schema, :mode, :created_at, :plan)
+        """), {
+            "plan_id": plan["plan_id"], "alias": plan["alias"], "schema": plan["schema"],
+            "mode": plan["mode"], "created_at": datetime.utcnow(), "plan": json.dumps(plan),
+        })
+
+
+def load_plan(plan_id: str) -> Optional[dict]:
+    with get_connection_manager().get_sqlalchemy_engine("lineage").connect() as conn:
+        row = conn.execute(text("SELECT plan, executed_at FROM bulk_plans WHERE plan_id = :plan_id"),
+                           {"plan_id": plan_id}).fetchone()
+    if row is None:
+        return None
+    plan = json.loads(row.plan)
+    plan["executed_at"] = str(row.executed_at) if row.executed_at else None
+    return plan
+
+
+def mark_executed(plan_id: str) -> None:
+    with get_connection_manager().get_sqlalchemy_engine("lineage").begin() as conn:
+        conn.execute(text("UPDATE bulk_plans SET executed_at = :now WHERE plan_id = :plan_id"),
+                     {"now": datetime.utcnow(), "plan_id": plan_id})
+
+
+def check_plan(plan: dict, alias: str, schema: Optional[str], mode: str) -> None:
+    if (plan["alias"], plan["schema"], plan["mode"]) != (alias, schema, mode):
+        raise ValueError(
+            f"plan {plan['plan_id']} is for {plan['mode']} of {plan['alias']}.{plan['schema'] or '*'}"
+        )
+
+
+def select_work(definitions: Iterable[Tuple[str, int, str]], alias: str, mode: str,
+                plan: Optional[dict], report: dict) -> Iterator[Tuple[str, str]]:
+    """
+    (name, definition) to analyze out of streamed `definitions`. With a plan:
+    the planned procedures (to analyze or resolved statically) whose
+    definition still has the planned hash; those changed or dropped since
+    planning are appended to report["drifted"]. Without: every procedure for
+    lineage, those not analyzed at their current hash for analysis. Skipped
+    procedures are counted in report["skipped"].
+    """
+    report.setdefault("drifted", [])
+    report.setdefault("skipped", 0)
+    if plan is not None:
+        report["skipped"] = plan["totals"]["cached"]
+        planned = {entry["name"]: entry["hash"] for entry in plan["procedures"] if entry["action"] != "cached"}
+        for name, _, definition in definitions:
+            expected = planned.pop(name, None)
+            if expected is None:
+                continue
+            if hash_procedure(definition) == expected:
+                yield name, definition
+            else:
+                report["drifted"].append(name)
+        report["drifted"].extend(planned)
+        return
+
+    summarized, mapped = analyzed_versions(alias) if mode == "analysis" else ({}, {})
+    for name, _, definition in definitions:
+        if mode == "analysis" and is_analyzed(mode, name, hash_procedure(definition), summarized, mapped):
+            report["skipped"] += 1
+            continue
+        yield name, definition
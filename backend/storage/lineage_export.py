@@ -0,0 +1,254 @@
+# backend/storage/lineage_export.py
+"""
+Streams lineage and mapping tables out of the lineage store as Parquet or
+Arrow IPC. Rows are fetched from the DB cursor `chunk_rows` at a time and
+written as one record batch each, so memory stays bounded by the chunk size
+whatever the table size. String columns are dictionary-encoded.
+
+    cd backend
+    python -m storage.lineage_export lineage_map -o lineage.parquet --since 2026-01-01
+
+Watermarks are app-assigned datetime.utcnow() stamps (or column defaults),
+and writers commit in whatever order they finish: a row stamped before an
+export read MAX(watermark) can commit after it. Increments therefore start
+EXPORT_OVERLAP_SECONDS (default 300) before `since`, so any write whose
+transaction commits within that window of its stamp is picked up by the
+next increment; longer transactions can still be missed. Rows in the
+overlap are sent again and de-duplicated by upserting on the table's `key`
+columns, which are listed in the file metadata. Deletions are not exported: a row removed from the store simply
+stops appearing, so consumers that need them must reload from a full export
+(no `since`) now and then and drop keys missing from it.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+from sqlalchemy import text
+from utils.env import load_env
+
+CHUNK_ROWS = 50_000
+FORMATS = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.stream"}
+
+# Column kinds per exported table, plus which columns the database/schema
+# filters and the incremental watermark apply to, and the unique row key.
+EXPORTS = {
+    "lineage_map": {
+        "columns": {
+            "id": "int", "procedure_name": "str", "database_name": "str", "schema_name": "str",
+            "source_table": "str", "target_table": "str", "source_column": "str",
+            "target_column": "str", "source_full": "str", "analyzed_at": "ts", "hash": "str",
+        },
+        "database": "database_name",
+        "schema": "schema_name",
+        "watermark": "analyzed_at",
+        "key": ("id",),
+    },
+    "source_to_stage_map": {
+        "columns": {
+            "connection_name": "str", "source_type": "str", "source_host": "str", "source_tns": "str",
+            "source_database": "str", "source_schema": "str", "source_table": "str",
+            "stage_database": "str", "stage_schema": "str", "stage_table": "str",
+            "notes": "str", "created_at": "ts",
+        },
+        "database": "source_database",
+        "schema": "source_schema",
+        "watermark": "created_at",
+        "key": ("connection_name", "source_schema", "source_table"),
+    },
+    "stage_to_bronze_map": {
+        "columns": {
+            "stage_database": "str", "stage_schema": "str", "stage_table": "str",
+            "bronze_database": "str", "bronze_schema": "str", "bronze_table": "str",
+            "created_at": "ts",
+        },
+        "database": "stage_database",
+        "schema": "stage_schema",
+        "watermark": "created_at",
+        "key": ("stage_database", "stage_schema", "stage_table"),
+    },
+}
+
+
+def arrow_schema(table: str):
+    import pyarrow as pa
+
+    types = {
+        "str": pa.dictionary(pa.int32(), pa.string()),
+        "int": pa.int64(),
+        "ts": pa.timestamp("us"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in EXPORTS[table]["columns"].items()])
+
+
+def overlap_window() -> timedelta:
+    """How far before `since` an increment starts (EXPORT_OVERLAP_SECONDS)."""
+    load_env()
+    return timedelta(seconds=max(0.0, float(os.getenv("EXPORT_OVERLAP_SECONDS", "300"))))
+
+
+def _where(spec: dict, database: Optional[str], schema: Optional[str],
+           since: Optional[datetime], until: Optional[datetime]) -> tuple[str, dict]:
+    clauses, params = [], {}
+    if database is not None:
+        clauses.append(f"{spec['database']} = :database")
+        params["database"] = database
+    if schema is not None:
+        clauses.append(f"{spec['schema']} = :schema")
+        params["schema"] = schema
+    if since is not None:
+        # Rows stamped shortly before the previous watermark may have committed
+        # after it was read. Consumers upsert the overlap on spec["key"].
+        clauses.append(f"{spec['watermark']} >= :since")
+        params["since"] = since - overlap_window()
+    if until is not None:
+        # A full export still includes rows that never got a watermark.
+        capped = f"{spec['watermark']} <= :until"
+        clauses.append(capped if since is not None else f"({capped} OR {spec['watermark']} IS NULL)")
+        params["until"] = until
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _table_name(engine, table: str) -> str:
+    return f"dbo.{table}" if engine.dialect.name == "mssql" else table
+
+
+def current_watermark(engine, table: str, database: Optional[str] = None, schema: Optional[str] = None,
+                      since: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Highest watermark in scope. Exports are capped at this value so rows
+    written while the export runs land in the next increment, not in both.
+    """
+    spec = EXPORTS[table]
+    where, params = _where(spec, database, schema, since, None)
+    with engine.connect() as conn:
+        value = conn.execute(
+            text(f"SELECT MAX({spec['watermark']}) FROM {_table_name(engine, table)}{where}"), params
+        ).scalar()
+    if isinstance(value, str):  # SQLite hands DATETIME columns back as text
+        value = datetime.fromisoformat(value)
+    return value
+
+
+def iter_batches(engine, table: str, database: Optional[str] = None, schema: Optional[str] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 chunk_rows: int = CHUNK_ROWS) -> Iterator:
+    """Record batches of at most `chunk_rows` rows, read through a streaming cursor."""
+    import pyarrow as pa
+
+    spec = EXPORTS[table]
+    arrow = arrow_schema(table)
+    columns = list(spec["columns"])
+    where, params = _where(spec, database, schema, since, until)
+    query = text(f"SELECT {', '.join(columns)} FROM {_table_name(engine, table)}{where}")
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows).execute(query, params)
+        for rows in result.partitions(chunk_rows):
+            arrays = []
+            for i, field in enumerate(arrow):
+                values = [row[i] for row in rows]
+                if pa.types.is_dictionary(field.type):
+                    arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+                elif pa.types.is_timestamp(field.type):
+                    arrays.append(pa.array(
+                        [datetime.fromisoformat(v) if isinstance(v, str) else v for v in values],
+                        type=field.type,
+                    ))
+                else:
+                    arrays.append(pa.array(values, type=field.type))
+            yield pa.RecordBatch.from_arrays(arrays, schema=arrow)
+
+
+class _ChunkSink:
+    """Write-only file object whose buffered bytes are drained between batches."""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def write_export(sink, batches: Iterator, table: str, fmt: str, watermark: Optional[datetime] = None) -> int:
+    """Write batches to a file path or file object; returns the row count."""
+    rows = 0
+    for rows in _write(sink, batches, table, fmt, watermark):
+        pass
+    return rows
+
+
+def stream_export(batches: Iterator, table: str, fmt: str, watermark: Optional[datetime] = None) -> Iterator[bytes]:
+    """Encoded file bytes, yielded as each batch is written (for StreamingResponse)."""
+    sink = _ChunkSink()
+    for _ in _write(sink, batches, table, fmt, watermark):
+        data = sink.drain()
+        if data:
+            yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def _write(sink, batches: Iterator, table: str, fmt: str, watermark: Optional[datetime]) -> Iterator[int]:
+    """Yields the running row count after each batch and once more after the footer."""
+    import pyarrow as pa
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    metadata = {b"table": table.encode(), b"key": ",".join(EXPORTS[table]["key"]).encode()}
+    if watermark is not None:
+        metadata[b"watermark"] = watermark.isoformat().encode()
+    schema = arrow_schema(table).with_metadata(metadata)
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(sink, schema, compression="zstd", use_dictionary=True)
+    else:
+        # Stream (not file) format: each batch may carry its own dictionary.
+        writer = pa.ipc.new_stream(sink, schema)
+
+    rows = 0
+    with writer:
+        for batch in batches:
+            writer.write_batch(batch.replace_schema_metadata(metadata))
+            rows += batch.num_rows
+            yield rows
+    yield rows
+
+
+if __name__ == "__main__":
+    from connections.manager import get_connection_manager
+
+    parser = argparse.ArgumentParser(description="Export a lineage store table to Parquet/Arrow")
+    parser.add_argument("table", choices=sorted(EXPORTS))
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--format", choices=sorted(FORMATS), default=None,
+                        help="defaults from the output extension (.arrow/.arrows -> arrow)")
+    parser.add_argument("--database", default=None)
+    parser.add_argument("--schema", default=None)
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="only rows written since this watermark, less EXPORT_OVERLAP_SECONDS (upsert on the key columns)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    fmt = args.format or ("arrow" if args.output.endswith((".arrow", ".arrows")) else "parquet")
+    engine = get_connection_manager().get_sqlalchemy_engine("lineage")
+    watermark = current_watermark(engine, args.table, args.database, args.schema, args.since)
+    batches = iter_batches(engine, args.table, args.database, args.schema, args.since, watermark, args.chunk_rows)
+    rows = write_export(args.output, batches, args.table, fmt, watermark)
+    print(f"exported {rows} rows to {args.output}", file=sys.stderr)
+    print(f"watermark {watermark.isoformat() if watermark else '-'}")
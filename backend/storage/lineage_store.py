@@ -0,0 +1,74 @@
+# backend/storage/lineage_store.py
+
+from datetime import datetime
+from typing import Dict, List
+from storage.mapping_sync import sync_mappings
+
+# One lineage_map row per column edge of a procedure version. The hash and
+# the derived source_table are compared; analyzed_at is only stamped on
+# rows that are actually written.
+LINEAGE_KEY = (
+    "database_name", "procedure_name", "schema_name",
+    "target_table", "target_column", "source_full", "source_column",
+)
+LINEAGE_VALUES = ("source_table", "hash")
+# One lineage_versions row per procedure: the version whose lineage is
+# stored, also when it has no column edges (utility or delete-only
+# procedures), so bulk runs know it was analyzed. Unparsed answers are never
+# recorded, so those procedures are planned again.
+VERSION_KEY = ("database_name", "procedure_name")
+VERSION_VALUES = ("hash", "mappings")
+
+
+def lineage_rows(proc_name: str, database: str, lineage: dict, content_hash: str) -> List[dict]:
+    target = lineage.get("target_table") or ""
+    rows = []
+    for mapping in lineage.get("column_mappings", []):
+        source_full = mapping.get("source_table") or ""
+        rows.append({
+            "procedure_name": proc_name,
+            "database_name": database,
+            "schema_name": target.split(".")[0],
+            "source_table": source_full.split(".")[-1],
+            "target_table": target.split(".")[-1],
+            "source_column": mapping["source"],
+            "target_column": mapping["target"],
+            "source_full": source_full,
+            "hash": content_hash,
+        })
+    return rows
+
+
+def save_lineage_diff(conn, proc_name: str, database: str, lineage: dict, content_hash: str) -> Dict[str, int]:
+    """
+    Replace a procedure's stored lineage with `lineage`, writing only the
+    difference: new edges are inserted, vanished ones deleted, edges from a
+    new procedure version get their hash updated and identical ones are left
+    alone. Records the version in lineage_versions. Returns
+    inserted/updated/deleted/unchanged counts of lineage_map. An unparsed
+    LLM answer is refused: it would delete the edges and mark the version
+    analyzed.
+    """
+    if lineage.get("_parsed") is False:
+        raise ValueError(f"Lineage of {proc_name} was not parsed; not saving it")
+    rows = lineage_rows(proc_name, database, lineage, content_hash)
+    now = datetime.utcnow()
+    counts = sync_mappings(
+        conn,
+        "lineage_map",
+        LINEAGE_KEY,
+        LINEAGE_VALUES,
+        rows,
+        delete_missing=True,
+        scope={"database_name": [database], "procedure_name": [proc_name]},
+        stamp={"analyzed_at": now},
+    )
+    sync_mappings(
+        conn,
+        "lineage_versions",
+        VERSION_KEY,
+        VERSION_VALUES,
+        [{"database_name": database, "procedure_name": proc_name, "hash": content_hash, "mappings": len(rows)}],
+        stamp={"analyzed_at": now},
+    )
+    return counts
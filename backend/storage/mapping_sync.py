@@ -0,0 +1,167 @@
+# backend/storage/mapping_sync.py
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import text
+
+
+def _scope_filter(scope: Optional[Dict[str, Sequence]], prefix: str = "") -> Tuple[str, dict]:
+    # AND-ed `col IN (...)` filters; an empty value list matches nothing.
+    clauses, params = [], {}
+    for i, (col, values) in enumerate((scope or {}).items()):
+        if not values:
+            clauses.append("1 = 0")
+            continue
+        names = [f"scope_{i}_{j}" for j in range(len(values))]
+        params.update(dict(zip(names, values)))
+        clauses.append(f"{prefix}{col} IN ({', '.join(':' + n for n in names)})")
+    return " AND ".join(clauses), params
+
+
+def _dedupe(rows: Iterable[dict], key_cols: Sequence[str]) -> List[dict]:
+    # MERGE rejects a source with duplicate keys; the last candidate wins.
+    unique = {}
+    for row in rows:
+        unique[tuple(row.get(c) for c in key_cols)] = row
+    return list(unique.values())
+
+
+def sync_mappings(
+    conn,
+    table: str,
+    key_cols: Sequence[str],
+    value_cols: Sequence[str],
+    rows: Iterable[dict],
+    delete_missing: bool = False,
+    scope: Optional[Dict[str, Sequence]] = None,
+    stamp: Optional[Dict[str, Any]] = None,
+) -> Dict[str, int]:
+    """
+    Apply candidate mapping rows to `table` with one set-based MERGE on the
+    natural key. Rows whose values are unchanged are not touched, so repeated
+    runs only write what actually changed.
+
+    With `delete_missing`, target rows that are not among the candidates are
+    removed, restricted to rows where every `scope` column is in its values
+    (candidates are expected to fall inside the scope). `stamp` columns, e.g.
+    a timestamp, are written on insert and update but never compared.
+    """
+    cols = list(key_cols) + list(value_cols)
+    candidates = _dedupe(rows, key_cols)
+    counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    stamp = stamp or {}
+
+    if not candidates and not delete_missing:
+        return counts
+
+    if conn.dialect.name != "mssql":
+        return _sync_by_diff(conn, table, key_cols, value_cols, candidates, delete_missing, scope, stamp)
+
+    col_list = ", ".join(cols)
+    conn.execute(text(f"""
+        SELECT TOP 0 {col_list}
+        INTO #mapping_sync
+        FROM dbo.{table}
+    """))
+    try:
+        if candidates:
+            conn.execute(
+                text(f"""
+                    INSERT INTO #mapping_sync ({col_list})
+                    VALUES ({", ".join(":" + c for c in cols)})
+                """),
+                [{c: row.get(c) for c in cols} for row in candidates],
+            )
+
+        on_clause = " AND ".join(f"t.{c} = s.{c}" for c in key_cols)
+        changed = (
+            f"EXISTS (SELECT {', '.join('s.' + c for c in value_cols)} "
+            f"EXCEPT SELECT {', '.join('t.' + c for c in value_cols)})"
+        )
+        stamp_params = {f"stamp_{c}": v for c, v in stamp.items()}
+        set_clause = ", ".join([f"{c} = s.{c}" for c in value_cols] + [f"{c} = :stamp_{c}" for c in stamp])
+        insert_cols = ", ".join(cols + list(stamp))
+        insert_values = ", ".join(["s." + c for c in cols] + [f":stamp_{c}" for c in stamp])
+
+        params = dict(stamp_params)
+        scoped, target, delete_clause = "", f"dbo.{table} WITH (HOLDLOCK) AS t", ""
+        if delete_missing:
+            condition, scope_params = _scope_filter(scope)
+            params.update(scope_params)
+            if condition:
+                # Merge into the scoped slice only; otherwise NOT MATCHED BY
+                # SOURCE has to scan the whole table on every sync.
+                scoped = f"WITH t AS (SELECT * FROM dbo.{table} WITH (HOLDLOCK) WHERE {condition})"
+                target = "t"
+            delete_clause = "WHEN NOT MATCHED BY SOURCE THEN DELETE"
+
+        update_clause = f"WHEN MATCHED AND {changed} THEN UPDATE SET {set_clause}" if value_cols else ""
+
+        result = conn.execute(text(f"""
+            {scoped}
+            MERGE {target}
+            USING #mapping_sync AS s
+                ON {on_clause}
+            {update_clause}
+            WHEN NOT MATCHED BY TARGET THEN
+                INSERT ({insert_cols}) VALUES ({insert_values})
+            {delete_clause}
+            OUTPUT $action;
+        """), params)
+
+        for (action,) in result:
+            counts[{"INSERT": "inserted", "UPDATE": "updated", "DELETE": "deleted"}[action]] += 1
+    finally:
+        conn.execute(text("DROP TABLE #mapping_sync"))
+
+    counts["unchanged"] = len(candidates) - counts["inserted"] - counts["updated"]
+    return counts
+
+
+def _sync_by_diff(conn, table, key_cols, value_cols, candidates, delete_missing, scope, stamp):
+    """
+    Portable equivalent of the MERGE for dialects without it (the SQLite
+    stand-ins used by benchmarks): diff against the stored rows in Python and
+    write only the changes.
+    """
+    cols = list(key_cols) + list(value_cols)
+    counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+
+    condition, params = _scope_filter(scope)
+    where = f" WHERE {condition}" if condition else ""
+
+    existing = {}
+    for row in conn.execute(text(f"SELECT {', '.join(cols)} FROM {table}{where}"), params):
+        values = row._mapping
+        existing[tuple(values[c] for c in key_cols)] = tuple(values[c] for c in value_cols)
+
+    inserts, updates = [], []
+    for row in candidates:
+        key = tuple(row.get(c) for c in key_cols)
+        if key not in existing:
+            inserts.append({**{c: row.get(c) for c in cols}, **stamp})
+        elif existing[key] != tuple(row.get(c) for c in value_cols):
+            updates.append({**{c: row.get(c) for c in cols}, **stamp})
+
+    key_match = " AND ".join(f"{c} = :{c}" for c in key_cols)
+    write_cols = cols + list(stamp)
+    if inserts:
+        conn.execute(text(f"""
+            INSERT INTO {table} ({", ".join(write_cols)})
+            VALUES ({", ".join(":" + c for c in write_cols)})
+        """), inserts)
+    if updates:
+        conn.execute(text(f"""
+            UPDATE {table} SET {", ".join(f"{c} = :{c}" for c in list(value_cols) + list(stamp))}
+            WHERE {key_match}
+        """), updates)
+    counts["inserted"], counts["updated"] = len(inserts), len(updates)
+    counts["unchanged"] = len(candidates) - len(inserts) - len(updates)
+
+    if delete_missing:
+        wanted = {tuple(row.get(c) for c in key_cols) for row in candidates}
+        deletes = [dict(zip(key_cols, key)) for key in existing if key not in wanted]
+        if deletes:
+            conn.execute(text(f"DELETE FROM {table} WHERE {key_match}"), deletes)
+        counts["deleted"] = len(deletes)
+
+    return counts
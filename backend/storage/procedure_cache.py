@@ -1,8 +1,14 @@
 # backend/storage/procedure_cache.py
 
+import argparse
 import hashlib
+import os
 from sqlalchemy import text
 from connections.cache_engine import get_cache_engine
+from utils.metrics import record_cache_lookup
+
+# Versions (distinct proc_hash values) kept per procedure; older ones are trimmed.
+KEEP_VERSIONS = int(os.getenv("PROC_CACHE_KEEP_VERSIONS", "3"))
 
 
 def hash_procedure(content: str) -> str:
@@ -24,20 +30,97 @@ def get_cached_summary(db_alias: str, proc_name: str, proc_hash: str) -> str | N
             "hash": proc_hash
         })
         row = result.fetchone()
+        record_cache_lookup(row is not None)
         return row.summary if row else None
 
 
 def store_summary(db_alias: str, proc_name: str, proc_hash: str, summary: str) -> None:
+    store_summaries(db_alias, [(proc_name, proc_hash, summary)])
+
+
+def store_summaries(db_alias: str, summaries: list[tuple[str, str, str]]) -> None:
+    """Upsert (procedure name, hash, summary) entries in one transaction."""
     engine = get_cache_engine()
-    insert = text("""
-        INSERT INTO procedure_analysis_cache (db_alias, procedure_name, proc_hash, summary)
-        VALUES (:alias, :name, :hash, :summary)
-    """)
+    if engine.dialect.name == "mssql":
+        upsert = text("""
+            MERGE procedure_analysis_cache WITH (HOLDLOCK) AS t
+            USING (SELECT :alias AS db_alias, :name AS procedure_name, :hash AS proc_hash) AS s
+                ON t.db_alias = s.db_alias
+               AND t.procedure_name = s.procedure_name
+               AND t.proc_hash = s.proc_hash
+            WHEN MATCHED THEN
+                UPDATE SET summary = :summary, analyzed_at = SYSDATETIME()
+            WHEN NOT MATCHED THEN
+                INSERT (db_alias, procedure_name, proc_hash, summary)
+                VALUES (:alias, :name, :hash, :summary);
+        """)
+    else:
+        upsert = text("""
+            INSERT INTO procedure_analysis_cache (db_alias, procedure_name, proc_hash, summary)
+            VALUES (:alias, :name, :hash, :summary)
+            ON CONFLICT (db_alias, procedure_name, proc_hash)
+            DO UPDATE SET summary = excluded.summary, analyzed_at = CURRENT_TIMESTAMP
+        """)
 
     with engine.begin() as conn:
-        conn.execute(insert, {
-            "alias": db_alias,
-            "name": proc_name,
-            "hash": proc_hash,
-            "summary": summary
-        })
\ No newline at end of file
+        conn.execute(upsert, [
+            {"alias": db_alias, "name": proc_name, "hash": proc_hash, "summary": summary}
+            for proc_name, proc_hash, summary in summaries
+        ])
+        conn.execute(TRIM_PROCEDURE, [
+            {"alias": db_alias, "name": proc_name, "keep": KEEP_VERSIONS}
+            for proc_name in dict.fromkeys(name for name, _, _ in summaries)
+        ])
+
+
+# Runs after every upsert: one procedure's versions, a seek on
+# IX_proc_cache_versions (db_alias, procedure_name, analyzed_at DESC).
+TRIM_PROCEDURE = text("""
+    DELETE FROM procedure_analysis_cache
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (ORDER BY analyzed_at DESC, id DESC) AS rn
+            FROM procedure_analysis_cache
+            WHERE db_alias = :alias AND procedure_name = :name
+        ) ranked
+        WHERE rn > :keep
+    )
+""")
+
+
+def _trim_versions(conn, keep: int, db_alias: str | None = None) -> int:
+    """Compaction of every procedure (of one alias): a deliberate full scan."""
+    recompile = " OPTION (RECOMPILE)" if conn.dialect.name == "mssql" else ""
+    result = conn.execute(text(f"""
+        DELETE FROM procedure_analysis_cache
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY db_alias, procedure_name
+                    ORDER BY analyzed_at DESC, id DESC
+                ) AS rn
+                FROM procedure_analysis_cache
+                WHERE (:alias IS NULL OR db_alias = :alias)
+            ) ranked
+            WHERE rn > :keep
+        ){recompile}
+    """), {"alias": db_alias, "keep": keep})
+    return result.rowcount
+
+
+def compact_cache(keep_versions: int = KEEP_VERSIONS, db_alias: str | None = None) -> int:
+    """Keep the latest `keep_versions` summaries per procedure; returns rows deleted."""
+    if keep_versions < 1:
+        raise ValueError("keep_versions must be at least 1")
+    with get_cache_engine().begin() as conn:
+        return _trim_versions(conn, keep_versions, db_alias)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact procedure_analysis_cache")
+    parser.add_argument("--keep", type=int, default=KEEP_VERSIONS)
+    parser.add_argument("--alias", default=None)
+    args = parser.parse_args()
+    if args.keep < 1:
+        parser.error("--keep must be at least 1")
+    print(f"deleted {compact_cache(args.keep, args.alias)} rows")
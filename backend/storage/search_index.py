@@ -0,0 +1,362 @@
+# backend/storage/search_index.py
+"""
+Persisted inverted index over procedure definitions and their cached
+summaries (procedure_analysis_cache), plus a table/column reference index,
+so "which procedures touch Customer.EmailAddress" is an index seek instead
+of a LIKE scan over every sys.sql_modules row of every alias.
+
+Each procedure contributes up to two documents (definition, summary),
+keyed by schema and name. A refresh fetches all definitions of an alias in one query and re-tokenizes
+only documents whose content hash changed.
+
+    cd backend
+    python -m storage.search_index --refresh            # every alias
+    python -m storage.search_index "EmailAddress customer"
+"""
+import argparse
+import hashlib
+import math
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import text
+from connections.cache_engine import get_cache_engine
+from connections.manager import get_connection_manager
+from utils.mapping_extractor import extract_references, split_object_name, tokenize
+
+# BM25 parameters; summaries are short prose, so a term there says more
+# about what a procedure does than one more occurrence in its body.
+K1 = 1.2
+B = 0.75
+FIELD_WEIGHTS = {"definition": 1.0, "summary": 1.5}
+REFERENCE_BOOST = {"read": 4.0, "write": 6.0}
+# Terms in more than this share of documents (dbo, id, ...) are dropped
+# from a query unless nothing else is left; their postings are the long ones.
+MAX_DF_RATIO = 0.5
+
+DEFINITIONS_QUERY = """
+    SELECT s.name AS schema_name, p.name AS procedure_name, sm.definition
+    FROM sys.procedures p
+    JOIN sys.schemas s ON s.schema_id = p.schema_id
+    JOIN sys.sql_modules sm ON sm.object_id = p.object_id
+    ORDER BY s.name, p.name
+"""
+
+LATEST_SUMMARIES_QUERY = """
+    SELECT procedure_name, summary FROM (
+        SELECT procedure_name, summary, ROW_NUMBER() OVER (
+            PARTITION BY procedure_name ORDER BY analyzed_at DESC, id DESC
+        ) AS rn
+        FROM procedure_analysis_cache
+        WHERE db_alias = :alias
+    ) ranked
+    WHERE rn = 1
+"""
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _in_clause(prefix: str, values: list) -> tuple:
+    names = {f"{prefix}_{i}": v for i, v in enumerate(values)}
+    return ", ".join(":" + n for n in names), names
+
+
+# -- indexing ---------------------------------------------------------------
+
+def _documents(alias: str) -> Dict[tuple, str]:
+    """(schema_name, procedure_name, field) -> content for one alias."""
+    conn_mgr = get_connection_manager()
+    docs, schemas = {}, defaultdict(list)
+    with conn_mgr.get_sqlalchemy_engine(alias).connect() as conn:
+        for row in conn.execute(text(DEFINITIONS_QUERY)):
+            docs[(row.schema_name, row.procedure_name, "definition")] = row.definition or ""
+            schemas[row.procedure_name].append(row.schema_name)
+    with get_cache_engine().connect() as conn:
+        for row in conn.execute(text(LATEST_SUMMARIES_QUERY), {"alias": alias}):
+            # Summaries are cached per procedure name; those of dropped
+            # procedures are not searchable.
+            for schema_name in schemas.get(row.procedure_name, ()):
+                docs[(schema_name, row.procedure_name, "summary")] = row.summary or ""
+    return docs
+
+
+def _clear_documents(conn, ids: List[int]) -> None:
+    params = [{"id": i} for i in ids]
+    conn.execute(text("DELETE FROM search_postings WHERE document_id = :id"), params)
+    conn.execute(text("DELETE FROM search_references WHERE document_id = :id"), params)
+
+
+def _write_document(conn, doc_id: int, field: str, content: str) -> int:
+    terms = tokenize(content)
+    postings = [{"term": term[:128], "id": doc_id, "tf": tf} for term, tf in Counter(terms).items()]
+    if postings:
+        conn.execute(text("""
+            INSERT INTO search_postings (term, document_id, tf) VALUES (:term, :id, :tf)
+        """), postings)
+    if field == "definition":
+        refs = [
+            {"id": doc_id, "schema": schema, "table": table, "column": column, "access": access}
+            for schema, table, column, access in extract_references(content)
+        ]
+        if refs:
+            conn.execute(text("""
+                INSERT INTO search_references (document_id, ref_schema, ref_table, ref_column, access)
+                VALUES (:id, :schema, :table, :column, :access)
+            """), refs)
+    return len(terms)
+
+
+def refresh_alias(alias: str) -> Dict[str, int]:
+    """
+    Bring one alias's documents up to date; unchanged content (same hash) is
+    skipped. Returns indexed/unchanged/removed counts.
+    """
+    docs = _documents(alias)
+    counts = {"indexed": 0, "unchanged": 0, "removed": 0}
+    now = datetime.utcnow()
+
+    engine = get_connection_manager().get_sqlalchemy_engine("lineage")
+    with engine.begin() as conn:
+        stored = {
+            (row.schema_name, row.procedure_name, row.field): (row.id, row.content_hash)
+            for row in conn.execute(text("""
+                SELECT id, schema_name, procedure_name, field, content_hash
+                FROM search_documents WHERE alias = :alias
+            """), {"alias": alias})
+        }
+
+        removed = [doc_id for key, (doc_id, _) in stored.items() if key not in docs]
+        if removed:
+            _clear_documents(conn, removed)
+            conn.execute(text("DELETE FROM search_documents WHERE id = :id"), [{"id": i} for i in removed])
+            counts["removed"] = len(removed)
+
+        for (schema_name, proc_name, field), content in docs.items():
+            digest = content_hash(content)
+            doc_id, stored_hash = stored.get((schema_name, proc_name, field), (None, None))
+            if stored_hash == digest:
+                counts["unchanged"] += 1
+                continue
+
+            params = {
+                "alias": alias, "schema": schema_name, "proc": proc_name,
+                "field": field, "hash": digest, "now": now,
+            }
+            if doc_id is None:
+                conn.execute(text("""
+                    INSERT INTO search_documents
+                        (alias, schema_name, procedure_name, field, content_hash, term_count, indexed_at)
+                    VALUES (:alias, :schema, :proc, :field, :hash, 0, :now)
+                """), params)
+                doc_id = conn.execute(text("""
+                    SELECT id FROM search_documents
+                    WHERE alias = :alias AND schema_name = :schema AND procedure_name = :proc AND field = :field
+                """), params).scalar_one()
+            else:
+                _clear_documents(conn, [doc_id])
+
+            params.update(id=doc_id, terms=_write_document(conn, doc_id, field, content))
+            conn.execute(text("""
+                UPDATE search_documents
+                SET content_hash = :hash, term_count = :terms, indexed_at = :now
+                WHERE id = :id
+            """), params)
+            counts["indexed"] += 1
+    return counts
+
+
+def refresh(aliases: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, int]]:
+    conn_mgr = get_connection_manager()
+    if aliases is None:
+        aliases = [
+            alias for alias, config in conn_mgr.connections.items()
+            if config.get("type", "sqlserver") == "sqlserver"
+        ]
+    return {alias: refresh_alias(alias) for alias in aliases}
+
+
+# -- querying ---------------------------------------------------------------
+
+def _reference_terms(query: str) -> List[List[str]]:
+    # Dotted words in the query ("Customer.EmailAddress") are looked up as
+    # references as well as searched as terms.
+    return [
+        [p.lower() for p in split_object_name(word)]
+        for word in query.split()
+        if "." in word.strip(".")
+    ]
+
+
+def _reference_hits(conn, names: List[List[str]], alias: Optional[str]) -> Dict[int, List[dict]]:
+    clauses, params = [], {"alias": alias}
+    for i, parts in enumerate(names):
+        parts = parts[-3:]
+        if len(parts) == 3:
+            clauses.append(f"(r.ref_schema = :a{i} AND r.ref_table = :b{i} AND r.ref_column = :c{i})")
+            params.update({f"a{i}": parts[0], f"b{i}": parts[1], f"c{i}": parts[2]})
+        else:
+            # schema.table or table.column; both are cheap seeks.
+            clauses.append(
+                f"(r.ref_table = :a{i} AND r.ref_column = :b{i})"
+                f" OR (r.ref_schema = :a{i} AND r.ref_table = :b{i} AND r.ref_column IS NULL)"
+            )
+            params.update({f"a{i}": parts[0], f"b{i}": parts[1]})
+    if not clauses:
+        return {}
+
+    hits = defaultdict(list)
+    rows = conn.execute(text(f"""
+        SELECT r.document_id, r.ref_schema, r.ref_table, r.ref_column, r.access
+        FROM search_references r
+        JOIN search_documents d ON d.id = r.document_id
+        WHERE ({" OR ".join(clauses)}) AND (:alias IS NULL OR d.alias = :alias)
+    """), params)
+    for row in rows:
+        hits[row.document_id].append({
+            "schema": row.ref_schema, "table": row.ref_table,
+            "column": row.ref_column, "access": row.access,
+        })
+    return hits
+
+
+def search(query: str, alias: Optional[str] = None, limit: int = 20) -> List[dict]:
+    """
+    Procedures ranked by BM25 over definition and summary terms, plus a boost
+    for exact table/column references named in the query.
+    """
+    terms = sorted(set(tokenize(query)))
+    engine = get_connection_manager().get_sqlalchemy_engine("lineage")
+    with engine.connect() as conn:
+        stats = {
+            row.field: (row.docs, float(row.avg_terms or 0) or 1.0)
+            for row in conn.execute(text("""
+                SELECT field, COUNT(*) AS docs, AVG(CAST(term_count AS FLOAT)) AS avg_terms
+                FROM search_documents
+                WHERE (:alias IS NULL OR alias = :alias)
+                GROUP BY field
+            """), {"alias": alias})
+        }
+        total_docs = sum(docs for docs, _ in stats.values())
+
+        postings, doc_freq = [], {}
+        if terms and total_docs:
+            in_terms, params = _in_clause("term", terms)
+            params["alias"] = alias
+            doc_freq = {
+                row.term: row.df
+                for row in conn.execute(text(f"""
+                    SELECT p.term, COUNT(*) AS df
+                    FROM search_postings p
+                    JOIN search_documents d ON d.id = p.document_id
+                    WHERE p.term IN ({in_terms}) AND (:alias IS NULL OR d.alias = :alias)
+                    GROUP BY p.term
+                """), params)
+            }
+            selective = [t for t in doc_freq if doc_freq[t] / total_docs <= MAX_DF_RATIO]
+            terms = selective or list(doc_freq)
+
+        if terms and total_docs:
+            in_terms, params = _in_clause("term", terms)
+            params["alias"] = alias
+            postings = conn.execute(text(f"""
+                SELECT p.term, p.tf, d.id, d.alias, d.schema_name, d.procedure_name, d.field, d.term_count
+                FROM search_postings p
+                JOIN search_documents d ON d.id = p.document_id
+                WHERE p.term IN ({in_terms}) AND (:alias IS NULL OR d.alias = :alias)
+            """), params).fetchall()
+
+        ref_hits = _reference_hits(conn, _reference_terms(query), alias)
+        ref_docs = {}
+        if ref_hits:
+            in_ids, params = _in_clause("id", list(ref_hits))
+            ref_docs = {
+                row.id: row
+                for row in conn.execute(text(f"""
+                    SELECT id, alias, schema_name, procedure_name
+                    FROM search_documents WHERE id IN ({in_ids})
+                """), params)
+            }
+
+    results = {}
+
+    def entry(row) -> dict:
+        key = (row.alias, row.schema_name, row.procedure_name)
+        if key not in results:
+            results[key] = {
+                "alias": row.alias, "schema_name": row.schema_name, "procedure_name": row.procedure_name,
+                "score": 0.0, "matched_terms": set(), "fields": set(), "references": [],
+            }
+        return results[key]
+
+    for row in postings:
+        avg_terms = stats[row.field][1]
+        idf = math.log(1 + (total_docs - doc_freq[row.term] + 0.5) / (doc_freq[row.term] + 0.5))
+        norm = row.tf + K1 * (1 - B + B * row.term_count / avg_terms)
+        item = entry(row)
+        item["score"] += FIELD_WEIGHTS[row.field] * idf * row.tf * (K1 + 1) / norm
+        item["matched_terms"].add(row.term)
+        item["fields"].add(row.field)
+
+    for doc_id, refs in ref_hits.items():
+        item = entry(ref_docs[doc_id])
+        item["score"] += max(REFERENCE_BOOST[r["access"]] for r in refs)
+        item["references"].extend(refs)
+
+    ranked = sorted(
+        results.values(), key=lambda r: (-r["score"], r["alias"], r["schema_name"], r["procedure_name"])
+    )[:limit]
+    for item in ranked:
+        item["score"] = round(item["score"], 4)
+        item["matched_terms"] = sorted(item["matched_terms"])
+        item["fields"] = sorted(item["fields"])
+    return ranked
+
+
+def find_references(
+    table: str,
+    column: Optional[str] = None,
+    schema: Optional[str] = None,
+    alias: Optional[str] = None,
+    access: Optional[str] = None,
+) -> List[dict]:
+    """Procedures that read or write a table, or one of its columns."""
+    engine = get_connection_manager().get_sqlalchemy_engine("lineage")
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT DISTINCT d.alias, d.schema_name, d.procedure_name,
+                   r.ref_schema, r.ref_table, r.ref_column, r.access
+            FROM search_references r
+            JOIN search_documents d ON d.id = r.document_id
+            WHERE r.ref_table = :table
+              AND (:column IS NULL OR r.ref_column = :column)
+              AND (:schema IS NULL OR r.ref_schema = :schema OR r.ref_schema IS NULL)
+              AND (:access IS NULL OR r.access = :access)
+              AND (:alias IS NULL OR d.alias = :alias)
+            ORDER BY d.alias, d.procedure_name
+        """), {
+            "table": table.lower(),
+            "column": column.lower() if column else None,
+            "schema": schema.lower() if schema else None,
+            "access": access,
+            "alias": alias,
+        })
+        return [dict(row._mapping) for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh or query the procedure search index")
+    parser.add_argument("query", nargs="?", default=None)
+    parser.add_argument("--refresh", action="store_true", help="re-index changed procedures first")
+    parser.add_argument("--alias", action="append", default=None)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.refresh:
+        for alias, counts in refresh(args.alias).items():
+            print(alias, counts)
+    if args.query:
+        for hit in search(args.query, (args.alias or [None])[0], args.limit):
+            print(f"{hit['score']:8.3f}  {hit['alias']}.{hit['schema_name']}.{hit['procedure_name']}"
+                  f"  {', '.join(hit['matched_terms'])}")
@@ -0,0 +1,229 @@
+# backend/storage/shared_cache.py
+"""
+Cache shared by every worker process, for catalog snapshots and LLM
+results. The default backend is a SQLite database in WAL mode on local disk
+(one host, many processes). Set SHARED_CACHE_URL=redis://... to share
+across hosts, or SHARED_CACHE_BACKEND=off to disable it.
+
+`get_or_compute` is single-flight across processes: on a miss, one caller
+takes a lease lock and computes while the others wait for its value instead
+of repeating the catalog scan or LLM call.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Callable, Optional
+from utils.deadline import check_deadline
+from utils.env import load_env
+from utils.metrics import record_shared_cache
+
+# How long a lock holder may compute before waiters assume it died.
+LOCK_TTL_SECONDS = 120
+POLL_SECONDS = 0.05
+
+CATALOG_TTL_SECONDS = float(os.getenv("SHARED_CACHE_CATALOG_TTL", "300"))
+LLM_TTL_SECONDS = float(os.getenv("SHARED_CACHE_LLM_TTL", str(7 * 24 * 3600)))
+
+
+class SQLiteCache:
+    """Key/value + lease locks in one SQLite-WAL file; one connection per thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_locks (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+        self.purge_expired()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl),
+        )
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache_locks WHERE key = ? AND expires_at <= ?", (key, now))
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO cache_locks (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + ttl),
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return inserted == 1
+
+    def release(self, key: str, owner: str) -> None:
+        self._conn().execute("DELETE FROM cache_locks WHERE key = ? AND owner = ?", (key, owner))
+
+    def is_locked(self, key: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM cache_locks WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        conn = self._conn()
+        deleted = conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,)).rowcount
+        conn.execute("DELETE FROM cache_locks WHERE expires_at <= ?", (now,))
+        return deleted
+
+
+class RedisCache:
+    """Same interface on Redis: SET EX for values, SET NX PX for locks."""
+
+    _RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url: str, prefix: str = "lineage:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        return bool(self.client.set(f"{self.prefix}lock:{key}", owner, nx=True, px=int(ttl * 1000)))
+
+    def release(self, key: str, owner: str) -> None:
+        self.client.eval(self._RELEASE, 1, f"{self.prefix}lock:{key}", owner)
+
+    def is_locked(self, key: str) -> bool:
+        return bool(self.client.exists(f"{self.prefix}lock:{key}"))
+
+    def purge_expired(self) -> int:
+        return 0  # Redis expires keys itself
+
+
+class SharedCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get(self, namespace: str, key: str) -> Any:
+        raw = self.backend.get(f"{namespace}:{key}")
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        self.backend.set(f"{namespace}:{key}", json.dumps(value, default=str), ttl)
+
+    def invalidate(self, namespace: str, key: str) -> None:
+        self.backend.delete(f"{namespace}:{key}")
+
+    def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Any], ttl: float,
+                       lock_ttl: float = LOCK_TTL_SECONDS,
+                       cache_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Cached value for namespace:key, computing it at most once across
+        processes. Waiters poll until the holder stores its value; if the
+        holder fails or its lease lapses, the next waiter takes over.
+        Values must be JSON-serializable. None, and values rejected by
+        `cache_if`, are returned without being stored.
+        """
+        full_key = f"{namespace}:{key}"
+        raw = self.backend.get(full_key)
+        if raw is not None:
+            record_shared_cache(namespace, "hit")
+            return json.loads(raw)
+
+        owner = uuid.uuid4().hex
+        waited = False
+        while True:
+            if self.backend.acquire(full_key, owner, lock_ttl):
+                try:
+                    # A sibling may have finished between our miss and the lock.
+                    raw = self.backend.get(full_key)
+                    if raw is not None:
+                        record_shared_cache(namespace, "wait" if waited else "hit")
+                        return json.loads(raw)
+                    record_shared_cache(namespace, "miss")
+                    value = compute()
+                    if value is not None and (cache_if is None or cache_if(value)):
+                        self.backend.set(full_key, json.dumps(value, default=str), ttl)
+                    return value
+                finally:
+                    self.backend.release(full_key, owner)
+
+            waited = True
+            while self.backend.is_locked(full_key):
+                # The holder keeps computing for the others; this caller stops waiting.
+                check_deadline()
+                time.sleep(POLL_SECONDS)
+            raw = self.backend.get(full_key)
+            if raw is not None:
+                record_shared_cache(namespace, "wait")
+                return json.loads(raw)
+
+
+class _NoCache:
+    def get(self, namespace, key):
+        return None
+
+    def set(self, namespace, key, value, ttl):
+        pass
+
+    def invalidate(self, namespace, key):
+        pass
+
+    def get_or_compute(self, namespace, key, compute, ttl, lock_ttl=LOCK_TTL_SECONDS, cache_if=None):
+        return compute()
+
+
+@lru_cache(maxsize=None)
+def get_shared_cache():
+    load_env()
+    backend = os.getenv("SHARED_CACHE_BACKEND", "sqlite").lower()
+    url = os.getenv("SHARED_CACHE_URL", "")
+    if backend == "off":
+        return _NoCache()
+    if backend == "redis" or url.startswith(("redis://", "rediss://")):
+        return SharedCache(RedisCache(url or "redis://localhost:6379/0"))
+    path = os.getenv("SHARED_CACHE_PATH") or os.path.join(tempfile.gettempdir(), "lineage-shared-cache.db")
+    return SharedCache(SQLiteCache(path))
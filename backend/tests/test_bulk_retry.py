@@ -0,0 +1,59 @@
+# backend/tests/test_bulk_retry.py
+"""
+A bulk run whose LLM answer cannot be parsed must leave the procedure's
+stored lineage alone and keep it in the next plan, so a later run retries.
+Runs against the benchmark SQLite stand-ins with the stub model.
+"""
+import pytest
+from sqlalchemy import text
+from utils.llm import LLMResponse
+
+
+@pytest.fixture
+def stand_ins(tmp_path, monkeypatch):
+    from benchmarks.run import build_engines, install_overrides
+    from benchmarks.stub_llm import StubLLM
+    from storage.shared_cache import get_shared_cache
+
+    monkeypatch.setenv("SHARED_CACHE_BACKEND", "off")
+    get_shared_cache.cache_clear()
+    engines = build_engines(str(tmp_path), 20)
+    stub = StubLLM(latency_ms=0, jitter=0)
+    modules = install_overrides(engines, stub)
+    yield engines, stub, modules["api.lineage_bulk"]
+    get_shared_cache.cache_clear()
+
+
+def _edges(engine, proc):
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT target_column, source_column, hash FROM lineage_map
+            WHERE database_name = 'Stage' AND procedure_name = :proc
+        """), {"proc": proc}).fetchall()
+
+
+def test_unparsed_answer_keeps_lineage_and_is_planned_again(stand_ins, monkeypatch):
+    from models.lineage import BulkLineageRequest, BulkPlanRequest
+
+    engines, stub, bulk = stand_ins
+    request = BulkLineageRequest(alias="Stage")
+    first = bulk.bulk_summary_and_lineage_by_schema(request)
+    assert first["lineage_unparsed"] == [] and first["inserted"] > 0
+
+    proc = "usp_load_00000"
+    before = _edges(engines["lineage"], proc)
+    assert before
+    with engines["Stage"].begin() as conn:
+        conn.execute(text("UPDATE sys.sql_modules SET definition = definition || '\n-- changed' WHERE object_id = 1"))
+
+    monkeypatch.setattr("agents.lineage_agent.call_model",
+                        lambda prompt, deployment=None, response_format=None: LLMResponse("no lineage here"))
+    second = bulk.bulk_summary_and_lineage_by_schema(request)
+    assert second["lineage_unparsed"] == [proc]
+    assert second["deleted"] == 0
+    assert _edges(engines["lineage"], proc) == before
+
+    plan = bulk.plan_bulk_run(BulkPlanRequest(alias="Stage", mode="analysis"))
+    actions = {entry["name"]: entry["action"] for entry in plan["procedures"]}
+    assert actions[proc] == "analyze"
+    assert {action for name, action in actions.items() if name != proc} == {"cached"}
@@ -0,0 +1,35 @@
+# backend/tests/test_column_similarity.py
+"""
+ColumnSetIndex (utils/column_similarity.py) must not silently drop pairs
+the LSH bands are unlikely to bucket together: below the reliable
+threshold a query scores every indexed set exactly.
+"""
+from utils.column_similarity import ColumnSetIndex, jaccard, column_tokens
+
+
+def _index():
+    index = ColumnSetIndex()
+    for i in range(200):
+        index.add(("dbo", f"noise_{i}"), [f"n{i}_{c}" for c in range(8)])
+    return index
+
+
+def test_low_threshold_finds_every_pair():
+    index = _index()
+    source = [f"col_{c}" for c in range(10)]
+    # 10 shared of 26 distinct: Jaccard ~0.38, far below what 16x4 bands recall
+    for i in range(20):
+        index.add(("stage", f"weak_{i}"), source + [f"extra_{i}_{c}" for c in range(16)])
+
+    found = index.query(source, k=None, min_jaccard=0.3)
+    assert {key for key, _ in found} == {("stage", f"weak_{i}") for i in range(20)}
+    assert all(score == jaccard(column_tokens(source), index.tokens[key]) for key, score in found)
+
+
+def test_high_threshold_uses_the_bands():
+    index = _index()
+    source = [f"col_{c}" for c in range(20)]
+    index.add(("stage", "copy"), source + ["load_ts"])
+
+    assert index.recall(0.7) >= 0.95
+    assert index.query(source, k=1, min_jaccard=0.7) == [(("stage", "copy"), 20 / 21)]
@@ -0,0 +1,180 @@
+# backend/tests/test_dataflow.py
+"""
+Table-driven tests for the static dataflow engine (utils/dataflow.py): a
+`complete` result means lineage is stored without an LLM call, so every
+case pins both the mappings and whether the procedure counts as resolved.
+"""
+import pytest
+from utils.dataflow import analyze_dataflow, split_statements, tokenize
+
+CASES = [
+    (
+        "temp_table_hop",
+        """
+        SELECT c.Id, c.Name INTO #c FROM dbo.Customers c;
+        INSERT INTO dw.Dim (CustomerId, CustomerName) SELECT Id, Name FROM #c;
+        """,
+        {("dw.Dim.CustomerId", "dbo.Customers.Id"), ("dw.Dim.CustomerName", "dbo.Customers.Name")},
+        True,
+        [],
+    ),
+    (
+        "table_variable",
+        """
+        DECLARE @t TABLE (Id int, Amt money);
+        INSERT INTO @t (Id, Amt) SELECT OrderId, Total FROM sales.Orders;
+        INSERT INTO dw.Fact (OrderId, Amount) SELECT Id, Amt FROM @t;
+        """,
+        {("dw.Fact.OrderId", "sales.Orders.OrderId"), ("dw.Fact.Amount", "sales.Orders.Total")},
+        True,
+        [],
+    ),
+    (
+        "merge",
+        """
+        MERGE dw.Dim AS t USING stg.Customer AS s ON t.Id = s.Id
+        WHEN MATCHED THEN UPDATE SET t.Name = s.Name
+        WHEN NOT MATCHED THEN INSERT (Id, Name) VALUES (s.Id, s.Name);
+        """,
+        {("dw.Dim.Id", "stg.Customer.Id"), ("dw.Dim.Name", "stg.Customer.Name")},
+        True,
+        [],
+    ),
+    (
+        "union",
+        "INSERT INTO dw.AllKeys (Id) SELECT Id FROM a.One UNION ALL SELECT Key2 FROM a.Two;",
+        {("dw.AllKeys.Id", "a.One.Id"), ("dw.AllKeys.Id", "a.Two.Key2")},
+        True,
+        [],
+    ),
+    (
+        "semicolons_in_comments_and_strings",
+        """
+        -- staging; not a statement
+        /* INSERT INTO dw.Other (X) SELECT Y FROM src.Z; */
+        INSERT INTO dw.Notes (Note) SELECT 'a;b' + Body FROM src.N; -- done;
+        """,
+        {("dw.Notes.Note", "src.N.Body")},
+        True,
+        [],
+    ),
+    (
+        "dynamic_sql",
+        """
+        DECLARE @sql nvarchar(max) = N'INSERT INTO dw.T (Id) SELECT Id FROM src.A';
+        EXEC sp_executesql @sql;
+        """,
+        set(),
+        False,
+        ["dynamic_sql"],
+    ),
+    (
+        "reused_temp_table",
+        """
+        SELECT Id INTO #w FROM src.A;
+        INSERT INTO dw.T (Id) SELECT Id FROM #w;
+        DROP TABLE #w;
+        SELECT Code AS Id INTO #w FROM src.B;
+        INSERT INTO dw.T (Id) SELECT Id FROM #w;
+        """,
+        {("dw.T.Id", "src.A.Id"), ("dw.T.Id", "src.B.Code")},
+        True,
+        [],
+    ),
+    (
+        "truncated_temp_table",
+        """
+        CREATE TABLE #w (Id int);
+        INSERT INTO #w (Id) SELECT Id FROM src.Old;
+        TRUNCATE TABLE #w;
+        INSERT INTO #w (Id) SELECT NewId FROM src.New;
+        INSERT INTO dw.T (Id) SELECT Id FROM #w;
+        """,
+        {("dw.T.Id", "src.New.NewId")},
+        True,
+        [],
+    ),
+    (
+        "positional_insert_into_permanent_table",
+        "INSERT INTO tgt.T SELECT a, b FROM src.A;",
+        set(),
+        False,
+        ["positional_insert"],
+    ),
+    (
+        "positional_insert_into_temp_table_with_known_columns",
+        """
+        SELECT a, b INTO #x FROM src.A;
+        INSERT INTO #x SELECT c, d FROM src.B;
+        INSERT INTO tgt.T (p, q) SELECT a, b FROM #x;
+        """,
+        {("tgt.T.p", "src.A.a"), ("tgt.T.p", "src.B.c"), ("tgt.T.q", "src.A.b"), ("tgt.T.q", "src.B.d")},
+        True,
+        [],
+    ),
+    (
+        "type_and_datepart_names_as_columns",
+        """
+        INSERT INTO dw.T (Note, Yr, D, Ts, Later)
+        SELECT Text, Year, CONVERT(date, Created), Stamp AT TIME ZONE 'UTC', DATEADD(day, 1, Date)
+        FROM src.N;
+        """,
+        {("dw.T.Note", "src.N.Text"), ("dw.T.Yr", "src.N.Year"), ("dw.T.D", "src.N.Created"),
+         ("dw.T.Ts", "src.N.Stamp"), ("dw.T.Later", "src.N.Date")},
+        True,
+        [],
+    ),
+    (
+        "update_from_join",
+        """
+        UPDATE d SET d.Region = r.Name
+        FROM dw.Dim d JOIN ref.Regions r ON r.Id = d.RegionId;
+        """,
+        {("dw.Dim.Region", "ref.Regions.Name")},
+        True,
+        [],
+    ),
+    (
+        "two_permanent_targets",
+        """
+        INSERT INTO dw.A (Id) SELECT Id FROM src.X;
+        INSERT INTO dw.B (Id) SELECT Id FROM src.Y;
+        """,
+        {("dw.A.Id", "src.X.Id"), ("dw.B.Id", "src.Y.Id")},
+        False,
+        [],
+    ),
+    (
+        "insert_exec",
+        "INSERT INTO dw.T (Id) EXEC src.GetIds;",
+        set(),
+        False,
+        ["insert_exec"],
+    ),
+]
+
+
+@pytest.mark.parametrize("sql, mappings, complete, reasons",
+                         [case[1:] for case in CASES], ids=[case[0] for case in CASES])
+def test_dataflow(sql, mappings, complete, reasons):
+    flow = analyze_dataflow(sql)
+    found = {
+        (f"{m['target_table']}.{m['target_column']}", f"{m['source_table']}.{m['source_column']}")
+        for m in flow.mappings
+    }
+    assert found == mappings
+    assert flow.complete is complete
+    assert [problem["reason"] for problem in flow.unresolved] == reasons
+
+
+def test_split_ignores_semicolons_in_strings_and_comments():
+    sql = "SELECT 'x;y' AS a -- c;d\nINSERT INTO t (a) SELECT a FROM s; /* ; */ UPDATE t SET a = 1"
+    assert [statement[0].upper for statement in split_statements(tokenize(sql))] == ["SELECT", "INSERT", "UPDATE"]
+
+
+def test_positional_insert_is_not_resolved_statically(monkeypatch):
+    from agents.lineage_agent import lineage_request
+
+    monkeypatch.setenv("LINEAGE_DATAFLOW", "on")
+    prompt, _, kind = lineage_request("dbo.Load", "INSERT INTO tgt.T SELECT a, b FROM src.A;")
+    assert kind != "static" and prompt is not None
@@ -0,0 +1,78 @@
+# backend/tests/test_lineage_export.py
+"""
+Incremental exports (storage/lineage_export.py): passing an export's
+watermark back as `since` must return every row written after it,
+including rows updated in place by a mapping sync.
+"""
+import pytest
+from sqlalchemy import text
+from storage.lineage_export import current_watermark, iter_batches
+
+
+@pytest.fixture
+def store(tmp_path):
+    from benchmarks.synthetic import LINEAGE_DDL, build_store
+    from connections.manager import get_connection_manager
+
+    engine = build_store(str(tmp_path), "lineage", LINEAGE_DDL)
+    cache = get_connection_manager().cache
+    previous = cache.get("lineage")
+    cache["lineage"] = engine
+    yield engine
+    if previous is None:
+        cache.pop("lineage", None)
+    else:
+        cache["lineage"] = previous
+
+
+def _export(engine, table, since=None):
+    watermark = current_watermark(engine, table, since=since)
+    rows = [row for batch in iter_batches(engine, table, since=since, until=watermark) for row in batch.to_pylist()]
+    return rows, watermark
+
+
+def _mapping(stage_table, bronze_table):
+    from api.stage_to_bronze_map import StageToBronzeMapping
+
+    return StageToBronzeMapping(
+        stage_database="Stage", stage_schema="dbo", stage_table=stage_table,
+        bronze_database="Bronze", bronze_schema="dbo", bronze_table=bronze_table,
+    )
+
+
+def test_updated_mapping_is_in_the_next_increment(store):
+    from api.stage_to_bronze_map import save_stage_to_bronze_bulk
+
+    save_stage_to_bronze_bulk([_mapping("orders", "orders"), _mapping("customers", "customers")])
+    with store.begin() as conn:
+        # `orders` was mapped well before the export's watermark
+        conn.execute(text("""
+            UPDATE stage_to_bronze_map
+            SET created_at = CASE stage_table WHEN 'orders' THEN '2026-01-01 00:00:00' ELSE '2026-01-02 00:00:00' END
+        """))
+    rows, watermark = _export(store, "stage_to_bronze_map")
+    assert len(rows) == 2
+
+    counts = save_stage_to_bronze_bulk([_mapping("orders", "orders_v2"), _mapping("customers", "customers")])
+    assert counts["updated"] == 1
+
+    rows, _ = _export(store, "stage_to_bronze_map", since=watermark)
+    assert {(row["stage_table"], row["bronze_table"]) for row in rows} >= {("orders", "orders_v2")}
+
+
+def test_late_commit_behind_the_watermark_is_in_the_next_increment(store):
+    insert = text("""
+        INSERT INTO lineage_map (procedure_name, database_name, schema_name, source_table, target_table,
+                                 source_column, target_column, source_full, analyzed_at, hash)
+        VALUES (:proc, 'Stage', 'dbo', 's', 't', 'a', 'a', 'dbo.s', :stamp, 'h')
+    """)
+    with store.begin() as conn:
+        conn.execute(insert, {"proc": "usp_early", "stamp": "2026-01-01 00:00:10"})
+    rows, watermark = _export(store, "lineage_map")
+    assert [row["procedure_name"] for row in rows] == ["usp_early"]
+
+    # Stamped before the watermark, committed after the export read it
+    with store.begin() as conn:
+        conn.execute(insert, {"proc": "usp_late", "stamp": "2026-01-01 00:00:05"})
+    rows, _ = _export(store, "lineage_map", since=watermark)
+    assert {row["procedure_name"] for row in rows} == {"usp_early", "usp_late"}
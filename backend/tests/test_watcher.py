@@ -0,0 +1,76 @@
+# backend/tests/test_watcher.py
+"""
+Retry bookkeeping of the change watcher (agents/watcher.py): failed
+procedures wait out an exponential backoff, are dead-lettered after
+max_attempts, and only procedures still being retried hold back the
+alias watermark.
+"""
+from datetime import datetime
+import pytest
+from agents import watcher as watcher_module
+from agents.watcher import ProcedureWatcher, WatchItem
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def watcher(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(watcher_module.time, "monotonic", clock)
+    w = ProcedureWatcher(aliases=["Stage"], max_attempts=3, retry_seconds=10)
+    monkeypatch.setattr(w, "gold_inputs", lambda: set())
+    monkeypatch.setattr(w, "poll", lambda alias, gold_inputs: 0)
+    saved = []
+    monkeypatch.setattr(w, "save_watermark", saved.append)
+    return w, clock, saved
+
+
+def _item(w, name="usp_load"):
+    return WatchItem(1, datetime(2026, 1, 1), next(w.seq), "Stage", name, "CREATE PROCEDURE ...")
+
+
+def test_failed_item_backs_off_then_dead_letters(watcher):
+    w, clock, saved = watcher
+    w.enqueue(("Stage", "usp_load"), _item(w))
+
+    delays = []
+    for attempt in range(1, 3):
+        item = w.pop()
+        assert item.attempts == attempt - 1
+        assert w.fail(item) == "failed"
+        delays.append(item.retry_at - clock.now)
+        w.poll_all()
+        assert w.pop() is None  # still backing off
+        assert w.has_pending("Stage") and saved == []
+        clock.now = item.retry_at
+        w.poll_all()
+    assert delays == [10, 20]
+
+    assert w.fail(w.pop()) == "dead_letter"
+    assert not w.has_pending("Stage")
+    w.poll_all()
+    assert w.pop() is None
+    assert saved == ["Stage"]
+
+
+def test_new_change_revives_a_dead_letter(watcher):
+    w, clock, _ = watcher
+    key = ("Stage", "usp_load")
+    w.enqueue(key, _item(w))
+    for _ in range(3):
+        item = w.pop() or w.failed[key]
+        w.fail(item)
+        clock.now += 1000
+        w.poll_all()
+    assert key in w.dead and not w.has_pending("Stage")
+
+    w.enqueue(key, _item(w))
+    assert key not in w.dead
+    assert w.pop().attempts == 0
+    assert not w.has_pending("Stage")
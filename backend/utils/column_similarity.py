@@ -0,0 +1,111 @@
+# backend/utils/column_similarity.py
+"""
+MinHash/LSH index over table column sets. Tables are found by approximate
+Jaccard similarity of their column names (optionally name:type pairs)
+without comparing every pair: each signature is split into bands, and only
+tables sharing at least one band bucket are scored exactly.
+
+With the default 16 bands x 4 rows, pairs at Jaccard 0.5 become candidates
+about 63% of the time, at 0.7 about 99%, and at 0.3 about 12%. A query whose
+threshold the bands recall less than RELIABLE_RECALL of the time (below
+about 0.64 by default) scores every indexed set exactly instead, so low
+thresholds are slower but never silently incomplete.
+"""
+import hashlib
+import random
+from collections import defaultdict
+from typing import Hashable, Iterable, List, Optional, Tuple
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+RELIABLE_RECALL = 0.95
+
+
+def column_tokens(columns: Iterable, with_types: bool = False) -> frozenset:
+    """Lowercased column names, or name:type when `with_types` and columns are (name, type) pairs."""
+    tokens = set()
+    for column in columns:
+        if isinstance(column, (tuple, list)):
+            name, data_type = column[0], column[1]
+            tokens.add(f"{name.lower()}:{(data_type or '').lower()}" if with_types else name.lower())
+        else:
+            tokens.add(column.lower())
+    return frozenset(tokens)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.params = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        # Column names repeat across thousands of tables; hash each one once.
+        self._token_cache = {}
+
+    def _token_hashes(self, token: str) -> tuple:
+        hashes = self._token_cache.get(token)
+        if hashes is None:
+            x = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            hashes = tuple(((a * x + b) % _PRIME) & _MAX_HASH for a, b in self.params)
+            self._token_cache[token] = hashes
+        return hashes
+
+    def signature(self, tokens: Iterable[str]) -> tuple:
+        rows = [self._token_hashes(t) for t in tokens]
+        if not rows:
+            return (_MAX_HASH,) * self.num_perm
+        if len(rows) == 1:
+            return rows[0]
+        return tuple(map(min, *rows))
+
+
+class ColumnSetIndex:
+    """LSH index of column sets keyed by any hashable (e.g. (schema, table))."""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, with_types: bool = False, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.with_types = with_types
+        self.tokens = {}
+        self.buckets = [defaultdict(list) for _ in range(bands)]
+
+    def _bands(self, signature: tuple):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, key: Hashable, columns: Iterable) -> None:
+        tokens = column_tokens(columns, self.with_types)
+        self.tokens[key] = tokens
+        for band, chunk in self._bands(self.hasher.signature(tokens)):
+            self.buckets[band][chunk].append(key)
+
+    def recall(self, similarity: float) -> float:
+        """Chance that a pair at this Jaccard shares at least one band bucket."""
+        return 1.0 - (1.0 - similarity ** self.rows) ** self.bands
+
+    def query(self, columns: Iterable, k: Optional[int] = 5, min_jaccard: float = 0.0) -> List[Tuple[Hashable, float]]:
+        """
+        Top-k (or all, with k=None) indexed keys by exact Jaccard, among those
+        sharing an LSH bucket, or among all keys when the bands would miss
+        too many pairs at `min_jaccard`.
+        """
+        tokens = column_tokens(columns, self.with_types)
+        if self.recall(min_jaccard) < RELIABLE_RECALL:
+            candidates = self.tokens
+        else:
+            candidates = set()
+            for band, chunk in self._bands(self.hasher.signature(tokens)):
+                candidates.update(self.buckets[band].get(chunk, ()))
+
+        scored = [(key, jaccard(tokens, self.tokens[key])) for key in candidates]
+        scored = [(key, score) for key, score in scored if score >= min_jaccard]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored if k is None else scored[:k]
@@ -0,0 +1,94 @@
+# backend/utils/compression.py
+"""
+Response compression for large JSON and text bodies: brotli when the
+client accepts it and the `brotli` package is installed, gzip otherwise.
+Bodies under COMPRESS_MIN_BYTES and streamed responses (SSE, exports) are
+passed through untouched.
+"""
+import gzip
+import os
+from functools import lru_cache
+from starlette.datastructures import Headers, MutableHeaders
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESSIBLE_TYPES = ("application/json", "text/plain", "text/html", "text/csv")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+@lru_cache(maxsize=1)
+def _brotli():
+    try:
+        import brotli
+
+        return brotli
+    except ImportError:
+        return None
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    accepted = {
+        token.split(";")[0].strip(): "q=0" not in token.replace(" ", "")
+        for token in accept_encoding.lower().split(",")
+    }
+    if accepted.get("br") and _brotli() is not None:
+        return "br"
+    if accepted.get("gzip"):
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return _brotli().compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware; only complete single-message bodies are compressed."""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        pending = {"start": None}
+
+        async def compressing_send(message):
+            if message["type"] == "http.response.start":
+                pending["start"] = message  # held until the body shows its size
+                return
+            start = pending["start"]
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            pending["start"] = None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, compressing_send)
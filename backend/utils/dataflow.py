@@ -0,0 +1,905 @@
+# backend/utils/dataflow.py
+"""
+Statement-level column dataflow for a procedure body, collapsed to
+end-to-end source -> target column mappings through #temp tables, table
+variables, CTEs and derived tables.
+
+Each write (INSERT ... SELECT, SELECT ... INTO, UPDATE ... SET, MERGE) adds
+edges from the columns its expressions read to the columns it writes.
+Intermediate relations keep their writes in statement order, so a read of
+#work sees only what was written before it (since its last TRUNCATE, DROP
+or SELECT INTO). Collapsing follows every source column through the
+intermediates back to permanent tables.
+
+The result is `complete` when every write to a permanent table was
+understood (no dynamic SQL, cursors, ambiguous columns, INSERT ... EXEC,
+positional INSERT into a permanent table without a column list or
+unparsed statements) and there is exactly one permanent target; lineage
+extraction then needs no LLM call. Otherwise `unresolved` lists the
+statements that still need one.
+
+Regex tokenizer and a small recursive parser: no sqlparse, a few
+milliseconds per procedure.
+
+    cd backend
+    python -m utils.dataflow path/to/procedure.sql
+"""
+import argparse
+import json
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+_TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<str>N?'(?:[^']|'')*(?:'|\Z))
+  | (?P<name>(?:\[[^\]]*\]|[#@]{0,2}[A-Za-z_][\w$#@]*)(?:\s*\.\s*(?:\[[^\]]*\]|[A-Za-z_][\w$#@]*|\*))*)
+  | (?P<num>0x[0-9A-Fa-f]*|\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)
+  | (?P<op><>|!=|<=|>=|[-+*/%=<>(),;.&|^~!:])
+""", re.DOTALL | re.VERBOSE)
+_NAME_PART = re.compile(r"\[([^\]]*)\]|([^\s.\[\]]+)")
+
+# Words that start a new statement when they appear at parenthesis depth 0.
+STATEMENT_START = frozenset("""
+    INSERT UPDATE DELETE MERGE SELECT WITH DECLARE SET IF ELSE WHILE BEGIN END
+    EXEC EXECUTE TRUNCATE DROP CREATE ALTER RETURN PRINT COMMIT ROLLBACK GO
+    RAISERROR THROW OPEN FETCH CLOSE DEALLOCATE BREAK CONTINUE GOTO WAITFOR USE
+""".split())
+
+# Never column references.
+KEYWORDS = frozenset("""
+    ADD ALL ALTER AND ANY APPLY AS ASC BEGIN BETWEEN BY CASE CAST CHECK COLLATE
+    COLUMN CONVERT CREATE CROSS CURRENT CURRENT_DATE CURRENT_TIME CURRENT_TIMESTAMP
+    CURRENT_USER CURSOR DEFAULT DELETE DESC DISTINCT DROP ELSE END ESCAPE EXCEPT
+    EXEC EXECUTE EXISTS FETCH FOR FROM FULL GROUP HAVING IDENTITY IF IN INNER
+    INSERT INTERSECT INTO IS JOIN KEY LEFT LIKE MATCHED MERGE NOCOUNT NOLOCK NOT
+    NULL OF OFF ON OPTION OR ORDER OUTER OUTPUT OVER PARTITION PERCENT PRIMARY
+    RIGHT ROWS SELECT SESSION_USER SET SYSTEM_USER TABLE THEN TIES
+    TOP TRAN TRANSACTION TRUNCATE UNION UNIQUE UPDATE USING VALUES WHEN WHERE WITH
+    PRECEDING FOLLOWING UNBOUNDED ROW RANGE MAX
+""".split())
+# Type names and dateparts are also common column names (Date, Year, Text):
+# in expressions they are skipped only where T-SQL expects them (after AS,
+# as the first argument of CONVERT or a date function, in AT TIME ZONE).
+TYPE_WORDS = frozenset("""
+    INT BIGINT SMALLINT TINYINT BIT DECIMAL NUMERIC FLOAT REAL MONEY SMALLMONEY
+    DATE TIME DATETIME DATETIME2 SMALLDATETIME DATETIMEOFFSET CHAR NCHAR VARCHAR
+    NVARCHAR TEXT NTEXT BINARY VARBINARY UNIQUEIDENTIFIER XML SQL_VARIANT
+    YEAR QUARTER MONTH DAYOFYEAR DAY WEEK WEEKDAY HOUR MINUTE SECOND MILLISECOND
+    MICROSECOND NANOSECOND ISO_WEEK TZOFFSET
+""".split())
+_NOT_COLUMN = KEYWORDS | TYPE_WORDS
+# First argument is a datepart (dd, mm, yy, ...) or a type, not a column.
+FIRST_ARGUMENT_FUNCTIONS = frozenset(
+    "DATEADD DATEDIFF DATEDIFF_BIG DATEPART DATENAME DATETRUNC CONVERT TRY_CONVERT".split()
+)
+
+_SELECT_END = frozenset("FROM INTO WHERE GROUP ORDER HAVING UNION EXCEPT INTERSECT OPTION FOR".split())
+_FROM_END = frozenset("WHERE GROUP ORDER HAVING UNION EXCEPT INTERSECT OPTION FOR".split())
+_JOIN_WORDS = frozenset("JOIN INNER LEFT RIGHT FULL OUTER CROSS APPLY".split())
+_SET_OPERATORS = frozenset("UNION EXCEPT INTERSECT".split())
+_DML = frozenset("INSERT UPDATE DELETE MERGE SELECT".split())
+
+# (relation key, column as written, statement index) of a column read; relation None = unresolved
+Source = Tuple[Optional[str], str, int]
+
+
+@dataclass(slots=True)
+class Token:
+    kind: str
+    text: str
+    start: int
+    end: int
+
+    @property
+    def upper(self) -> str:
+        return self.text.upper() if self.kind == "name" else self.text
+
+    @property
+    def parts(self) -> List[str]:
+        return [a or b for a, b in _NAME_PART.findall(self.text)]
+
+
+def tokenize(sql: str) -> List[Token]:
+    tokens = []
+    for match in _TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind in ("ws", "comment"):
+            continue
+        tokens.append(Token(kind, match.group(), match.start(), match.end()))
+    return tokens
+
+
+def split_statements(tokens: List[Token]) -> List[List[Token]]:
+    """
+    T-SQL statements need no semicolons: a new statement starts at a
+    statement keyword at depth 0 unless it continues the current one
+    (INSERT ... SELECT, WITH ... INSERT, UPDATE ... SET, anything in a MERGE,
+    set operators, END of a CASE).
+    """
+    statements, current = [], []
+    depth, case_depth = 0, 0
+    head, seen = None, set()
+    for token in tokens:
+        word = token.upper if token.kind == "name" else None
+        if token.text == "(":
+            depth += 1
+        elif token.text == ")":
+            depth = max(0, depth - 1)
+        elif word == "CASE":
+            case_depth += 1
+        elif word == "END" and case_depth:
+            case_depth -= 1
+            current.append(token)
+            continue
+
+        if depth == 0 and token.text == ";":
+            if current:
+                statements.append(current)
+            current, head, seen = [], None, set()
+            continue
+
+        if depth == 0 and word in STATEMENT_START and not (word in ("ELSE",) and case_depth) and current:
+            previous = current[-1].upper if current[-1].kind == "name" else current[-1].text
+            continues = (
+                "MERGE" in seen  # a MERGE always ends with a semicolon
+                or previous in _SET_OPERATORS or previous == "ALL"
+                or (word == "SELECT" and head in ("INSERT", "WITH") and "SELECT" not in seen)
+                or (word in _DML and head == "WITH" and not seen & _DML)
+                or (word in ("EXEC", "EXECUTE") and "INSERT" in seen and "SELECT" not in seen)
+                or (word == "SET" and "UPDATE" in seen and "SET" not in seen)
+                or (word == "WITH" and previous not in STATEMENT_START)  # table hints
+            )
+            if not continues:
+                statements.append(current)
+                current, head, seen = [], None, set()
+        if depth == 0 and word in STATEMENT_START:
+            if head is None:
+                head = word
+            seen.add(word)
+        current.append(token)
+    if current:
+        statements.append(current)
+    return statements
+
+
+def _matching_parens(tokens: List[Token]) -> Dict[int, int]:
+    matches, stack = {}, []
+    for i, token in enumerate(tokens):
+        if token.text == "(":
+            stack.append(i)
+        elif token.text == ")" and stack:
+            matches[stack.pop()] = i
+    return matches
+
+
+def _in_at_time_zone(tokens: List[Token], i: int) -> bool:
+    """Whether tokens[i] is one of the words of `expr AT TIME ZONE 'zone'`."""
+    for start in (i, i - 1, i - 2):
+        if 0 <= start and start + 2 < len(tokens) and all(
+                _is_word(tokens[start + k], word) for k, word in enumerate(("AT", "TIME", "ZONE"))):
+            return True
+    return False
+
+
+def _is_word(token: Optional[Token], *words: str) -> bool:
+    return token is not None and token.kind == "name" and token.upper in words
+
+
+def _label(token: Token) -> str:
+    """Column or alias name of a name or string token ([Order ID], 'Order ID')."""
+    if token.kind == "str":
+        return token.text.lstrip("Nn")[1:-1].replace("''", "'")
+    return token.parts[-1]
+
+
+@dataclass
+class Dataflow:
+    mappings: List[dict] = field(default_factory=list)
+    targets: List[str] = field(default_factory=list)
+    sources: List[str] = field(default_factory=list)
+    intermediates: List[str] = field(default_factory=list)
+    # Statement-level graph: (statement index, (relation, column) read, (relation, column) written)
+    edges: List[Tuple[int, Tuple[str, str], Tuple[str, str]]] = field(default_factory=list)
+    unresolved: List[dict] = field(default_factory=list)
+    statements: int = 0
+
+    @property
+    def complete(self) -> bool:
+        return not self.unresolved and len(self.targets) == 1 and bool(self.mappings)
+
+    @property
+    def unresolved_statements(self) -> Optional[List[str]]:
+        """
+        SQL of the statements that need an LLM, or None when some problem is
+        not confined to statements (an ambiguous or untracked column).
+        """
+        if any("statement" not in problem for problem in self.unresolved):
+            return None
+        return list(dict.fromkeys(problem["statement"] for problem in self.unresolved))
+
+    def lineage(self) -> dict:
+        """LineageResult-shaped dict for the (first) permanent target."""
+        target = self.targets[0] if self.targets else ""
+        mappings = [m for m in self.mappings if m["target_table"] == target]
+        return {
+            "source_tables": sorted({m["source_table"] for m in mappings}),
+            "target_table": target,
+            "column_mappings": [
+                {"source": m["source_column"], "target": m["target_column"], "source_table": m["source_table"]}
+                for m in mappings
+            ],
+        }
+
+
+class _Analyzer:
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.display: Dict[str, str] = {}
+        self.intermediate: Set[str] = set()
+        self.columns: Dict[str, List[str]] = {}          # known column order of intermediates
+        self.events: Dict[str, list] = defaultdict(list)  # relation -> [(statement, colmap | None)]
+        self.variables: Dict[str, Set[Source]] = {}
+        self.table_variables: Set[str] = set()
+        self.writes: List[Tuple[str, str, Set[Source], int]] = []  # permanent target writes
+        self.ctes: Dict[str, str] = {}
+        self.flow = Dataflow()
+        self._derived = 0
+        self._memo = {}
+
+    # -- relations -----------------------------------------------------
+
+    def relation(self, token: Token) -> str:
+        parts = token.parts
+        name = parts[-1]
+        if name.startswith("#") or name.lower() in self.table_variables:
+            key = name.lower()
+            self.intermediate.add(key)
+        else:
+            key = ".".join(p.lower() for p in parts[-2:])
+        self.display.setdefault(key, ".".join(parts))
+        return key
+
+    def scoped(self, name: str, statement: int) -> str:
+        """A CTE or derived table: an intermediate visible only within its statement."""
+        self._derived += 1
+        key = f"{name.lower()}@{statement}.{self._derived}"
+        self.display[key] = name
+        self.intermediate.add(key)
+        return key
+
+    def reset(self, relation: str, statement: int) -> None:
+        if relation in self.intermediate:
+            self.events[relation].append((statement, None))
+
+    def write(self, relation: str, column: str, sources: Set[Source], statement: int) -> None:
+        for source in sources:
+            if source[0] is not None:
+                self.flow.edges.append((statement, (source[0], source[1]), (relation, column)))
+        if relation in self.intermediate:
+            colmap = {column.lower(): sources}
+            events = self.events[relation]
+            if events and events[-1][0] == statement and events[-1][1] is not None:
+                events[-1][1].setdefault(column.lower(), set()).update(sources)
+            else:
+                events.append((statement, colmap))
+            known = self.columns.setdefault(relation, [])
+            if column != "*" and column.lower() not in (c.lower() for c in known):
+                known.append(column)
+        else:
+            self.writes.append((relation, column, sources, statement))
+
+    def problem(self, reason: str, statement: List[Token]) -> None:
+        text = self.sql[statement[0].start:statement[-1].end] if statement else ""
+        self.flow.unresolved.append({"reason": reason, "statement": text})
+
+    # -- expressions ---------------------------------------------------
+
+    def resolve_column(self, token: Token, scope: list, statement: int) -> Optional[Source]:
+        """Source for a column reference, or (None, name, statement) if it cannot be pinned down."""
+        parts = token.parts
+        column = parts[-1]
+        if len(parts) > 1:
+            qualifier = ".".join(p.lower() for p in parts[:-1])
+            for frame in scope:
+                for alias, relation in frame:
+                    if alias in (qualifier, parts[-2].lower()):
+                        return (relation, column, statement)
+            return (None, token.text, statement)
+
+        for frame in scope:
+            relations = list(dict.fromkeys(relation for _, relation in frame))
+            if not relations:
+                continue
+            if len(relations) == 1:
+                return (relations[0], column, statement)
+            known = [r for r in relations if column.lower() in (c.lower() for c in self.columns.get(r, ()))]
+            if len(known) == 1:
+                return (known[0], column, statement)
+            unknown = [r for r in relations if r not in self.columns]
+            if not known and len(unknown) == 1:
+                return (unknown[0], column, statement)
+            return (None, column, statement)
+        return None  # no FROM: a constant expression or an outer parameter
+
+    def expression_sources(self, tokens: List[Token], scope: list, statement: int) -> Set[Source]:
+        sources: Set[Source] = set()
+        matches = _matching_parens(tokens)
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            following = tokens[i + 1] if i + 1 < len(tokens) else None
+            if token.text == "(" and _is_word(following, "SELECT", "WITH"):
+                end = matches.get(i, len(tokens) - 1)
+                inner = self.select(tokens[i + 1:end], scope, statement)
+                if inner:
+                    sources.update(inner[0][1])
+                i = end + 1
+                continue
+            if token.kind == "name":
+                previous = tokens[i - 1] if i else None
+                word = token.upper
+                if token.text.startswith("@"):
+                    sources.update(self.variables.get(token.text.lower(), ()))
+                elif (word not in KEYWORDS and not (following is not None and following.text == "(")
+                      and not _is_word(previous, "AS")
+                      and not (previous is not None and previous.text == "(" and i > 1
+                               and tokens[i - 2].kind == "name" and tokens[i - 2].upper in FIRST_ARGUMENT_FUNCTIONS)
+                      and not _in_at_time_zone(tokens, i)):
+                    source = self.resolve_column(token, scope, statement)
+                    if source:
+                        sources.add(source)
+            i += 1
+        return sources
+
+    # -- SELECT ----------------------------------------------------------
+
+    @staticmethod
+    def _split(tokens: List[Token], separator: str = ",") -> List[List[Token]]:
+        parts, current, depth = [], [], 0
+        for token in tokens:
+            if token.text == "(":
+                depth += 1
+            elif token.text == ")":
+                depth -= 1
+            if depth == 0 and token.text == separator:
+                parts.append(current)
+                current = []
+            else:
+                current.append(token)
+        if current:
+            parts.append(current)
+        return parts
+
+    @staticmethod
+    def _find(tokens: List[Token], words: frozenset, start: int = 0) -> int:
+        depth = 0
+        for i in range(start, len(tokens)):
+            token = tokens[i]
+            if token.text == "(":
+                depth += 1
+            elif token.text == ")":
+                depth -= 1
+            elif depth == 0 and token.kind == "name" and token.upper in words:
+                return i
+        return len(tokens)
+
+    def from_clause(self, tokens: List[Token], scope: list, statement: int) -> list:
+        """[(alias, relation)] for the table sources of a FROM clause (joins, derived tables, APPLY)."""
+        frame = []
+        matches = _matching_parens(tokens)
+        i, expect_source = 0, True
+        while i < len(tokens):
+            token = tokens[i]
+            if (token.kind == "name" and token.upper in _JOIN_WORDS
+                    and not (i + 1 < len(tokens) and tokens[i + 1].text == "(" and token.upper in ("LEFT", "RIGHT"))):
+                expect_source = True
+                i += 1
+                continue
+            if token.text == ",":
+                expect_source = True
+                i += 1
+                continue
+            if _is_word(token, "ON"):
+                expect_source = False
+                i += 1
+                continue
+            if not expect_source:
+                i = matches.get(i, i) + 1 if token.text == "(" else i + 1
+                continue
+
+            expect_source = False
+            if token.text == "(":
+                end = matches.get(i, len(tokens) - 1)
+                inner = tokens[i + 1:end]
+                i = end + 1
+                alias, i = self._alias(tokens, i)
+                relation = self.scoped(alias or "derived", statement)
+                if _is_word(inner[0] if inner else None, "SELECT", "WITH"):
+                    for column, sources in self.select(inner, [frame, *scope], statement):
+                        self.write(relation, column, sources, -1)
+                frame.append(((alias or relation).lower(), relation))
+                continue
+            if token.kind != "name" or token.upper in _NOT_COLUMN:
+                i += 1
+                continue
+            if i + 1 < len(tokens) and tokens[i + 1].text == "(":
+                # Table-valued function: its output columns are not known here
+                i = matches.get(i + 1, i + 1) + 1
+                alias, i = self._alias(tokens, i)
+                relation = self.scoped(alias or token.parts[-1], statement)
+                frame.append(((alias or token.parts[-1]).lower(), relation))
+                continue
+            relation = self.ctes.get(token.text.lower()) if len(token.parts) == 1 else None
+            relation = relation or self.relation(token)
+            i += 1
+            alias, i = self._alias(tokens, i)
+            if _is_word(tokens[i] if i < len(tokens) else None, "WITH") and i + 1 < len(tokens) and tokens[i + 1].text == "(":
+                i = matches.get(i + 1, i + 1) + 1  # table hints
+            frame.append((token.parts[-1].lower(), relation))
+            if alias:
+                frame.append((alias.lower(), relation))
+            if len(token.parts) > 1:
+                frame.append((".".join(p.lower() for p in token.parts), relation))
+        return frame
+
+    @staticmethod
+    def _alias(tokens: List[Token], i: int) -> Tuple[Optional[str], int]:
+        if i < len(tokens) and _is_word(tokens[i], "AS"):
+            i += 1
+        if i < len(tokens) and tokens[i].kind == "name" and tokens[i].upper not in _NOT_COLUMN and tokens[i].upper not in _JOIN_WORDS:
+            return tokens[i].parts[-1], i + 1
+        if i < len(tokens) and tokens[i].kind == "str":  # AS 'alias'
+            return _label(tokens[i]), i + 1
+        return None, i
+
+    def select_items(self, tokens: List[Token], scope: list, statement: int) -> List[Tuple[Optional[str], Set[Source], List[Token]]]:
+        items = []
+        i = 0
+        while i < len(tokens) and _is_word(tokens[i], "DISTINCT", "ALL", "TOP", "PERCENT", "WITH", "TIES"):
+            if _is_word(tokens[i], "TOP"):
+                i += 1
+                if i < len(tokens) and tokens[i].text == "(":
+                    i = _matching_parens(tokens).get(i, i) + 1
+                    continue
+            i += 1
+        for item in self._split(tokens[i:]):
+            if not item:
+                continue
+            name = None
+            expression = item
+            if len(item) >= 3 and item[1].text == "=" and item[0].text.startswith("@"):
+                # SELECT @v = expr assigns a variable instead of returning a column
+                self.variables[item[0].text.lower()] = self.expression_sources(item[2:], scope, statement)
+                continue
+            if len(item) >= 3 and item[1].text == "=" and item[0].kind in ("name", "str"):
+                name, expression = _label(item[0]), item[2:]
+            elif len(item) >= 2 and _is_word(item[-2], "AS"):
+                name, expression = _label(item[-1]), item[:-2]
+            elif (len(item) >= 2 and item[-1].kind in ("name", "str") and item[-1].upper not in _NOT_COLUMN
+                  and (item[-2].kind in ("name", "num", "str") or item[-2].text == ")")
+                  and not _is_word(item[-2], "CASE", "ELSE", "THEN", "AND", "OR", "NOT", "IS", "WHEN")):
+                name, expression = _label(item[-1]), item[:-1]
+            elif len(item) == 1 and item[0].kind == "name":
+                name = item[0].parts[-1]
+            items.append((name, self.expression_sources(expression, scope, statement), expression))
+        return items
+
+    def select(self, tokens: List[Token], scope: list, statement: int,
+               into: Optional[list] = None) -> List[Tuple[str, Set[Source]]]:
+        """
+        Output columns of a SELECT (with set operators, CTEs) as [(name, sources)].
+        `into`, when given, receives the INTO target token.
+        """
+        if _is_word(tokens[0] if tokens else None, "WITH"):
+            tokens = self.with_clause(tokens, scope, statement)
+        branches = []
+        current, depth = [], 0
+        for token in tokens:
+            if token.text == "(":
+                depth += 1
+            elif token.text == ")":
+                depth -= 1
+            if depth == 0 and token.kind == "name" and token.upper in _SET_OPERATORS:
+                branches.append(current)
+                current = []
+                continue
+            if depth == 0 and _is_word(token, "ALL") and not current:
+                continue
+            current.append(token)
+        branches.append(current)
+
+        output: List[Tuple[str, Set[Source]]] = []
+        for number, branch in enumerate(branches):
+            if not branch or not _is_word(branch[0], "SELECT"):
+                continue
+            list_end = self._find(branch, _SELECT_END, 1)
+            clause = branch[list_end:]
+            frame = []
+            into_at = self._find(clause, frozenset(["INTO"]))
+            from_at = self._find(clause, frozenset(["FROM"]))
+            if into is not None and into_at < len(clause) and into_at + 1 < len(clause):
+                into.append(clause[into_at + 1])
+            if from_at < len(clause):
+                from_end = self._find(clause, _FROM_END, from_at + 1)
+                frame = self.from_clause(clause[from_at + 1:from_end], scope, statement)
+            items = self.select_items(branch[1:list_end], [frame, *scope], statement)
+
+            expanded = []
+            for name, sources, expression in items:
+                if len(expression) == 1 and expression[0].parts[-1] == "*":
+                    expanded.extend(self.expand_star(expression[0], frame, statement))
+                else:
+                    expanded.append((name, sources))
+            if number == 0:
+                output = [(name, set(sources)) for name, sources in expanded]
+            else:
+                for position, (_, sources) in enumerate(expanded[:len(output)]):
+                    output[position][1].update(sources)
+        return output
+
+    def expand_star(self, token: Token, frame: list, statement: int) -> List[Tuple[str, Set[Source]]]:
+        relations = list(dict.fromkeys(relation for _, relation in frame))
+        if len(token.parts) > 1:
+            qualifier = token.parts[-2].lower()
+            relations = [relation for alias, relation in frame if alias == qualifier][:1]
+        expanded = []
+        for relation in relations:
+            known = self.columns.get(relation)
+            if known:
+                expanded.extend((column, {(relation, column, statement)}) for column in known)
+            else:
+                expanded.append(("*", {(relation, "*", statement)}))
+        return expanded
+
+    def with_clause(self, tokens: List[Token], scope: list, statement: int) -> List[Token]:
+        """Register the CTEs of a WITH prefix; returns the statement after it."""
+        matches = _matching_parens(tokens)
+        i = 1
+        while i < len(tokens) and tokens[i].kind == "name":
+            name = tokens[i].text
+            i += 1
+            columns = None
+            if i < len(tokens) and tokens[i].text == "(":
+                end = matches.get(i, i)
+                columns = [t.parts[-1] for t in tokens[i + 1:end] if t.kind == "name"]
+                i = end + 1
+            if not _is_word(tokens[i] if i < len(tokens) else None, "AS") or i + 1 >= len(tokens):
+                break
+            start = i + 1
+            end = matches.get(start, len(tokens) - 1)
+            relation = self.scoped(name, statement)
+            self.ctes[name.lower()] = relation
+            output = self.select(tokens[start + 1:end], scope, statement)
+            for position, (column, sources) in enumerate(output):
+                if columns and position < len(columns):
+                    column = columns[position]
+                self.write(relation, column or f"col{position + 1}", sources, -1)
+            i = end + 1
+            if i < len(tokens) and tokens[i].text == ",":
+                i += 1
+                continue
+            break
+        return tokens[i:]
+
+    # -- statements ----------------------------------------------------
+
+    def run(self) -> Dataflow:
+        statements = split_statements(tokenize(self.sql))
+        self.flow.statements = len(statements)
+        for index, statement in enumerate(statements):
+            self.ctes = {}
+            try:
+                self.statement(statement, index)
+            except (IndexError, KeyError, ValueError):
+                self.problem("unparsed", statement)
+        self.collapse()
+        return self.flow
+
+    def statement(self, tokens: List[Token], index: int) -> None:
+        head = tokens[0].upper if tokens[0].kind == "name" else ""
+        body = tokens
+        if head == "WITH":
+            body = self.with_clause(tokens, [], index)
+            head = body[0].upper if body and body[0].kind == "name" else ""
+        if head == "INSERT":
+            self.insert(body, index, tokens)
+        elif head == "SELECT":
+            into = []
+            output = self.select(body, [], index, into)
+            if into:
+                target = self.relation(into[0])
+                self.reset(target, index)
+                self.columns.pop(target, None)
+                for column, sources in output:
+                    if column is None:
+                        self.problem("unnamed_column", tokens)
+                        continue
+                    self.write(target, column, sources, index)
+        elif head == "UPDATE":
+            self.update(body, index, tokens)
+        elif head == "MERGE":
+            self.merge(body, index, tokens)
+        elif head == "DECLARE":
+            self.declare(body, index)
+        elif head == "CREATE" and len(body) > 2 and _is_word(body[1], "TABLE"):
+            target = self.relation(body[2])
+            self.reset(target, index)
+            self.columns[target] = self._column_definitions(body[3:])
+        elif head in ("TRUNCATE", "DROP") and len(body) > 2 and _is_word(body[1], "TABLE"):
+            at = 4 if _is_word(body[2], "IF") else 2  # DROP TABLE IF EXISTS #t
+            if at < len(body):
+                self.reset(self.relation(body[at]), index)
+        elif head == "DELETE":
+            at = 2 if _is_word(body[1] if len(body) > 1 else None, "FROM") else 1
+            if at < len(body) and self._find(body, frozenset(["WHERE", "FROM"]), at + 1) == len(body):
+                self.reset(self.relation(body[at]), index)
+        elif head == "SET" and len(body) > 3 and body[1].text.startswith("@") and body[2].text == "=":
+            self.variables[body[1].text.lower()] = self.expression_sources(body[3:], [], index)
+        elif head in ("EXEC", "EXECUTE") and self._dynamic(body):
+            self.problem("dynamic_sql", tokens)
+        if any(_is_word(t, "CURSOR") for t in body[:4]):
+            self.problem("cursor", tokens)
+
+    @staticmethod
+    def _dynamic(tokens: List[Token]) -> bool:
+        return (len(tokens) > 1 and tokens[1].text == "(") or any(
+            t.kind == "name" and t.parts[-1].lower() == "sp_executesql" for t in tokens[:3])
+
+    @staticmethod
+    def _column_definitions(tokens: List[Token]) -> List[str]:
+        if not tokens or tokens[0].text != "(":
+            return []
+        end = _matching_parens(tokens).get(0, len(tokens) - 1)
+        columns = []
+        for definition in _Analyzer._split(tokens[1:end]):
+            if definition and definition[0].kind == "name" and definition[0].upper not in (
+                    "PRIMARY", "UNIQUE", "CONSTRAINT", "INDEX", "CHECK", "FOREIGN", "PERIOD"):
+                columns.append(definition[0].parts[-1])
+        return columns
+
+    def declare(self, tokens: List[Token], index: int) -> None:
+        # DECLARE @t TABLE (...), DECLARE @a int = 1, @b ...
+        if len(tokens) > 2 and tokens[1].text.startswith("@") and _is_word(tokens[2], "TABLE") or (
+                len(tokens) > 3 and _is_word(tokens[2], "AS") and _is_word(tokens[3], "TABLE")):
+            name = tokens[1].text.lower()
+            self.table_variables.add(name)
+            relation = self.relation(tokens[1])
+            at = 3 if _is_word(tokens[2], "TABLE") else 4
+            self.columns[relation] = self._column_definitions(tokens[at:])
+            return
+        if len(tokens) > 2 and _is_word(tokens[2], "CURSOR"):
+            return
+        for part in self._split(tokens[1:]):
+            if part and part[0].text.startswith("@"):
+                equals = next((k for k, t in enumerate(part) if t.text == "="), None)
+                if equals is not None:
+                    self.variables[part[0].text.lower()] = self.expression_sources(part[equals + 1:], [], index)
+
+    def insert(self, tokens: List[Token], index: int, statement: List[Token]) -> None:
+        i = 1
+        if _is_word(tokens[i], "INTO"):
+            i += 1
+        if _is_word(tokens[i], "TOP"):
+            i = _matching_parens(tokens).get(i + 1, i + 1) + 1
+        target = self.relation(tokens[i])
+        i += 1
+        if i < len(tokens) and _is_word(tokens[i], "WITH") and i + 1 < len(tokens) and tokens[i + 1].text == "(":
+            i = _matching_parens(tokens).get(i + 1, i + 1) + 1
+        columns = None
+        if i < len(tokens) and tokens[i].text == "(":
+            end = _matching_parens(tokens).get(i, len(tokens) - 1)
+            columns = [t.parts[-1] for t in tokens[i + 1:end] if t.kind == "name"]
+            i = end + 1
+        if i < len(tokens) and _is_word(tokens[i], "OUTPUT"):
+            i = self._find(tokens, frozenset(["SELECT", "VALUES", "EXEC", "EXECUTE", "WITH"]), i + 1)
+        rest = tokens[i:]
+        if not rest:
+            return
+        word = rest[0].upper if rest[0].kind == "name" else ""
+        if word in ("EXEC", "EXECUTE"):
+            self.problem("insert_exec", statement)
+            return
+        if word == "DEFAULT":
+            return
+        if word == "VALUES":
+            rows = [
+                [self.expression_sources(value, [], index) for value in self._split(row[1:-1])]
+                for row in self._split(rest[1:]) if row and row[0].text == "("
+            ]
+            width = max((len(row) for row in rows), default=0)
+            output = [(None, set().union(*(row[k] for row in rows if k < len(row)))) for k in range(width)]
+        elif word in ("SELECT", "WITH"):
+            output = self.select(rest, [], index)
+        else:
+            self.problem("unparsed", statement)
+            return
+
+        known = columns or self.columns.get(target)
+        if not known and target not in self.intermediate:
+            # T-SQL matches the values to the table's columns by position,
+            # and the table's column order is not known here
+            self.problem("positional_insert", statement)
+            return
+        for position, (name, sources) in enumerate(output):
+            if name == "*" and not known:
+                self.write(target, "*", sources, index)  # collapse flags it if it reaches a permanent table
+                continue
+            column = known[position] if known and position < len(known) else name
+            if column is None:
+                if sources:
+                    self.problem("unnamed_column", statement)
+                continue
+            self.write(target, column, sources, index)
+
+    def update(self, tokens: List[Token], index: int, statement: List[Token]) -> None:
+        i = 1
+        if _is_word(tokens[i], "TOP"):
+            i = _matching_parens(tokens).get(i + 1, i + 1) + 1
+        target_token = tokens[i]
+        set_at = self._find(tokens, frozenset(["SET"]), i + 1)
+        from_at = self._find(tokens, frozenset(["FROM"]), set_at + 1)
+        where_at = self._find(tokens, frozenset(["WHERE", "OPTION", "OUTPUT"]), set_at + 1)
+        frame = []
+        if from_at < len(tokens):
+            frame = self.from_clause(tokens[from_at + 1:where_at], [], index)
+        target_name = target_token.parts[-1].lower()
+        target = next((relation for alias, relation in frame if alias == target_name), None)
+        if target is None:
+            target = self.relation(target_token)
+            frame.append((target_name, target))
+        assignments = tokens[set_at + 1:min(from_at, where_at)]
+        self._assign(target, assignments, [frame], index, statement)
+
+    def _assign(self, target: str, assignments: List[Token], scope: list, index: int, statement: List[Token]) -> None:
+        for assignment in self._split(assignments):
+            equals = next((k for k, t in enumerate(assignment) if t.text == "="), None)
+            if equals is None or equals == 0:
+                continue
+            compound = assignment[equals - 1].kind == "op"  # SET col += expr
+            column_token = assignment[equals - 2] if compound and equals >= 2 else assignment[equals - 1]
+            sources = self.expression_sources(assignment[equals + 1:], scope, index)
+            if column_token.text.startswith("@"):
+                self.variables[column_token.text.lower()] = sources
+                continue
+            if column_token.kind != "name":
+                self.problem("unparsed", statement)
+                continue
+            column = column_token.parts[-1]
+            if compound:
+                sources.add((target, column, index))
+            self.write(target, column, sources, index)
+
+    def merge(self, tokens: List[Token], index: int, statement: List[Token]) -> None:
+        i = 2 if _is_word(tokens[1], "INTO") else 1
+        if _is_word(tokens[i], "TOP"):
+            i = _matching_parens(tokens).get(i + 1, i + 1) + 1
+        target = self.relation(tokens[i])
+        target_alias, _ = self._alias(tokens, i + 1)
+        frame = [(tokens[i].parts[-1].lower(), target)]
+        if target_alias:
+            frame.append((target_alias.lower(), target))
+        using_at = self._find(tokens, frozenset(["USING"]), i + 1)
+        on_at = self._find(tokens, frozenset(["ON"]), using_at + 1)
+        frame.extend(self.from_clause(tokens[using_at + 1:on_at], [], index))
+
+        matches = _matching_parens(tokens)
+        j = on_at
+        while j < len(tokens):
+            j = self._find(tokens, frozenset(["THEN"]), j + 1)
+            if j >= len(tokens) - 1:
+                break
+            action = tokens[j + 1]
+            clause_end = self._find(tokens, frozenset(["WHEN", "OUTPUT", "OPTION"]), j + 1)
+            if _is_word(action, "UPDATE") and _is_word(tokens[j + 2], "SET"):
+                self._assign(target, tokens[j + 3:clause_end], [frame], index, statement)
+            elif _is_word(action, "INSERT"):
+                k = j + 2
+                columns = None
+                if tokens[k].text == "(":
+                    end = matches.get(k, k)
+                    columns = [t.parts[-1] for t in tokens[k + 1:end] if t.kind == "name"]
+                    k = end + 1
+                if _is_word(tokens[k], "VALUES") and tokens[k + 1].text == "(":
+                    end = matches.get(k + 1, clause_end)
+                    values = self._split(tokens[k + 2:end])
+                    known = columns or self.columns.get(target)
+                    for position, value in enumerate(values):
+                        if known and position < len(known):
+                            self.write(target, known[position], self.expression_sources(value, [frame], index), index)
+                        else:
+                            self.problem("unnamed_column", statement)
+            j = clause_end - 1
+
+    # -- collapse --------------------------------------------------------
+
+    def trace(self, relation: Optional[str], column: str, at: int, stack: frozenset) -> Set[Tuple[Optional[str], str, Tuple[str, ...]]]:
+        """Permanent (relation, column, via) origins of `column` of `relation` as read at statement `at`."""
+        if relation is None:
+            return {(None, column, ())}
+        if relation not in self.intermediate:
+            return {(relation, column, ())}
+        key = (relation, column.lower(), at)
+        if key in stack:
+            return set()
+        memo = self._memo.get(key)
+        if memo is not None:
+            return memo
+
+        visible = []
+        for event_at, colmap in self.events.get(relation, ()):
+            if event_at >= at and event_at != -1:
+                break
+            if colmap is None:
+                visible = []
+            else:
+                visible.append(colmap)
+
+        origins = set()
+        name = self.display.get(relation, relation)
+        for colmap in visible:
+            for written in {column.lower(), "*"}:
+                for source_relation, source_column, source_at in colmap.get(written, ()):
+                    if source_column == "*":
+                        source_column = column  # SELECT * passes columns through by name
+                    for origin in self.trace(source_relation, source_column, source_at, stack | {key}):
+                        origins.add((origin[0], origin[1], (name, *origin[2])))
+        if not origins and column != "*":
+            origins = {(None, f"{name}.{column}", (name,))}
+        self._memo[key] = origins
+        return origins
+
+    def collapse(self) -> None:
+        self._memo = {}
+        seen = set()
+        targets, sources = [], set()
+        for target, column, column_sources, at in self.writes:
+            target_name = self.display.get(target, target)
+            if target_name not in targets:
+                targets.append(target_name)
+            for source_relation, source_column, source_at in column_sources:
+                for origin_relation, origin_column, via in self.trace(source_relation, source_column, source_at, frozenset()):
+                    if origin_relation is None:
+                        self.flow.unresolved.append({
+                            "reason": "untracked_column" if via else "ambiguous_column",
+                            "column": f"{target_name}.{column} <- {origin_column}",
+                        })
+                        continue
+                    source_name = self.display.get(origin_relation, origin_relation)
+                    mapping = (target_name, column.lower(), source_name, origin_column.lower())
+                    if mapping in seen:
+                        continue
+                    seen.add(mapping)
+                    sources.add(source_name)
+                    self.flow.mappings.append({
+                        "target_table": target_name, "target_column": column,
+                        "source_table": source_name, "source_column": origin_column,
+                        "via": list(dict.fromkeys(via)),
+                    })
+                    if "*" in (column, origin_column):
+                        self.flow.unresolved.append({"reason": "star", "column": f"{target_name}.{column}"})
+        self.flow.targets = targets
+        self.flow.sources = sorted(sources)
+        self.flow.intermediates = sorted(self.display[r] for r in self.intermediate if r.startswith(("#", "@")))
+
+
+def analyze_dataflow(sql: str) -> Dataflow:
+    """End-to-end column mappings of a procedure body through its intermediate tables."""
+    return _Analyzer(sql).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Column dataflow of a procedure body")
+    parser.add_argument("path")
+    args = parser.parse_args()
+    with open(args.path, encoding="utf-8") as f:
+        flow = analyze_dataflow(f.read())
+    print(json.dumps({
+        "complete": flow.complete,
+        "targets": flow.targets,
+        "intermediates": flow.intermediates,
+        "mappings": flow.mappings,
+        "unresolved": flow.unresolved,
+    }, indent=2))
@@ -0,0 +1,226 @@
+# backend/utils/deadline.py
+"""
+Per-request deadlines and client-disconnect cancellation.
+
+DeadlineMiddleware gives every request a Deadline (per-endpoint defaults,
+optionally shortened by an `X-Request-Timeout` header) held in a context
+variable, so it follows the request into threadpool workers. When the
+client disconnects or the deadline passes, the endpoint task is cancelled
+and the Deadline is marked, which stops synchronous work at its next
+checkpoint:
+
+- `check_deadline()` raises before each LLM call, each SQL statement (via
+  `apply_query_timeouts`), each procedure of a bulk run and while waiting
+  on another worker's single-flight computation;
+- `llm_timeout()` bounds each LLM request by the time left;
+- SQL Server statements get an ODBC query timeout of the time left.
+
+Work outside a request (watcher, CLIs) has no deadline and never aborts.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event
+from utils.env import load_env
+from utils.metrics import record_request_aborted
+from utils.profiling import note_thread
+
+# Seconds per path prefix; the longest matching prefix wins, 0 disables.
+# Override with REQUEST_TIMEOUTS="/lineage=120,/analyze=60".
+DEFAULT_TIMEOUTS = {
+    "/analyze": 120,
+    "/analyze/status": 30,
+    "/analyze/bulk": 3600,
+    "/lineage": 180,
+    "/lineage/save": 60,
+    "/lineage/bulk": 3600,
+    "/search": 30,
+}
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "300"))
+TIMEOUT_HEADER = b"x-request-timeout"
+
+
+class RequestAborted(Exception):
+    """The request's client went away or its deadline passed."""
+
+
+class DeadlineExceeded(RequestAborted):
+    pass
+
+
+class RequestCancelled(RequestAborted):
+    pass
+
+
+class Deadline:
+    def __init__(self, seconds: Optional[float]):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise RequestCancelled("client disconnected")
+        if self.expires_at is not None and time.monotonic() >= self.expires_at:
+            raise DeadlineExceeded("request deadline exceeded")
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def check_deadline() -> None:
+    note_thread()  # checkpoints also tell a running profile which threads to report
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def llm_timeout(default: float = LLM_TIMEOUT_SECONDS) -> float:
+    """Timeout for one LLM request: the configured default, capped by the time left."""
+    check_deadline()
+    deadline = _current.get()
+    remaining = deadline.remaining() if deadline else None
+    return default if remaining is None else max(0.001, min(default, remaining))
+
+
+def _parse_timeouts(raw: str) -> Dict[str, float]:
+    timeouts = {}
+    for item in raw.split(","):
+        if "=" in item:
+            prefix, seconds = item.split("=", 1)
+            timeouts[prefix.strip().rstrip("/") or "/"] = float(seconds)
+    return timeouts
+
+
+def endpoint_timeouts() -> Dict[str, float]:
+    load_env()
+    return {**DEFAULT_TIMEOUTS, **_parse_timeouts(os.getenv("REQUEST_TIMEOUTS", ""))}
+
+
+def timeout_for(path: str, timeouts: Dict[str, float], requested: Optional[float] = None) -> Optional[float]:
+    """Endpoint default for `path`; a client-requested timeout may only shorten it."""
+    matches = [p for p in timeouts if path == p or path.startswith(p + "/") or p == "/"]
+    seconds = timeouts[max(matches, key=len)] if matches else 0
+    if requested and requested > 0:
+        return min(seconds, requested) if seconds else requested
+    return seconds or None
+
+
+def apply_query_timeouts(engine) -> None:
+    """
+    Check the current deadline before every statement on `engine` and, on
+    SQL Server (pyodbc), give the statement a query timeout of the time left.
+    """
+    pyodbc = engine.dialect.driver == "pyodbc"
+
+    @event.listens_for(engine, "before_execute")
+    def _before(conn, clauseelement, multiparams, params, execution_options):
+        deadline = _current.get()
+        if deadline is not None:
+            deadline.check()
+        if pyodbc:
+            remaining = deadline.remaining() if deadline else None
+            # Applied to cursors created from here on; 0 resets a pooled
+            # connection last used under a deadline.
+            conn.connection.dbapi_connection.timeout = 0 if remaining is None else max(1, math.ceil(remaining))
+
+
+class DeadlineMiddleware:
+    """
+    Pure ASGI middleware: runs the endpoint as a task that is cancelled when
+    the client disconnects or the request's deadline passes (504 if no
+    response has started yet).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.timeouts = endpoint_timeouts()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = None
+        header = dict(scope.get("headers") or ()).get(TIMEOUT_HEADER)
+        if header:
+            try:
+                requested = float(header)
+            except ValueError:
+                pass
+        deadline = Deadline(timeout_for(scope["path"], self.timeouts, requested))
+
+        # Read the request ourselves so a disconnect is noticed even while the
+        # endpoint is busy; the endpoint gets the same messages from a queue.
+        messages = asyncio.Queue()
+        disconnected = asyncio.Event()
+
+        async def pump():
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    deadline.cancel()
+                    disconnected.set()
+                    return
+
+        async def queued_receive():
+            if disconnected.is_set() and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        started = {"response": False}
+
+        async def tracked_send(message):
+            if message["type"] == "http.response.start":
+                started["response"] = True
+            await send(message)
+
+        token = _current.set(deadline)
+        try:
+            app_task = asyncio.ensure_future(self.app(scope, queued_receive, tracked_send))
+        finally:
+            _current.reset(token)
+        pump_task = asyncio.ensure_future(pump())
+        gone = asyncio.ensure_future(disconnected.wait())
+        try:
+            done, _ = await asyncio.wait({app_task, gone}, timeout=deadline.remaining(),
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if app_task in done:
+                app_task.result()
+                return
+
+            reason = "disconnect" if gone in done else "deadline"
+            record_request_aborted(reason)
+            # Threadpool work cannot be interrupted; it stops at its next
+            # checkpoint. Don't keep the event loop slot waiting for it.
+            app_task.cancel()
+            app_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+            if reason == "deadline" and not started["response"]:
+                await send({
+                    "type": "http.response.start", "status": 504,
+                    "headers": [(b"content-type", b"application/json")],
+                })
+                await send({"type": "http.response.body", "body": b'{"detail":"request deadline exceeded"}'})
+        finally:
+            gone.cancel()
+            pump_task.cancel()
@@ -0,0 +1,9 @@
+# backend/utils/env.py
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def load_env() -> None:
+    """Load .env once per process; safe to call from every lazy provider."""
+    from dotenv import load_dotenv
+    load_dotenv()
@@ -0,0 +1,75 @@
+# backend/utils/http_cache.py
+"""
+Conditional GET for catalog and mapping listings. Each listing has a cheap
+version query (row count plus the latest modify_date / created_at); the
+ETag is derived from it, so a matching If-None-Match is answered with 304
+before the listing itself is built. Sources without a version query (e.g.
+no sys.tables) fall back to an ETag over the body, which still saves the
+transfer.
+"""
+import hashlib
+import json
+from typing import Any, Callable, Optional
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+# Count catches drops and deletes; the max timestamp catches creates,
+# alters and rewritten rows.
+VERSION_QUERIES = {
+    "tables": "SELECT COUNT(*), MAX(modify_date) FROM sys.tables",
+    "procedures": "SELECT COUNT(*), MAX(modify_date) FROM sys.procedures",
+    "source_to_stage_map": "SELECT COUNT(*), MAX(created_at) FROM source_to_stage_map",
+}
+
+# Clients revalidate on every load; unchanged data costs one round trip.
+CACHE_CONTROL = "no-cache"
+
+
+def data_version(engine, kind: str) -> Optional[str]:
+    """Version token for a listing, or None when the source has no version query."""
+    try:
+        with engine.connect() as conn:
+            count, latest = conn.execute(text(VERSION_QUERIES[kind])).one()
+    except Exception:
+        return None
+    return f"{count}:{latest}"
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode("utf-8")).hexdigest()[:32]
+    # Weak: the same listing may be sent gzip, brotli or identity encoded.
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def versioned_response(request: Request, key: tuple, version: Optional[str], build: Callable[[], Any]) -> Response:
+    """
+    JSON response for `build()` tagged with an ETag. With a `version`, a
+    client that already holds it gets a 304 without `build` being called.
+    """
+    if version is not None:
+        etag = make_etag(*key, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        content = jsonable_encoder(build())
+    else:
+        content = jsonable_encoder(build())
+        etag = make_etag(*key, content)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    return JSONResponse(content, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -1,31 +1,93 @@
 # backend/utils/llm.py
+import logging
 import os
-from openai import AzureOpenAI
-from dotenv import load_dotenv
-load_dotenv()
+import time
+from functools import lru_cache
+from utils.deadline import llm_timeout
+from utils.env import load_env
+from utils.metrics import record_llm_call
 
-endpoint = os.environ.get("AZURE_OPENAI_ENDPOINT")
-deployment = os.environ.get("AZURE_OPENAI_DEPLOYMENT", "model-router")
-api_version = os.environ.get("AZURE_OPENAI_API_VERSION", "2024-12-01-preview")
-api_key = os.environ.get("AZURE_OPENAI_API_KEY")
 
-client = AzureOpenAI(
-    api_version=api_version,
-    azure_endpoint=endpoint,
-    api_key=api_key,
-)
+def get_deployment() -> str:
+    load_env()
+    return os.environ.get("AZURE_OPENAI_DEPLOYMENT", "model-router")
+
+
+@lru_cache(maxsize=None)
+def get_client():
+    """Shared AzureOpenAI client, built on first use so importing the app stays cheap."""
+    load_env()
+    from openai import AzureOpenAI
+
+    return AzureOpenAI(
+        api_version=os.environ.get("AZURE_OPENAI_API_VERSION", "2024-12-01-preview"),
+        azure_endpoint=os.environ.get("AZURE_OPENAI_ENDPOINT"),
+        api_key=os.environ.get("AZURE_OPENAI_API_KEY") or os.environ.get("AZURE_OPENAI_KEY"),
+    )
+
+log = logging.getLogger(__name__)
+
+# Deployments that rejected a response_format; they get plain prompts after that.
+_NO_RESPONSE_FORMAT = set()
+
+
+def structured_output(name: str, schema: dict) -> dict | None:
+    """
+    response_format for a JSON-schema answer, per LLM_STRUCTURED_OUTPUT:
+    json_schema (strict schema, default), json_object (any JSON) or off.
+    """
+    load_env()
+    mode = os.getenv("LLM_STRUCTURED_OUTPUT", "json_schema").lower()
+    if mode == "json_schema":
+        return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+def _rejects_response_format(error) -> bool:
+    """Whether a 400 is about response_format itself, not e.g. context length or a content filter."""
+    fields = (getattr(error, "param", None), getattr(error, "code", None), getattr(error, "message", None))
+    return any(field and ("response_format" in str(field) or "json_schema" in str(field)) for field in fields)
+
 
 class LLMResponse:
     def __init__(self, content: str):
         self.content = content
 
-def call_model(prompt: str) -> LLMResponse:
-    response = client.chat.completions.create(
-        model=deployment,
-        messages=[
+def call_model(prompt: str, deployment: str | None = None, response_format: dict | None = None) -> LLMResponse:
+    from openai import BadRequestError
+
+    deployment = deployment or get_deployment()
+    request = {
+        "model": deployment,
+        "messages": [
             {"role": "system", "content": "You are a SQL data engineer assistant."},
             {"role": "user", "content": prompt},
         ],
-        temperature=0,
+        "temperature": 0,
+    }
+    if response_format and deployment not in _NO_RESPONSE_FORMAT:
+        request["response_format"] = response_format
+
+    started = time.perf_counter()
+    try:
+        response = get_client().chat.completions.create(**request, timeout=llm_timeout())
+    except BadRequestError as e:
+        # Older API versions and some deployments (e.g. model-router) reject
+        # json_schema; the prompt still asks for JSON, so retry without it.
+        if "response_format" not in request or not _rejects_response_format(e):
+            raise
+        log.warning("%s rejected response_format; falling back to plain prompts", deployment)
+        _NO_RESPONSE_FORMAT.add(deployment)
+        del request["response_format"]
+        started = time.perf_counter()
+        response = get_client().chat.completions.create(**request, timeout=llm_timeout())
+    usage = response.usage
+    record_llm_call(
+        deployment,
+        time.perf_counter() - started,
+        usage.prompt_tokens if usage else 0,
+        usage.completion_tokens if usage else 0,
     )
-    return LLMResponse(response.choices[0].message.content)
\ No newline at end of file
+    return LLMResponse(response.choices[0].message.content)
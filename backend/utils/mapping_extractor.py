@@ -62,4 +62,171 @@ def extract_procedure_mappings(sql: str) -> Dict:
         "temp_table": temp_table,
         "target_table": target_table,
         "column_mappings": mappings
-    }
\ No newline at end of file
+    }
+
+_SIGNAL_PATTERNS = {
+    "inserts": re.compile(r'\bINSERT\s+(?:INTO\s+)?[\[\w#@]', re.IGNORECASE),
+    "updates": re.compile(r'\bUPDATE\s+[\[\w#@]', re.IGNORECASE),
+    "deletes": re.compile(r'\bDELETE\s+(?:FROM\s+)?[\[\w#@]', re.IGNORECASE),
+    "merges": re.compile(r'\bMERGE\s+(?:INTO\s+)?[\[\w#@]', re.IGNORECASE),
+    "select_into": re.compile(r'\bINTO\s+#\w+', re.IGNORECASE),
+    "joins": re.compile(r'\bJOIN\b', re.IGNORECASE),
+    "cursors": re.compile(r'\bCURSOR\b', re.IGNORECASE),
+    "dynamic_sql": re.compile(r'\bsp_executesql\b|\bEXEC(?:UTE)?\s*\(', re.IGNORECASE),
+}
+_TEMP_TABLE = re.compile(r'#\w+')
+_TABLE_VARIABLE = re.compile(r'DECLARE\s+@\w+\s+(?:AS\s+)?TABLE\b', re.IGNORECASE)
+
+
+def procedure_signals(sql: str) -> Dict[str, int]:
+    """
+    Cheap structural counts for a procedure body (regex only, no sqlparse),
+    used to judge how hard it is to analyze.
+    """
+    signals = {name: len(pattern.findall(sql)) for name, pattern in _SIGNAL_PATTERNS.items()}
+    signals["temp_tables"] = len(set(t.lower() for t in _TEMP_TABLE.findall(sql)))
+    signals["table_variables"] = len(_TABLE_VARIABLE.findall(sql))
+    signals["writes"] = signals["inserts"] + signals["updates"] + signals["merges"] + signals["select_into"]
+    signals["lines"] = sql.count("\n") + 1
+    return signals
+
+
+_OBJECT_NAME = r'((?:\[[^\]]+\]|\w+)(?:\s*\.\s*(?:\[[^\]]+\]|\w+)){0,3})'
+_WRITE_TARGETS = [
+    re.compile(r'\bINSERT\s+(?:INTO\s+)?' + _OBJECT_NAME, re.IGNORECASE),
+    re.compile(r'\bUPDATE\s+' + _OBJECT_NAME + r'\s+SET\b', re.IGNORECASE),
+    re.compile(r'\bMERGE\s+(?:INTO\s+)?' + _OBJECT_NAME, re.IGNORECASE),
+    re.compile(r'\bDELETE\s+(?:FROM\s+)?' + _OBJECT_NAME, re.IGNORECASE),
+    re.compile(r'\bTRUNCATE\s+TABLE\s+' + _OBJECT_NAME, re.IGNORECASE),
+    re.compile(r'\bSELECT\b[^;]*?\bINTO\s+' + _OBJECT_NAME + r'\s+FROM\b', re.IGNORECASE),
+]
+
+
+_READ_SOURCES = re.compile(
+    r'\b(?:FROM|JOIN|USING)\s+' + _OBJECT_NAME + r'(?:\s+(?:AS\s+)?(\[[^\]]+\]|\w+))?',
+    re.IGNORECASE,
+)
+
+
+def split_object_name(name: str) -> List[str]:
+    """'[db].[dbo].[Orders]' -> ['db', 'dbo', 'Orders']"""
+    return [part.strip().strip('[]') for part in name.split('.')]
+
+
+# Read sources including temp tables and table variables, for aliases only.
+_ALIASED_SOURCES = re.compile(
+    r'\b(?:FROM|JOIN|USING)\s+([#@]{0,2}' + _OBJECT_NAME[1:] + r'(?:\s+(?:AS\s+)?(\[[^\]]+\]|\w+))?',
+    re.IGNORECASE,
+)
+
+
+def _source_aliases(sql: str) -> Dict[str, List[str]]:
+    """Alias (lower-cased) -> object name parts, from FROM/JOIN/USING clauses."""
+    aliases = {}
+    for match in _ALIASED_SOURCES.finditer(sql):
+        alias = (match.group(2) or '').strip('[]').lower()
+        if alias and alias not in STOPWORDS:
+            aliases[alias] = split_object_name(match.group(1))
+    return aliases
+
+
+def extract_write_targets(sql: str) -> set[Tuple[str | None, str]]:
+    """
+    (schema, table) pairs a procedure writes to, lower-cased; schema is None
+    when unqualified. Targets named by an alias (UPDATE t SET ... FROM
+    dbo.Orders t, DELETE o FROM dbo.Old o) resolve to the aliased table.
+    Temp tables and table variables are skipped.
+    """
+    targets = set()
+    aliases = None
+    for pattern in _WRITE_TARGETS:
+        for match in pattern.finditer(sql):
+            parts = split_object_name(match.group(1))
+            if len(parts) == 1:
+                if aliases is None:
+                    aliases = _source_aliases(sql)
+                parts = aliases.get(parts[0].lower(), parts)
+            table = parts[-1]
+            if not table or table.startswith(('#', '@')) or table.upper() in ('SET', 'INTO', 'FROM', 'TOP'):
+                continue
+            schema = parts[-2].lower() if len(parts) > 1 else None
+            targets.add((schema, table.lower()))
+    return targets
+
+
+_IDENTIFIER = re.compile(r'\[([^\]]+)\]|[#@]{0,2}[A-Za-z_]\w*')
+_QUALIFIED_NAME = re.compile(r'(?<![\w\]\.#@])((?:\[[^\]]+\]|\w+)(?:\s*\.\s*(?:\[[^\]]+\]|\w+)){1,3})')
+_WORD_SPLIT = re.compile(r'[^A-Za-z0-9]+')
+
+# Keywords and filler words that carry no meaning for search or aliasing.
+STOPWORDS = frozenset("""
+    a add all alter an and any as asc begin between by case cast catch close commit convert create
+    cross cursor deallocate declare default delete desc distinct else end exec execute exists fetch
+    for from full go group having if in inner insert into is isnull join left like merge next nocount
+    not null of off on open or order outer over partition print proc procedure return right rollback
+    select set table then top tran transaction truncate try union update using values
+    when where while with the this that to be are was it its which
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased search terms: each identifier (brackets removed) plus its
+    underscore-separated parts, minus keywords and one-character tokens.
+    Temp tables and variables keep their `#`/`@` prefix and are not split.
+    """
+    terms = []
+    for match in _IDENTIFIER.finditer(text or ""):
+        word = (match.group(1) or match.group(0)).lower()
+        if word.startswith(('#', '@')):
+            if len(word.lstrip('#@')) > 1:
+                terms.append(word)
+            continue
+        pieces = _WORD_SPLIT.split(word.strip())
+        if len(pieces) > 1:
+            terms.append(word.strip())
+        terms.extend(p for p in pieces if len(p) > 1 and p not in STOPWORDS)
+    return terms
+
+
+def extract_references(sql: str) -> set[Tuple[str | None, str, str | None, str]]:
+    """
+    (schema, table, column, access) references in a procedure body, lower-cased.
+    Tables come from read clauses (FROM/JOIN/USING) and write targets; columns
+    only where qualified by a table name or alias that resolves to one of
+    them. Column is None for table-level references, schema None when
+    unqualified, access is 'read' or 'write'.
+    """
+    refs = set()
+    tables, aliases = set(), {}
+    for match in _READ_SOURCES.finditer(sql):
+        parts = split_object_name(match.group(1))
+        table = parts[-1].lower()
+        if not table or table.startswith(('#', '@')) or table in STOPWORDS:
+            continue
+        schema = parts[-2].lower() if len(parts) > 1 else None
+        refs.add((schema, table, None, 'read'))
+        tables.add((schema, table))
+        aliases.setdefault(table, (schema, table))
+        alias = (match.group(2) or '').strip('[]').lower()
+        if alias and alias not in STOPWORDS:
+            aliases[alias] = (schema, table)
+
+    for schema, table in extract_write_targets(sql):
+        refs.add((schema, table, None, 'write'))
+        tables.add((schema, table))
+        aliases.setdefault(table, (schema, table))
+
+    for match in _QUALIFIED_NAME.finditer(sql):
+        parts = [p.lower() for p in split_object_name(match.group(1))]
+        qualifier, column = parts[-2], parts[-1]
+        if column == '*' or column.startswith(('#', '@')):
+            continue
+        if len(parts) > 2 and (parts[-3], qualifier) in tables:
+            schema, table = parts[-3], qualifier
+        elif qualifier in aliases:
+            schema, table = aliases[qualifier]
+        else:
+            continue
+        refs.add((schema, table, column, 'read'))
+    return refs
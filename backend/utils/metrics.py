@@ -0,0 +1,295 @@
+# backend/utils/metrics.py
+import os
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from sqlalchemy import event
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time by connection alias",
+    ["alias", "operation"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Pooled connections currently checked out by alias",
+    ["alias"],
+)
+
+DB_POOL_HOLD_SECONDS = Histogram(
+    "db_pool_connection_hold_seconds",
+    "Time a pooled connection stays checked out, checkout to checkin, by alias",
+    ["alias"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 120, 600),
+)
+
+DB_POOL_CONNECT_SECONDS = Histogram(
+    "db_pool_connect_seconds",
+    "Time to open a new DBAPI connection for the pool by alias",
+    ["alias"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+DB_ALIAS_QUEUE_SECONDS = Histogram(
+    "db_alias_queue_wait_seconds",
+    "Time spent queued for a per-alias concurrent query slot",
+    ["alias"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+DB_ALIAS_QUEUE_WAITING = Gauge(
+    "db_alias_queue_waiting",
+    "Callers still queued for a query slot, sampled as each one is admitted",
+    ["alias"],
+)
+
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds",
+    "LLM completion latency by deployment",
+    ["deployment"],
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Prompt and completion tokens by deployment",
+    ["deployment", "kind"],
+)
+
+LLM_ESCALATIONS = Counter(
+    "llm_escalations_total",
+    "Calls retried on a larger deployment after failed validation",
+    ["from_tier", "to_tier"],
+)
+
+LINEAGE_PARSE_RESULTS = Counter(
+    "llm_lineage_parse_total",
+    "Lineage responses by first-pass validation result (valid/invalid_json/invalid_mappings)",
+    ["result"],
+)
+
+LINEAGE_DATAFLOW = Counter(
+    "lineage_dataflow_total",
+    "Lineage extractions by static dataflow outcome (static, shrunk, hinted, llm)",
+    ["result"],
+)
+LINEAGE_REPAIRS = Counter(
+    "llm_lineage_repairs_total",
+    "Targeted repair requests for invalid lineage responses by kind and result",
+    ["kind", "result"],
+)
+
+PROC_CACHE_LOOKUPS = Counter(
+    "procedure_cache_lookups_total",
+    "procedure_analysis_cache lookups by result (hit/miss)",
+    ["result"],
+)
+
+SHARED_CACHE_LOOKUPS = Counter(
+    "shared_cache_lookups_total",
+    "Cross-worker cache lookups by namespace and result (hit/miss/wait)",
+    ["namespace", "result"],
+)
+
+WATCHER_QUEUE_DEPTH = Gauge(
+    "watcher_queue_depth",
+    "Changed procedures waiting for re-analysis",
+)
+
+BULK_STAGE_SECONDS = Histogram(
+    "bulk_stage_seconds",
+    "Time per item in each stage of a pipelined bulk run (fetch/llm/write)",
+    ["stage"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+BULK_QUEUE_DEPTH = Gauge(
+    "bulk_queue_depth",
+    "Items waiting between stages of a pipelined bulk run",
+    ["queue"],
+)
+
+WATCHER_PROCEDURES = Counter(
+    "watcher_procedures_total",
+    "Procedures handled by the change watcher by result (analyzed/unchanged/failed/dead_letter)",
+    ["alias", "result"],
+)
+
+REQUESTS_ABORTED = Counter(
+    "http_requests_aborted_total",
+    "Requests whose work was cancelled by reason (disconnect/deadline)",
+    ["reason"],
+)
+
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "MERGE", "WITH", "DROP", "CREATE"}
+
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:10].split(None, 1)
+    word = head[0].upper() if head else ""
+    return word if word in _OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine, alias: str) -> None:
+    """Attach query timing and connection pool usage metrics to an engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        DB_QUERY_SECONDS.labels(alias, _operation(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    # Public pool events only: there is none before a checkout starts, so
+    # contention shows as connections in use staying at the pool's capacity
+    # with long hold times, rather than as a measured wait.
+    in_use = DB_POOL_IN_USE.labels(alias)
+    hold = DB_POOL_HOLD_SECONDS.labels(alias)
+    opened = DB_POOL_CONNECT_SECONDS.labels(alias)
+
+    @event.listens_for(engine, "do_connect")
+    def _do_connect(dialect, connection_record, cargs, cparams):
+        connection_record.info["connect_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        started = connection_record.info.pop("connect_start", None)
+        if started is not None:
+            opened.observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checkout_start"] = time.perf_counter()
+        in_use.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checkout_start", None)
+        if started is not None:
+            hold.observe(time.perf_counter() - started)
+            in_use.dec()
+
+    @event.listens_for(engine, "detach")
+    def _detach(dbapi_connection, connection_record):
+        # Detached connections leave the pool without a checkin
+        if connection_record.info.pop("checkout_start", None) is not None:
+            in_use.dec()
+
+
+def record_alias_queue(alias: str, seconds: float, waiting: int) -> None:
+    DB_ALIAS_QUEUE_SECONDS.labels(alias).observe(seconds)
+    DB_ALIAS_QUEUE_WAITING.labels(alias).set(waiting)
+
+
+def record_llm_call(deployment: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+    deployment = deployment or "unknown"
+    LLM_REQUEST_SECONDS.labels(deployment).observe(seconds)
+    if prompt_tokens:
+        LLM_TOKENS.labels(deployment, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(deployment, "completion").inc(completion_tokens)
+
+
+def record_escalation(from_tier: str, to_tier: str) -> None:
+    LLM_ESCALATIONS.labels(from_tier, to_tier).inc()
+
+
+def record_lineage_parse(result: str) -> None:
+    LINEAGE_PARSE_RESULTS.labels(result).inc()
+
+
+def record_lineage_dataflow(result: str) -> None:
+    LINEAGE_DATAFLOW.labels(result).inc()
+
+
+def record_lineage_repair(kind: str, ok: bool) -> None:
+    LINEAGE_REPAIRS.labels(kind, "ok" if ok else "failed").inc()
+
+
+def record_cache_lookup(hit: bool) -> None:
+    PROC_CACHE_LOOKUPS.labels("hit" if hit else "miss").inc()
+
+
+def record_shared_cache(namespace: str, result: str) -> None:
+    SHARED_CACHE_LOOKUPS.labels(namespace, result).inc()
+
+
+def record_request_aborted(reason: str) -> None:
+    REQUESTS_ABORTED.labels(reason).inc()
+
+
+def record_watcher(alias: str, result: str, queue_depth: int) -> None:
+    WATCHER_PROCEDURES.labels(alias, result).inc()
+    WATCHER_QUEUE_DEPTH.set(queue_depth)
+
+
+def record_bulk_stage(stage: str, seconds: float) -> None:
+    BULK_STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def record_bulk_queue(queue: str, depth: int) -> None:
+    BULK_QUEUE_DEPTH.labels(queue).set(depth)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency per route template (not raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status["code"]),
+            ).observe(time.perf_counter() - started)
+
+
+def render_latest() -> tuple[bytes, str]:
+    # With several workers, point PROMETHEUS_MULTIPROC_DIR at a shared directory
+    # so /metrics aggregates every process instead of whichever one answered.
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
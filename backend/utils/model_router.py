@@ -0,0 +1,90 @@
+# backend/utils/model_router.py
+"""
+Picks a deployment per procedure: small, simple procedures go to a fast
+deployment and very large or complex ones to a large-context deployment.
+Anything unconfigured falls back to AZURE_OPENAI_DEPLOYMENT.
+"""
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from utils.env import load_env
+from utils.mapping_extractor import procedure_signals
+
+TIERS = ("fast", "default", "large")
+
+
+@dataclass
+class Route:
+    tier: str
+    deployment: str
+    tokens: int
+    complexity: int
+    signals: dict = field(default_factory=dict)
+
+
+def _int_env(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(os.getenv("ROUTER_TOKENIZER", "o200k_base"))
+    except Exception:
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count with tiktoken when its encoding is available offline, else ~4 chars/token."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def complexity_score(signals: dict) -> int:
+    # Hops through temp tables and dynamic SQL are what the small models lose.
+    return (
+        signals["writes"]
+        + 2 * (signals["temp_tables"] + signals["table_variables"])
+        + signals["joins"] // 4
+        + 3 * (signals["cursors"] + signals["dynamic_sql"])
+    )
+
+
+def deployment_for(tier: str) -> str:
+    load_env()
+    default = os.getenv("AZURE_OPENAI_DEPLOYMENT", "model-router")
+    if tier == "fast":
+        return os.getenv("AZURE_OPENAI_DEPLOYMENT_FAST") or default
+    if tier == "large":
+        return os.getenv("AZURE_OPENAI_DEPLOYMENT_LARGE") or default
+    return default
+
+
+def classify(tokens: int, complexity: int) -> str:
+    load_env()
+    if tokens >= _int_env("ROUTER_LARGE_MIN_TOKENS", 12000) or complexity >= _int_env("ROUTER_LARGE_MIN_COMPLEXITY", 20):
+        return "large"
+    if tokens <= _int_env("ROUTER_FAST_MAX_TOKENS", 2500) and complexity <= _int_env("ROUTER_FAST_MAX_COMPLEXITY", 4):
+        return "fast"
+    return "default"
+
+
+def route(content: str) -> Route:
+    signals = procedure_signals(content)
+    tokens = estimate_tokens(content)
+    complexity = complexity_score(signals)
+    tier = classify(tokens, complexity)
+    return Route(tier, deployment_for(tier), tokens, complexity, signals)
+
+
+def escalate(current: Route) -> Route | None:
+    """Next tier up with a different deployment, or None when there is nowhere to go."""
+    for tier in TIERS[TIERS.index(current.tier) + 1:]:
+        deployment = deployment_for(tier)
+        if deployment != current.deployment:
+            return Route(tier, deployment, current.tokens, current.complexity, current.signals)
+    return None
@@ -0,0 +1,174 @@
+# backend/utils/pipeline.py
+"""
+Staged producer/consumer pipeline for bulk runs:
+
+    fetch thread -> todo queue -> `concurrency` workers -> done queue -> writer
+
+Both queues are bounded, so a slow stage holds back the stages before it
+instead of buffering: memory stays at a few queued items however many flow
+through. The source iterator is consumed entirely in the fetch thread, and
+closed there if the run stops early. The writer runs in the calling thread
+and receives results in batches of up to BULK_WRITE_BATCH, or whatever has
+arrived after BULK_WRITE_SECONDS, to commit each batch in one transaction.
+
+Every stage runs in a copy of the caller's context, so the request
+deadline and profile follow it. The first error stops all stages and is
+re-raised to the caller.
+"""
+import contextvars
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List
+from utils.deadline import check_deadline
+from utils.env import load_env
+from utils.metrics import record_bulk_queue, record_bulk_stage
+
+_DONE = object()
+_EMPTY = object()
+# Blocked stages wake this often to notice that another stage failed.
+_POLL_SECONDS = 0.1
+
+
+class _Stopped(Exception):
+    """Another stage failed; this one just exits."""
+
+
+def pipeline_settings() -> dict:
+    load_env()
+    concurrency = max(1, int(os.getenv("BULK_LLM_CONCURRENCY", "4")))
+    return {
+        "concurrency": concurrency,
+        "queue_size": max(1, int(os.getenv("BULK_QUEUE_SIZE", str(2 * concurrency)))),
+        "batch_size": max(1, int(os.getenv("BULK_WRITE_BATCH", "20"))),
+        "batch_seconds": float(os.getenv("BULK_WRITE_SECONDS", "5")),
+    }
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> None:
+    while True:
+        if stop.is_set():
+            raise _Stopped()
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return
+        except queue.Full:
+            pass
+
+
+def _get(q: queue.Queue, stop: threading.Event, timeout: float | None = None):
+    """Next item, or _EMPTY once `timeout` seconds pass without one."""
+    expires = None if timeout is None else time.monotonic() + timeout
+    while True:
+        if stop.is_set():
+            raise _Stopped()
+        wait = _POLL_SECONDS
+        if expires is not None:
+            wait = min(wait, expires - time.monotonic())
+            if wait <= 0:
+                return _EMPTY
+        try:
+            return q.get(timeout=wait)
+        except queue.Empty:
+            pass
+
+
+def run_pipeline(items: Iterable, process: Callable, write: Callable[[List], None],
+                 concurrency: int = 1, queue_size: int = 2, batch_size: int = 20,
+                 batch_seconds: float = 5.0) -> int:
+    """
+    Feed `items` through `process` on `concurrency` worker threads and hand
+    the results to `write` in batches. Returns the number of results written.
+    """
+    todo, done = queue.Queue(queue_size), queue.Queue(queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def stage(target: Callable[[], None]) -> Callable[[], None]:
+        def run():
+            try:
+                target()
+            except _Stopped:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+        return run
+
+    def fetch():
+        source = iter(items)
+        try:
+            while True:
+                check_deadline()
+                started = time.perf_counter()
+                item = next(source, _DONE)
+                if item is _DONE:
+                    break
+                record_bulk_stage("fetch", time.perf_counter() - started)
+                _put(todo, item, stop)
+                record_bulk_queue("todo", todo.qsize())
+        finally:
+            # Close a generator (and any connection it holds) in its own thread
+            getattr(source, "close", lambda: None)()
+        for _ in range(concurrency):
+            _put(todo, _DONE, stop)
+
+    def work():
+        while True:
+            item = _get(todo, stop)
+            if item is _DONE:
+                _put(done, _DONE, stop)
+                return
+            check_deadline()
+            started = time.perf_counter()
+            result = process(item)
+            record_bulk_stage("process", time.perf_counter() - started)
+            _put(done, result, stop)
+            record_bulk_queue("done", done.qsize())
+
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(stage(fetch),),
+                                name="bulk-fetch", daemon=True)]
+    threads += [
+        threading.Thread(target=contextvars.copy_context().run, args=(stage(work),),
+                         name=f"bulk-worker-{i}", daemon=True)
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+
+    written, finished, batch, batch_started = 0, 0, [], 0.0
+
+    def flush():
+        nonlocal written, batch
+        if batch:
+            started = time.perf_counter()
+            write(batch)
+            record_bulk_stage("write", (time.perf_counter() - started) / len(batch))
+            written += len(batch)
+            batch = []
+
+    try:
+        while finished < concurrency:
+            wait = batch_seconds - (time.monotonic() - batch_started) if batch else None
+            item = _get(done, stop, wait)
+            if item is _EMPTY:
+                flush()
+            elif item is _DONE:
+                finished += 1
+            else:
+                if not batch:
+                    batch_started = time.monotonic()
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    flush()
+        flush()
+    except _Stopped:
+        pass
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return written
@@ -0,0 +1,219 @@
+# backend/utils/profiling.py
+"""
+Opt-in sampling profiler for single requests. Profiling is off unless
+PROFILE_TOKEN is set; a request is then profiled when it sends
+`X-Profile: <PROFILE_TOKEN>` or is picked by PROFILE_SAMPLE_RATE (0..1).
+The /debug endpoints require the same header. A sampler thread reads the stacks of
+the threads working for the request every PROFILE_INTERVAL_MS and writes a
+text report plus collapsed stacks (flamegraph input) to PROFILE_DIR; the
+response carries its id in `X-Profile-Id`.
+
+Sync endpoints run in the threadpool, so the request's thread is not known
+up front (and cProfile/pyinstrument would only see the event loop thread).
+Stacks of every busy thread are kept during the request and, at the end,
+only the event loop thread and threads that hit a request checkpoint
+(`note_thread`: SQL statements, deadline checks) are reported.
+"""
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+from utils.env import load_env
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_EXCLUDED = ("/debug/", "/metrics")
+# The event loop waiting for I/O; everything else, waits included, is kept.
+_LOOP_IDLE = re.compile(r"select \((?:[^/]*/)?selectors\.py:")
+
+
+class ProfileSession:
+    def __init__(self, path: str, interval: float):
+        self.id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.path = path
+        self.interval = interval
+        self.threads = {threading.get_ident()}
+        self.samples = defaultdict(Counter)  # thread id -> stack -> count
+        self.slow_queries = []
+        self.started = time.perf_counter()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({_short(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack and not _LOOP_IDLE.match(stack[0]):
+                    stack.reverse()
+                    self.samples[ident][";".join(stack)] += 1
+
+    def stop(self, method: str, path: str, status: int) -> str:
+        self._stop.set()
+        self._sampler.join()
+        elapsed = time.perf_counter() - self.started
+        stacks = Counter()
+        for ident in self.threads:
+            stacks.update(self.samples.get(ident, {}))
+        write_report(self, stacks, method, path, status, elapsed)
+        return self.id
+
+
+_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+def note_thread() -> None:
+    """Mark the calling thread as working for the profiled request, if any."""
+    session = _session.get()
+    if session is not None:
+        session.threads.add(threading.get_ident())
+
+
+def note_slow_query(entry: dict) -> None:
+    session = _session.get()
+    if session is not None:
+        session.slow_queries.append(entry)
+
+
+def profile_token() -> str:
+    load_env()
+    return os.getenv("PROFILE_TOKEN", "")
+
+
+def token_matches(token: str, value: Optional[str]) -> bool:
+    """Whether `value` is the configured token; always False when none is set."""
+    return bool(token) and value is not None and hmac.compare_digest(value.encode(), token.encode())
+
+
+def _short(filename: str) -> str:
+    parts = filename.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+def profile_dir() -> str:
+    load_env()
+    path = os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "lineage-profiles")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def write_report(session: ProfileSession, stacks: Counter, method: str, path: str, status: int, elapsed: float) -> None:
+    total = sum(stacks.values())
+    own, inclusive = Counter(), Counter()
+    for folded, count in stacks.items():
+        frames = folded.split(";")
+        own[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+
+    def table(counter: Counter) -> List[str]:
+        return [
+            f"{count:7d} {100.0 * count / total:6.1f}%  {frame}"
+            for frame, count in counter.most_common(40)
+        ] if total else ["  (no samples)"]
+
+    lines = [
+        f"{method} {path} -> {status} in {elapsed * 1000:.1f} ms",
+        f"{total} samples every {session.interval * 1000:.0f} ms across {len(session.threads)} thread(s)",
+        "",
+        "Self time:",
+        *table(own),
+        "",
+        "Total time:",
+        *table(inclusive),
+    ]
+    if session.slow_queries:
+        lines += ["", "Slow queries:", *(json.dumps(q, default=str) for q in session.slow_queries)]
+
+    base = os.path.join(session.path, session.id)
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    with open(base + ".folded", "w", encoding="utf-8") as f:
+        f.writelines(f"{folded} {count}\n" for folded, count in stacks.items())
+    _prune(session.path, int(os.getenv("PROFILE_KEEP", "50")))
+
+
+def _prune(path: str, keep: int) -> None:
+    reports = sorted(name for name in os.listdir(path) if name.endswith(".txt"))
+    for name in reports[:-keep] if keep > 0 else []:
+        for suffix in (".txt", ".folded"):
+            try:
+                os.remove(os.path.join(path, name[:-4] + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_reports() -> List[dict]:
+    path = profile_dir()
+    reports = []
+    for name in sorted(os.listdir(path), reverse=True):
+        if name.endswith(".txt"):
+            with open(os.path.join(path, name), encoding="utf-8") as f:
+                reports.append({"id": name[:-4], "summary": f.readline().strip()})
+    return reports
+
+
+def report_path(profile_id: str, fmt: str = "txt") -> Optional[str]:
+    if not re.fullmatch(r"[\w-]+", profile_id) or fmt not in ("txt", "folded"):
+        return None
+    path = os.path.join(profile_dir(), f"{profile_id}.{fmt}")
+    return path if os.path.exists(path) else None
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; profiles only requests opted in by header or sampling."""
+
+    def __init__(self, app):
+        load_env()
+        self.app = app
+        self.token = profile_token()
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.interval = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000.0
+
+    def wanted(self, scope) -> bool:
+        if not self.token or scope["path"].startswith(PROFILE_EXCLUDED):
+            return False
+        header = dict(scope.get("headers") or ()).get(PROFILE_HEADER)
+        if header is not None:
+            return token_matches(self.token, header.decode("latin-1"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(profile_dir(), self.interval)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", session.id.encode())]}
+            await send(message)
+
+        token = _session.set(session)
+        session.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _session.reset(token)
+            session.stop(scope["method"], scope["path"], status["code"])
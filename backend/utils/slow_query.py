@@ -0,0 +1,75 @@
+# backend/utils/slow_query.py
+"""
+Slow-statement log for every engine: statements slower than the alias's
+threshold are logged (logger "slow_sql") with the alias, duration,
+statement text and the *shape* of the parameters (names and types, never
+values), kept in a small in-memory ring for /debug/slow-queries, and
+attached to the request's profile when one is being taken.
+
+Thresholds: SLOW_QUERY_MS (default 500; 0 disables) or `slow_query_ms` on
+an alias in connections.json.
+"""
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from datetime import datetime
+from sqlalchemy import event
+from utils.env import load_env
+from utils.profiling import note_slow_query, note_thread
+
+log = logging.getLogger("slow_sql")
+
+RECENT = deque(maxlen=int(os.getenv("SLOW_QUERY_KEEP", "200")))
+MAX_STATEMENT_CHARS = 2000
+_WHITESPACE = re.compile(r"\s+")
+
+
+def default_threshold_ms() -> float:
+    load_env()
+    return float(os.getenv("SLOW_QUERY_MS", "500"))
+
+
+def params_shape(parameters, executemany: bool):
+    """Parameter names and types without their values, e.g. {"alias": "str"}."""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "each": params_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__ if parameters is not None else None
+
+
+def log_slow_queries(engine, alias: str, threshold_ms: float | None = None) -> None:
+    threshold_ms = default_threshold_ms() if threshold_ms is None else threshold_ms
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        note_thread()
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["slow_query_start"].pop()) * 1000
+        if not threshold_ms or elapsed_ms < threshold_ms:
+            return
+        entry = {
+            "at": datetime.utcnow().isoformat(timespec="milliseconds"),
+            "alias": alias,
+            "duration_ms": round(elapsed_ms, 1),
+            "statement": _WHITESPACE.sub(" ", statement).strip()[:MAX_STATEMENT_CHARS],
+            "params": params_shape(parameters, executemany),
+        }
+        RECENT.append(entry)
+        note_slow_query(entry)
+        log.warning(json.dumps(entry, default=str))
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("slow_query_start"):
+            conn.info["slow_query_start"].pop()
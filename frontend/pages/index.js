@@ -77,13 +77,42 @@ export default function Home() {
     setAnalysis(null);
     setAnalysisCached(false);
     try {
-      const res = await axios.post(`${API_BASE}/analyze`, {
-        content: procBody,
-        db_alias: selectedConnection,
-        procedure_name: selectedProc,
+      // Server-sent events: cached summaries arrive whole, fresh ones token by token
+      const res = await fetch(`${API_BASE}/analyze/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          content: procBody,
+          db_alias: selectedConnection,
+          procedure_name: selectedProc,
+        }),
       });
-      setAnalysis(res.data.summary);
-      setAnalysisCached(res.data.cached);
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let text = "";
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || "{}");
+          if (event === "summary") {
+            text = data.text;
+            setAnalysisCached(true);
+          } else if (event === "token") {
+            text += data.text;
+          } else if (event === "error") {
+            throw new Error(data.detail);
+          }
+          setAnalysis(text);
+        }
+      }
 
       const statusRes = await axios.get(`${API_BASE}/analyze/status/${selectedConnection}`);
       setProcStatusMap(statusRes.data);